@@ -0,0 +1,210 @@
+# project_folder/batch_equity.py
+#
+# Headless equity for many spots, without the GUI. Reads one JSON spot per
+# line from a file or stdin and writes one JSON result per line, in input
+# order, as soon as each is known:
+#     python -m batch_equity spots.jsonl -o results.jsonl
+#     cat spots.jsonl | python -m batch_equity --ci-halfwidth 0.005
+#
+# A spot looks like
+#     {"id": 7, "hero": ["As", "Kd"], "board": "2h7cJd", "opponents": 3,
+#      "ranges": ["22+, A2s+, KTo+", null, "QQ+"], "trials": 20000}
+# where only hero (or hero_range) and opponents are required. Optional
+# fields: board, ranges, hero_range, trials, target_se, ci_halfwidth,
+# time_budget, confidence, exact and seed; missing ones take the command
+# line defaults. The result echoes "id" and gives equity, std_error, low,
+# high, trials and method, plus win, tie, loss and the hero's hand
+# "categories" when the method provides them, or "error" when the spot is
+# invalid.
+#
+# Spots are spread over the shared process pool (one spot per task), so
+# only the GUI-free engine modules are imported here.
+
+import argparse
+from collections import deque
+import json
+import os
+import sys
+import time
+
+from cards import TREYS_CARDS, parse_cards
+from equity_store import get_store
+from parallel import default_workers, get_pool
+from probability import calculate_win_probability
+
+# Spots submitted ahead per worker; results are written in input order,
+# so this caps how many finished results wait behind a slow spot
+SPOTS_PER_WORKER = 8
+
+OPTION_FIELDS = ('trials', 'target_se', 'ci_halfwidth', 'time_budget', 'confidence', 'exact', 'seed')
+
+
+def parse_spot(spot, defaults):
+    """
+    Check a spot and read its cards and options.
+
+    :param spot: dict read from one input line
+    :param defaults: dict of option values used when the spot leaves them out
+    :return: (hero, board, opponents, options) with cards as 0..51 indices
+    """
+    hero_range = spot.get('hero_range')
+    hero = parse_cards(spot.get('hero', []))
+    board = parse_cards(spot.get('board', []))
+    opponents = spot.get('opponents')
+    if not isinstance(opponents, int) or opponents < 0:
+        raise ValueError("'opponents' must be a non-negative integer")
+    if 2 * (opponents + 1) + 5 > 52:
+        raise ValueError(f"Not enough cards to deal {opponents} opponents")
+    if hero_range is not None and not isinstance(hero_range, str):
+        raise ValueError("'hero_range' must be a string")
+    ranges = spot.get('ranges')
+    if ranges is not None:
+        if not isinstance(ranges, list) or not all(spec is None or isinstance(spec, str) for spec in ranges):
+            raise ValueError("'ranges' must be a list of range strings or nulls, one per opponent")
+        if len(ranges) > opponents:
+            raise ValueError(f"Got {len(ranges)} ranges for {opponents} opponents")
+    if hero_range is None and len(hero) != 2:
+        raise ValueError("'hero' must be two cards unless 'hero_range' is given")
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("'board' must have 0, 3, 4 or 5 cards")
+    if len(set(hero + board)) != len(hero) + len(board):
+        raise ValueError("A card is used twice")
+
+    options = {field: spot.get(field, defaults.get(field)) for field in OPTION_FIELDS}
+    trials = options['trials']
+    if isinstance(trials, bool) or not isinstance(trials, int) or trials < 1:
+        raise ValueError("'trials' must be a positive integer")
+    for field in ('target_se', 'ci_halfwidth', 'time_budget'):
+        value = options[field]
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0):
+            raise ValueError(f"'{field}' must be a positive number")
+    return hero, board, opponents, options
+
+
+def solve_spot(spot, defaults):
+    """
+    Compute one spot.
+
+    :param spot: dict read from one input line
+    :param defaults: dict of option values used when the spot leaves them out,
+                     and 'store', the path of a persistent equity store or None
+    :return: result dict (without the id)
+    """
+    hero, board, opponents, options = parse_spot(spot, defaults)
+    store = get_store(defaults['store']) if defaults.get('store') else None
+    estimate = calculate_win_probability([TREYS_CARDS[card] for card in hero],
+                                         [TREYS_CARDS[card] for card in board], opponents,
+                                         num_simulations=options['trials'], exact=options['exact'],
+                                         seed=options['seed'], target_se=options['target_se'],
+                                         ci_halfwidth=options['ci_halfwidth'], time_budget=options['time_budget'],
+                                         confidence=options['confidence'], hero_range=spot.get('hero_range'),
+                                         opponent_ranges=spot.get('ranges'), store=store)
+    result = {'equity': float(estimate), 'std_error': estimate.std_error, 'low': estimate.low,
+              'high': estimate.high, 'trials': estimate.trials, 'method': estimate.method}
+    if estimate.win is not None:
+        result.update(win=float(estimate.win), tie=float(estimate.tie), loss=float(estimate.loss))
+    if estimate.categories is not None:
+        result['categories'] = {name: float(share) for name, share in estimate.categories.items()}
+    return result
+
+
+def solve_line(number, line, defaults):
+    """
+    Parse and compute one input line. Also the process pool task.
+
+    :return: (JSON text of the result, whether it is an error)
+    """
+    spot = {}
+    try:
+        spot = json.loads(line)
+        if not isinstance(spot, dict):
+            raise ValueError("Each line must be a JSON object")
+        result = solve_spot(spot, defaults)
+    except (ValueError, TypeError) as e:
+        result = {'error': str(e), 'line': number}
+    failed = 'error' in result
+    if 'id' in spot:
+        result = {'id': spot['id'], **result}
+    return json.dumps(result), failed
+
+
+def run(lines, output, defaults, workers=None):
+    """
+    Solve every spot in `lines` and write the results to `output` in order.
+
+    :param lines: iterable of JSONL input lines, read lazily
+    :param output: text file to write one JSON result per line to
+    :param defaults: option values for spots that leave them out
+    :param workers: pool processes; 1 solves the spots in this process
+    :return: (spots, errors) counts
+    """
+    workers = workers or default_workers()
+    spots = 0
+    errors = 0
+
+    def write(solved):
+        nonlocal errors
+        text, failed = solved
+        output.write(text + '\n')
+        output.flush()
+        errors += failed
+
+    numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+    if workers == 1:
+        for number, line in numbered:
+            spots += 1
+            write(solve_line(number, line, defaults))
+        return spots, errors
+
+    pool = get_pool(workers)
+    pending = deque()
+    for number, line in numbered:
+        spots += 1
+        pending.append(pool.submit(solve_line, number, line, defaults))
+        while pending and (len(pending) > workers * SPOTS_PER_WORKER or pending[0].done()):
+            write(pending.popleft().result())
+    while pending:
+        write(pending.popleft().result())
+    return spots, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute hero equity for a stream of JSONL spots.")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL file of spots, '-' for stdin (default)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL file for the results, '-' for stdout (default)")
+    parser.add_argument('--workers', type=int, default=None, help="pool processes (default: CPU count)")
+    parser.add_argument('--trials', type=int, default=10000, help="trials per spot without a precision target")
+    parser.add_argument('--target-se', type=float, default=None)
+    parser.add_argument('--ci-halfwidth', type=float, default=None)
+    parser.add_argument('--time-budget', type=float, default=None, help="seconds per spot")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--store', default=None, help="persistent equity store to read and grow (see equity_store.py)")
+    args = parser.parse_args()
+
+    defaults = {'trials': args.trials, 'target_se': args.target_se, 'ci_halfwidth': args.ci_halfwidth,
+                'time_budget': args.time_budget, 'confidence': args.confidence, 'exact': None, 'seed': args.seed,
+                'store': args.store}
+    source = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    started = time.perf_counter()
+    try:
+        spots, errors = run(source, output, defaults, args.workers)
+    except BrokenPipeError:
+        # The reader stopped early (e.g. piped into head); silence the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(1)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    print(f"{spots} spots in {elapsed:.1f}s ({spots / max(elapsed, 1e-9) * 60:,.0f}/min), {errors} errors",
+          file=sys.stderr)
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# project_folder/canonical.py
+
+from itertools import permutations
+
+# Equity is unchanged when the four suits are relabelled, so every spot is
+# mapped to the smallest of its 24 suit relabellings. Cards are 0..51
+# indices (rank * 4 + suit); SUIT_RELABELLINGS[p][card] applies relabelling p.
+SUIT_RELABELLINGS = [
+    [(card & ~3) | perm[card & 3] for card in range(52)]
+    for perm in permutations(range(4))
+]
+
+
+def canonical_cards(hero, board):
+    """
+    Suit-isomorphic form of a hero hand and board.
+
+    :param hero: hero card indices
+    :param board: community card indices
+    :return: (hero, board) as sorted tuples under the canonical suit labels
+    """
+    best = None
+    for relabel in SUIT_RELABELLINGS:
+        candidate = (tuple(sorted([relabel[card] for card in hero])),
+                     tuple(sorted([relabel[card] for card in board])))
+        if best is None or candidate < best:
+            best = candidate
+    return best
+
+
+def canonical_spot(hero, board, num_opponents):
+    """
+    Key shared by every spot that is equivalent under suit permutation,
+    e.g. AhKh on 2h7d9c and AsKs on 2s7c9d.
+
+    :param hero: hero card indices
+    :param board: community card indices
+    :param num_opponents: number of active opponents
+    :return: hashable key
+    """
+    hero_key, board_key = canonical_cards(hero, board)
+    return hero_key, board_key, num_opponents
+
+
+def find_relabelling(hero, board, target_hero, target_board):
+    """
+    A suit relabelling that turns one spot into another.
+
+    :return: list mapping card index -> relabelled index, or None if the
+             spots are not equivalent
+    """
+    target = (sorted(target_hero), sorted(target_board))
+    for relabel in SUIT_RELABELLINGS:
+        if (sorted([relabel[card] for card in hero]), sorted([relabel[card] for card in board])) == target:
+            return relabel
+    return None
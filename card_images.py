@@ -0,0 +1,65 @@
+# project_folder/card_images.py
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QPixmap
+
+from cards import BACK_IMAGE_PATH, IMAGE_PATHS
+
+# Process-wide cache of the card images. The PNGs are large (500x726), so
+# each is decoded from disk once, and scaled once per display size; the GUI
+# then hands out the same QPixmap/QIcon every time a card is drawn. A
+# QApplication must exist before anything here is called.
+
+BACK = 52  # image key of the card back, after the card indices 0..51
+
+_originals = None  # 53 full-size pixmaps, indexed by card (BACK last)
+_scaled = {}  # (card, width, height) -> QPixmap
+_icons = {}  # (card, width, height) -> QIcon
+
+
+def preload():
+    """
+    Decode every card image, if not done yet. A missing card image is
+    replaced by the card back; a missing back gives a null pixmap.
+    """
+    global _originals
+    if _originals is not None:
+        return
+    back = QPixmap(BACK_IMAGE_PATH)
+    originals = []
+    for path in IMAGE_PATHS:
+        pixmap = QPixmap(path)
+        originals.append(back if pixmap.isNull() else pixmap)
+    originals.append(back)
+    _originals = originals
+
+
+def card_pixmap(card, width, height):
+    """
+    :param card: card index 0..51, or BACK
+    :param width: display width in pixels
+    :param height: display height in pixels
+    :return: QPixmap of the card scaled to width x height (null if there is no image)
+    """
+    key = (card, width, height)
+    pixmap = _scaled.get(key)
+    if pixmap is None:
+        preload()
+        original = _originals[card]
+        if original.isNull():
+            pixmap = original
+        else:
+            pixmap = original.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        _scaled[key] = pixmap
+    return pixmap
+
+
+def card_icon(card, width, height):
+    """
+    :return: QIcon of the card at width x height, for buttons
+    """
+    key = (card, width, height)
+    icon = _icons.get(key)
+    if icon is None:
+        icon = _icons[key] = QIcon(card_pixmap(card, width, height))
+    return icon
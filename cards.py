@@ -1,14 +1,78 @@
 # project_folder/cards.py
 
-from treys import Deck
+import os
 
-class Player:
-    def __init__(self):
-        self.cards = []
+from treys import Card
 
-class Flop:
-    def __init__(self):
-        self.cards = []
+# Every card is an index 0..51 = rank * 4 + suit, with ranks 2..A -> 0..12
+# and suits in the order h, d, c, s. Sets of cards (hands, boards, used
+# cards) are 52-bit masks with one bit per card, laid out suit-major
+# (bit = suit * 13 + rank) so that handeval can read each suit as a 13-bit
+# rank mask. Conversions to strings, treys integers and image paths are
+# precomputed lookups, so nothing is parsed while simulating or redrawing.
+# The cards of a hand in play are kept by table_state.TableState.
+
+RANKS = '23456789TJQKA'
+SUITS = 'hdcs'
+
+CARD_STRINGS = tuple(rank + suit for rank in RANKS for suit in SUITS)
+STRING_TO_INDEX = {card: index for index, card in enumerate(CARD_STRINGS)}
+# Accepts either a card string or an index and gives the index
+CARD_INDEX = dict(STRING_TO_INDEX)
+CARD_INDEX.update((index, index) for index in range(52))
+TREYS_CARDS = tuple(Card.new(card) for card in CARD_STRINGS)
+TREYS_TO_INDEX = {card: index for index, card in enumerate(TREYS_CARDS)}
+IMAGE_PATHS = tuple(os.path.join('graphics', 'cards', f"{card}.png") for card in CARD_STRINGS)
+BACK_IMAGE_PATH = os.path.join('graphics', 'cards', 'back.png')
+
+CARD_BITS = tuple(1 << ((index & 3) * len(RANKS) + (index >> 2)) for index in range(52))
+BIT_TO_INDEX = {bit: index for index, bit in enumerate(CARD_BITS)}
+FULL_DECK_MASK = (1 << 52) - 1
+
+# Indices sorted by suit (h, d, c, s) and then rank, the order the GUI shows cards in
+DISPLAY_ORDER = tuple(sorted(range(52), key=lambda index: (index & 3, index >> 2)))
+
+
+def parse_cards(cards):
+    """
+    Card indices from a list of card strings or one string like 'AsKd'.
+
+    :param cards: list of card strings or indices, or one string of cards
+    :return: list of 0..51 indices
+    """
+    if isinstance(cards, str):
+        text = cards.replace(' ', '').replace(',', '')
+        cards = [text[start:start + 2] for start in range(0, len(text), 2)]
+    try:
+        return [CARD_INDEX[card] for card in cards]
+    except (KeyError, TypeError):
+        raise ValueError(f"Bad cards: {cards!r}") from None
+
+
+def card_mask(cards):
+    """
+    Combine card indices into a 52-bit mask.
+
+    :param cards: iterable of 0..51 indices
+    :return: int mask
+    """
+    mask = 0
+    for card in cards:
+        mask |= CARD_BITS[card]
+    return mask
+
+
+def mask_cards(mask):
+    """
+    Card indices held in a mask, in increasing bit order.
+
+    :param mask: 52-bit int mask
+    :return: list of 0..51 indices
+    """
+    cards = []
+    while mask:
+        bit = mask & -mask
+        cards.append(BIT_TO_INDEX[bit])
+        mask ^= bit
+    return cards
 
-    def generate_flop(self, deck):
-        self.cards = deck.draw(3)
@@ -0,0 +1,106 @@
+# project_folder/equity_cache.py
+
+from collections import OrderedDict
+import sys
+import threading
+import time
+
+
+def _entry_size(obj):
+    """
+    Approximate memory held by a cache key or value, in bytes: the object,
+    the items of tuples, lists and dicts, the data of numpy arrays and the
+    attributes of other objects (e.g. an EquityEstimate's breakdowns).
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(_entry_size(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(_entry_size(key) + _entry_size(value) for key, value in obj.items())
+    elif hasattr(obj, 'nbytes'):
+        # getsizeof counts a numpy array's data only when the array owns it
+        if obj.base is not None:
+            size += obj.nbytes
+    elif hasattr(obj, '__dict__'):
+        size += _entry_size(vars(obj))
+    return size
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by entry count and approximate memory,
+    with an optional time to live (seconds) after which entries expire.
+
+    Keeps hit/miss/eviction/expiration counters so callers can report how
+    well the cache is doing.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=8 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expiry time or None)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= entry[1]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = _entry_size(key) + _entry_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        :return: dict with entries, bytes, hits, misses, evictions, expirations
+                 and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,246 @@
+# project_folder/equity_service.py
+#
+# Local HTTP/JSON equity service, so several table clients can share one
+# engine and its cache. Run from the project folder:
+#     python -m equity_service --port 8765
+#
+# Endpoints:
+#     POST /equity   body: one spot in the batch_equity.py format, e.g.
+#                    {"hero": ["As", "Kd"], "board": "2h7cJd", "opponents": 3}
+#                    -> {"equity": ..., "std_error": ..., "low": ..., "high": ...,
+#                        "trials": ..., "method": ..., "source": ...}
+#     GET  /metrics  request counts, latency percentiles, queue depth and cache stats
+#     GET  /health   {"status": "ok"}
+#
+# Spots are computed on the shared process pool. Requests for the same spot,
+# or a suit-isomorphic one, that arrive while it is being computed wait for
+# that one computation instead of starting another ("source": "coalesced"),
+# and finished results are kept in a TTL/LRU cache ("source": "cache").
+# With --store, results also go to a persistent equity store shared with
+# other servers and sessions (see equity_store.py).
+
+import argparse
+import asyncio
+from collections import deque
+import json
+import time
+
+from batch_equity import OPTION_FIELDS, parse_spot, solve_spot
+from canonical import canonical_spot
+from equity_cache import LRUCache
+from parallel import default_workers, get_pool, shutdown_pool
+
+# Latencies of this many most recent /equity requests make up the percentiles
+LATENCY_WINDOW = 10000
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def spot_key(spot, defaults):
+    """
+    Key shared by every request that must give the same answer.
+
+    Spots with random opponents are keyed by their suit-isomorphic form;
+    ranged spots by their exact cards and ranges, since a range may single
+    out suits.
+    """
+    hero, board, opponents, options = parse_spot(spot, defaults)
+    option_key = tuple(options[field] for field in OPTION_FIELDS)
+    hero_range = spot.get('hero_range')
+    ranges = spot.get('ranges')
+    if hero_range is None and not any(spec is not None for spec in ranges or ()):
+        return canonical_spot(hero, board, opponents) + option_key
+    return (tuple(sorted(hero)), tuple(sorted(board)), opponents,
+            json.dumps([hero_range, ranges], sort_keys=True)) + option_key
+
+
+def percentile(ordered, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class EquityService:
+    """
+    Serves equity requests over HTTP, coalescing and caching computations.
+    """
+
+    def __init__(self, workers=None, defaults=None, cache_entries=4096, ttl=300.0):
+        self.workers = workers or default_workers()
+        self.pool = get_pool(self.workers)
+        self.defaults = defaults or {'trials': 10000, 'confidence': 0.95}
+        self.cache = LRUCache(max_entries=cache_entries, ttl=ttl)
+        self.in_flight = {}  # spot key -> future of the computation
+        self.waiting = 0  # requests currently waiting on a computation
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {'requests': 0, 'errors': 0, 'cache_hits': 0, 'coalesced': 0, 'computed': 0}
+        self.started = time.monotonic()
+
+    async def equity(self, spot):
+        """
+        :return: result dict for one spot, with "source" telling how it was obtained
+        """
+        key = spot_key(spot, self.defaults)
+        result = self.cache.get(key)
+        if result is not None:
+            self.counters['cache_hits'] += 1
+            return {**result, 'source': 'cache'}
+
+        future = self.in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, solve_spot, spot, self.defaults)
+            future.add_done_callback(lambda done: self._finish(key, done))
+            self.in_flight[key] = future
+            self.counters['computed'] += 1
+            source = 'computed'
+        else:
+            self.counters['coalesced'] += 1
+            source = 'coalesced'
+
+        self.waiting += 1
+        try:
+            # A client going away must not cancel a computation others wait for
+            result = await asyncio.shield(future)
+        finally:
+            self.waiting -= 1
+        return {**result, 'source': source}
+
+    def _finish(self, key, future):
+        self.in_flight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    def metrics(self):
+        ordered = sorted(self.latencies)
+        return {
+            **self.counters,
+            'queue_depth': len(self.in_flight),
+            'waiting_requests': self.waiting,
+            'workers': self.workers,
+            'uptime_s': time.monotonic() - self.started,
+            'latency_ms': {
+                'count': len(ordered),
+                'p50': percentile(ordered, 0.50),
+                'p90': percentile(ordered, 0.90),
+                'p99': percentile(ordered, 0.99),
+                'max': ordered[-1] if ordered else None,
+            },
+            'cache': self.cache.stats(),
+        }
+
+    async def dispatch(self, method, path, body):
+        """
+        :return: (HTTP status, JSON-able payload)
+        """
+        path = path.split('?', 1)[0]
+        if path == '/equity':
+            if method != 'POST':
+                return 405, {'error': "Use POST"}
+            self.counters['requests'] += 1
+            started = time.perf_counter()
+            spot = None
+            try:
+                spot = json.loads(body)
+                if not isinstance(spot, dict):
+                    raise ValueError("The body must be a JSON object")
+                result = await self.equity(spot)
+                status = 200
+            except (ValueError, TypeError) as e:
+                self.counters['errors'] += 1
+                result, status = {'error': str(e)}, 400
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            if isinstance(spot, dict) and 'id' in spot:
+                result = {'id': spot['id'], **result}
+            return status, result
+        if path == '/metrics':
+            return (200, self.metrics()) if method == 'GET' else (405, {'error': "Use GET"})
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f"No such endpoint: {path}"}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on one connection, keeping it open between
+        requests unless the client asks to close it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    status, payload, keep_alive = 400, {'error': "Malformed request"}, False
+                else:
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                    if length < 0:
+                        status, payload, keep_alive = 400, {'error': "Negative Content-Length"}, False
+                    elif length > MAX_BODY_BYTES:
+                        status, payload, keep_alive = 413, {'error': "Request body too large"}, False
+                    else:
+                        body = await reader.readexactly(length) if length else b''
+                        try:
+                            status, payload = await self.dispatch(method, path, body)
+                        except Exception as e:  # keep serving other requests
+                            status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Equity service on http://{host}:{port} with {self.workers} worker(s)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve hero equity over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help="pool processes (default: CPU count)")
+    parser.add_argument('--trials', type=int, default=10000, help="trials per spot without a precision target")
+    parser.add_argument('--ci-halfwidth', type=float, default=None, help="default precision target")
+    parser.add_argument('--time-budget', type=float, default=None, help="default seconds per spot")
+    parser.add_argument('--cache-entries', type=int, default=4096)
+    parser.add_argument('--ttl', type=float, default=300.0, help="seconds a cached result stays valid")
+    parser.add_argument('--store', default=None, help="persistent equity store to read and grow")
+    args = parser.parse_args()
+
+    defaults = {'trials': args.trials, 'ci_halfwidth': args.ci_halfwidth, 'time_budget': args.time_budget,
+                'confidence': 0.95, 'store': args.store}
+    service = EquityService(args.workers, defaults, args.cache_entries, args.ttl)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_pool()
+
+
+if __name__ == '__main__':
+    main()
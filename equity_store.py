@@ -0,0 +1,238 @@
+# project_folder/equity_store.py
+#
+# Persistent equity results, shared by every session, process and server
+# on the machine. Each spot (canonical hero, board, opponents and range
+# ids, see spot_key) has one row in an SQLite database in WAL mode, so
+# readers never block writers. A row keeps the totals the estimate is
+# computed from: outcome counts for random opponents, importance-weighted
+# sums for ranges. A finished simulation adds its totals to the row, so
+# the pooled estimate weights every trial the same and gets more precise
+# every time the spot is asked again. An exact result replaces the row and
+# is never merged into. The file is kept under the user's data directory
+# (see STORE_PATH). Run from the project folder:
+#     python -m equity_store stats
+#     python -m equity_store compact --min-trials 10000 --older-than-days 90
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cards import CARD_STRINGS
+from estimate import CATEGORY_NAMES, estimate_from_outcomes, estimate_from_weighted_sums
+
+
+def _user_data_dir():
+    if os.name == 'nt':
+        return os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    return os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+
+
+# The store grows with every new spot, so it lives in the user's data
+# directory rather than the source tree; POKER_EQUITY_STORE overrides it
+STORE_PATH = os.environ.get('POKER_EQUITY_STORE') or \
+    os.path.join(_user_data_dir(), 'poker_equity', 'equity_store.sqlite')
+
+# Seconds a writer waits for another process's lock before giving up
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS equities (
+    spot TEXT PRIMARY KEY,
+    exact INTEGER NOT NULL,
+    weighted INTEGER NOT NULL,
+    trials INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    sums TEXT NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+# Kept in the file's user_version; files with another version, or with an
+# equities table but no version, are not equity stores and are left alone
+SCHEMA_VERSION = 1
+
+_stores = {}  # path -> EquityStore of this process, see get_store
+
+
+def spot_key(hero, board, num_opponents, range_ids=None):
+    """
+    Text key of a spot, e.g. 'AhKh|2h7d9c|3|'.
+
+    :param hero: hero card indices, already canonical for random opponents
+    :param board: board card indices, likewise
+    :param range_ids: sequence of hex range ids (None for a random hand), or
+                      None when nobody holds a range
+    """
+    ranges = ",".join(range_id or "" for range_id in range_ids or ())
+    return (f"{''.join(CARD_STRINGS[card] for card in hero)}|{''.join(CARD_STRINGS[card] for card in board)}|"
+            f"{num_opponents}|{ranges}")
+
+
+class EquityStore:
+    """
+    On-disk equity results keyed by spot_key. Safe to use from several
+    threads and processes at once: every thread of every process gets its
+    own connection, and SQLite serialises the writes.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        # Checked and created in one transaction, so processes opening a new
+        # file at the same time do not mistake each other's table for a foreign one
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version == 0:
+                if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'equities'").fetchone():
+                    raise ValueError(f"{path} has an equities table but is not an equity store")
+                connection.execute(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            elif version != SCHEMA_VERSION:
+                raise ValueError(f"{path} is not an equity store of version {SCHEMA_VERSION} (found {version})")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _connection(self):
+        """
+        This thread's connection, opened again in a forked child process.
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            local.connection.execute("PRAGMA journal_mode=WAL")
+            local.connection.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.connection
+
+    def get(self, spot, confidence=0.95):
+        """
+        :param spot: key from spot_key
+        :return: EquityEstimate of every run merged so far, with win, tie,
+                 loss and categories set, or None
+        """
+        row = self._connection().execute("SELECT exact, weighted, trials, sums FROM equities WHERE spot = ?",
+                                         (spot,)).fetchone()
+        if row is None:
+            return None
+        exact, weighted, trials, sums = row
+        sums = json.loads(sums)
+        if weighted:
+            return estimate_from_weighted_sums(sums, trials, confidence)
+        num_opponents = len(sums) - 2 - len(CATEGORY_NAMES)
+        return estimate_from_outcomes(sums, num_opponents, confidence, 'exact' if exact else 'simulation')
+
+    def merge(self, spot, estimate):
+        """
+        Add a finished 'simulation' or 'exact' estimate to the stored result.
+
+        The estimate's outcome counts or weighted sums are added to the
+        row's, in one transaction so concurrent merges are not lost. A
+        stratified run adds its stratified shares scaled to its trials, so
+        the pooled mean stays unbiased; its standard error is then that of
+        plain sampling. An estimate without either is ignored.
+        """
+        exact = estimate.method == 'exact'
+        weighted = estimate.outcomes is None
+        sums = estimate.weighted_sums if weighted else estimate.outcomes
+        if sums is None:
+            return
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT exact, weighted, trials, runs, sums FROM equities WHERE spot = ?",
+                                     (spot,)).fetchone()
+            trials, runs = estimate.trials, 1
+            if row is not None and row[0] and not exact:
+                connection.execute("COMMIT")
+                return  # Nothing improves on an exact result
+            if row is not None and not row[0] and not exact:
+                stored = json.loads(row[4])
+                if row[1] == weighted and len(stored) == len(sums):
+                    sums = [total + value for total, value in zip(stored, sums)]
+                    trials += row[2]
+                    runs += row[3]
+            connection.execute("INSERT OR REPLACE INTO equities VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (spot, int(exact), int(weighted), trials, runs, json.dumps(sums), time.time()))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        """
+        :return: dict with spots, exact spots, trials, runs and file bytes
+        """
+        spots, exact, trials, runs = self._connection().execute(
+            "SELECT count(*), coalesce(sum(exact), 0), coalesce(sum(trials), 0), coalesce(sum(runs), 0) "
+            "FROM equities").fetchone()
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(self.path + suffix))
+        return {'spots': spots, 'exact': exact, 'trials': trials, 'runs': runs, 'bytes': size}
+
+    def compact(self, min_trials=0, older_than=None):
+        """
+        Drop simulated spots with fewer than min_trials trials or not
+        updated for older_than seconds, then rebuild the file without the
+        freed pages and fold the write-ahead log into it.
+
+        :return: number of spots removed
+        """
+        connection = self._connection()
+        cutoff = time.time() - older_than if older_than is not None else 0.0
+        removed = connection.execute("DELETE FROM equities WHERE NOT exact AND (trials < ? OR updated < ?)",
+                                     (min_trials, cutoff)).rowcount
+        connection.execute("VACUUM")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def close(self):
+        """
+        Close this thread's connection.
+        """
+        if getattr(self._local, 'pid', None) == os.getpid():
+            self._local.connection.close()
+        self._local.pid = None
+
+
+def get_store(path=STORE_PATH):
+    """
+    The process-wide EquityStore of a file, opened on first use; for pool
+    workers that get the path instead of a store.
+    """
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = EquityStore(path)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact the persistent equity store.")
+    parser.add_argument('command', choices=('stats', 'compact'))
+    parser.add_argument('--store', default=STORE_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--min-trials', type=int, default=0, help="compact: drop simulated spots with fewer trials")
+    parser.add_argument('--older-than-days', type=float, default=None,
+                        help="compact: drop simulated spots not updated for this many days")
+    args = parser.parse_args()
+
+    try:
+        store = EquityStore(args.store)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == 'compact':
+        before = store.stats()['bytes']
+        older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+        removed = store.compact(args.min_trials, older_than)
+        print(f"Removed {removed} spots, {before:,} -> {store.stats()['bytes']:,} bytes")
+    for name, value in store.stats().items():
+        print(f"{name:>8}: {value:,}")
+
+
+if __name__ == '__main__':
+    main()
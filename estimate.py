@@ -0,0 +1,230 @@
+# project_folder/estimate.py
+
+from statistics import NormalDist
+
+import numpy as np
+
+# Final hand categories in the order of handeval's category numbers
+CATEGORY_NAMES = ('high card', 'one pair', 'two pair', 'three of a kind', 'straight', 'flush', 'full house',
+                  'four of a kind', 'straight flush')
+
+
+def z_score(confidence):
+    """
+    Two-sided normal quantile, e.g. 1.96 for a 95% confidence level.
+    """
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+class EquityEstimate(float):
+    """
+    A win probability together with how precisely it is known.
+
+    Behaves exactly like the float probability, so existing callers keep
+    working, and adds the number of trials, the standard error and the
+    confidence interval. `method` is 'simulation', 'exact', 'table' or
+    'trivial' depending on how the value was obtained. The probability is
+    the expected share of the pot: a tie pays 1/k when k players split it.
+
+    `win`, `tie` and `loss` are the probabilities of taking the whole pot,
+    splitting it and getting nothing, and `categories` maps each name in
+    CATEGORY_NAMES to the probability that the player's final hand is of
+    that category; any of them is None when unknown.
+
+    Flop and turn estimates also keep `next_card_counts`, a
+    (52, outcome_size(opponents)) array of outcome counts per first runout
+    card, and `spot`, the (hero, board, opponents) card indices they were
+    run on; both are None otherwise.
+
+    `variance_gain` is set by variance-reduced simulations: the variance a
+    plain simulation with the same trials would have, divided by the
+    variance achieved, i.e. how many times fewer trials were needed.
+
+    `outcomes` (an outcome count vector, see estimate_from_outcomes) or
+    `weighted_sums` (see estimate_from_weighted_sums) are the totals the
+    estimate was computed from, so runs of the same spot can be pooled by
+    adding them up; None when unknown.
+    """
+
+    def __new__(cls, probability, trials=0, std_error=0.0, confidence=0.95, method='simulation'):
+        self = super().__new__(cls, probability)
+        self.trials = trials
+        self.std_error = std_error
+        self.confidence = confidence
+        self.method = method
+        self.half_width = z_score(confidence) * std_error
+        self.low = max(0.0, probability - self.half_width)
+        self.high = min(1.0, probability + self.half_width)
+        self.next_card_counts = None
+        self.spot = None
+        self.win = None
+        self.tie = None
+        self.loss = None
+        self.categories = None
+        self.variance_gain = None
+        self.outcomes = None
+        self.weighted_sums = None
+        return self
+
+    @property
+    def interval(self):
+        return self.low, self.high
+
+    def __repr__(self):
+        return (f"EquityEstimate({float(self):.6f}, trials={self.trials}, "
+                f"std_error={self.std_error:.6f}, method={self.method!r})")
+
+
+def outcome_size(num_opponents):
+    """
+    Length of an outcome count vector, see estimate_from_outcomes.
+    """
+    return num_opponents + 2 + len(CATEGORY_NAMES)
+
+
+def estimate_from_outcomes(outcomes, num_opponents, confidence=0.95, method='simulation'):
+    """
+    Build an estimate from outcome counts.
+
+    An outcome count vector holds num_opponents + 2 split counts and then
+    one count per hand category. outcomes[k] for k >= 1 counts the trials
+    where the hero was one of k players splitting the pot (k = 1 is an
+    outright win) and outcomes[0] those the hero lost;
+    outcomes[num_opponents + 2 + c] counts the trials where the hero's
+    final hand was of category c. Counts may be scaled to any total.
+
+    :param outcomes: sequence of outcome_size(num_opponents) counts
+    :param method: 'exact' counts every deal, so the standard error is 0
+    :return: EquityEstimate of the mean pot share, with win, tie, loss,
+             categories and outcomes set
+    """
+    splits = [float(count) for count in outcomes[:num_opponents + 2]]
+    categories = [float(count) for count in outcomes[num_opponents + 2:]]
+    trials = sum(splits)
+    if trials <= 0:
+        return EquityEstimate(0.0, 0, 0.0, confidence, method)
+    mean = sum(count / ways for ways, count in enumerate(splits) if ways) / trials
+    second_moment = sum(count / (ways * ways) for ways, count in enumerate(splits) if ways) / trials
+    variance = 0.0 if method == 'exact' else max(0.0, second_moment - mean * mean)
+    estimate = EquityEstimate(mean, round(trials), (variance / trials) ** 0.5, confidence, method)
+    estimate.win = splits[1] / trials
+    estimate.tie = sum(splits[2:]) / trials
+    estimate.loss = splits[0] / trials
+    estimate.outcomes = splits + categories
+    if sum(categories) > 0:
+        estimate.categories = {name: count / sum(categories) for name, count in zip(CATEGORY_NAMES, categories)}
+    return estimate
+
+
+def estimate_from_weighted_sums(sums, trials, confidence=0.95, method='simulation'):
+    """
+    Build an estimate from importance-weighted trials.
+
+    :param sums: (sum w, sum w*v, sum w^2, sum w^2*v, sum w^2*v^2) over the
+                 trials, where w is a trial's weight and v its equity share,
+                 optionally followed by sum w*win, sum w*tie and sum w per
+                 hand category to also set win, tie, loss and categories
+    :return: EquityEstimate of sum(w*v) / sum(w) with the standard error of
+             that ratio, and weighted_sums set
+    """
+    total, weighted, total_sq, weighted_sq, share_sq = sums[:5]
+    if total <= 0:
+        return EquityEstimate(0.0, trials, 0.0, confidence, method)
+    mean = weighted / total
+    variance = max(0.0, share_sq - 2 * mean * weighted_sq + mean * mean * total_sq) / (total * total)
+    estimate = EquityEstimate(mean, trials, variance ** 0.5, confidence, method)
+    estimate.weighted_sums = [float(value) for value in sums]
+    if len(sums) > 5:
+        estimate.win = sums[5] / total
+        estimate.tie = sums[6] / total
+        estimate.loss = max(0.0, 1.0 - estimate.win - estimate.tie)
+        estimate.categories = {name: weight / total for name, weight in zip(CATEGORY_NAMES, sums[7:])}
+    return estimate
+
+
+def estimate_from_strata(strata, weights, categories, confidence=0.95):
+    """
+    Build a post-stratified estimate.
+
+    The trials are split into strata of known probability, e.g. one per
+    board runout or one per final hand category of the hero. Averaging the
+    stratum means with the known weights removes the variance between the
+    strata from the estimate, and it stays unbiased however the trials
+    were spread over the strata. The rare stratum without trials counts
+    with the overall mean.
+
+    :param strata: (strata, num_opponents + 2) split counts per stratum, see
+                   estimate_from_outcomes
+    :param weights: (strata,) probability of each stratum, summing to 1
+    :param categories: (strata, len(CATEGORY_NAMES)) probability of each
+                       hero hand category within each stratum
+    :return: EquityEstimate with win, tie, loss, categories, variance_gain
+             and outcomes set; the outcomes are the stratified split and
+             category shares scaled to the trials, so pooling them with
+             other runs keeps the strata at their true weights
+    """
+    strata = np.asarray(strata, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    shares = np.zeros(strata.shape[1])
+    shares[1:] = 1.0 / np.arange(1, strata.shape[1])
+    counts = strata.sum(axis=1)
+    trials = counts.sum()
+    if trials <= 0:
+        return EquityEstimate(0.0, 0, 0.0, confidence)
+    totals = strata @ shares
+    squares = strata @ (shares * shares)
+    overall = totals.sum() / trials
+    plain = max(0.0, squares.sum() / trials - overall * overall)  # variance of one plain trial
+
+    sampled = counts > 0
+    counts = np.maximum(counts, 1)
+    means = np.where(sampled, totals / counts, overall)
+    deviations = squares - totals * totals / counts
+    # Strata with a single trial borrow the pooled within-stratum variance
+    spread = counts > 1
+    pooled = deviations[spread].sum() / max(1.0, (counts[spread] - 1).sum())
+    variances = np.where(spread, deviations / np.maximum(counts - 1, 1), pooled)
+    missing = weights[~sampled].sum()
+    variance = float((weights[sampled] ** 2 * variances[sampled] / counts[sampled]).sum()
+                     + missing * missing * plain / trials)
+
+    estimate = EquityEstimate(float(weights @ means), int(trials), variance ** 0.5, confidence)
+    estimate.variance_gain = float(plain / trials / variance) if variance > 0 else None
+    fractions = np.where(sampled[:, None], strata / counts[:, None], strata.sum(axis=0) / trials)
+    estimate.win = float(weights @ fractions[:, 1])
+    estimate.tie = float(weights @ fractions[:, 2:].sum(axis=1))
+    estimate.loss = float(weights @ fractions[:, 0])
+    estimate.categories = {name: float(share) for name, share in zip(CATEGORY_NAMES, weights @ categories)}
+    estimate.outcomes = (trials * np.concatenate((weights @ fractions, weights @ categories))).tolist()
+    return estimate
+
+
+def estimate_from_pooled(estimates, confidence=0.95):
+    """
+    Pool independent unbiased estimates of the same spot, e.g. a
+    stratified run and trials carried over from the previous street.
+
+    Each estimate counts with its share of the trials, a weight that does
+    not depend on the results, so the pooled estimate stays unbiased.
+
+    :param estimates: EquityEstimates with trials and outcomes set
+    :return: EquityEstimate with win, tie, loss, categories, outcomes and
+             variance_gain (against plain sampling of all the trials) set
+    """
+    trials = sum(estimate.trials for estimate in estimates)
+    if trials <= 0:
+        return EquityEstimate(0.0, 0, 0.0, confidence)
+    shares = [estimate.trials / trials for estimate in estimates]
+    mean = sum(share * estimate for share, estimate in zip(shares, estimates))
+    variance = sum((share * estimate.std_error) ** 2 for share, estimate in zip(shares, estimates))
+    outcomes = np.sum([estimate.outcomes for estimate in estimates], axis=0)
+    num_opponents = len(outcomes) - 2 - len(CATEGORY_NAMES)
+    plain = estimate_from_outcomes(outcomes, num_opponents, confidence)
+    estimate = EquityEstimate(float(mean), trials, variance ** 0.5, confidence)
+    estimate.win = sum(share * part.win for share, part in zip(shares, estimates))
+    estimate.tie = sum(share * part.tie for share, part in zip(shares, estimates))
+    estimate.loss = sum(share * part.loss for share, part in zip(shares, estimates))
+    estimate.categories = plain.categories
+    estimate.outcomes = plain.outcomes
+    estimate.variance_gain = plain.std_error ** 2 / variance if variance > 0 else None
+    return estimate
@@ -0,0 +1,148 @@
+# project_folder/hand_history.py
+#
+# Streaming reader for hand-history archives. An archive holds hands in
+# either of two formats, which may be mixed:
+#
+# One JSON object per line:
+#     {"id": "1", "seats": [{"seat": 1, "cards": "AsKd"},
+#                           {"seat": 4, "cards": "QhQc", "folds": "turn"},
+#                           {"seat": 6, "folds": "preflop"}],
+#      "board": "2h7cJd5c9s", "all_in": "flop"}
+#
+# or a block of text lines ended by a blank line:
+#     Hand #1
+#     Seat 1: As Kd
+#     Seat 4: Qh Qc folds turn
+#     Seat 6: ?? folds preflop
+#     Board: 2h 7c Jd 5c 9s
+#     All-in: flop
+#
+# A seat without cards (or with "??") is unknown and gets random cards. A
+# seat that folds on a street takes part in the equity of that street but
+# not of the later ones. "all_in" names the street on which the money went
+# in, if it did. Lines starting with '#' outside a block are comments.
+#
+# Hands are read one at a time, so an archive of any size is read in
+# constant memory, and every hand comes with the byte offset just past it
+# so a reader can resume from there.
+
+import gzip
+import json
+
+from cards import parse_cards
+
+STREETS = ('preflop', 'flop', 'turn', 'river')
+BOARD_SIZES = (0, 3, 4, 5)
+
+
+def open_archive(path):
+    """
+    Open an archive for binary reading, decompressing .gz files.
+    """
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def iter_records(file, offset=0):
+    """
+    Split an archive into the raw text of its hands.
+
+    :param file: archive opened in binary mode
+    :param offset: byte offset to start at, from an earlier record
+    :return: generator of (record text, byte offset just past the record)
+    """
+    file.seek(offset)
+    block = []
+    for line in iter(file.readline, b''):
+        offset += len(line)
+        text = line.decode('utf-8').strip()
+        if block:
+            if text:
+                block.append(text)
+                continue
+            yield '\n'.join(block), offset
+            block = []
+        elif text.startswith('{'):
+            yield text, offset
+        elif text and not text.startswith('#'):
+            block.append(text)
+    if block:
+        yield '\n'.join(block), offset
+
+
+def parse_street(name):
+    """
+    :return: street index 0..3 from its name, or None for None
+    """
+    if name is None:
+        return None
+    try:
+        return STREETS.index(str(name).strip().lower())
+    except ValueError:
+        raise ValueError(f"Bad street: {name!r}") from None
+
+
+def parse_hand(record):
+    """
+    Read one hand from its JSON or text record.
+
+    :return: dict with 'id', 'seats' (list of dicts with 'seat', 'cards' as
+             two card indices or None, and 'folds' as a street index or None),
+             'board' (card indices) and 'all_in' (street index or None)
+    """
+    if record.startswith('{'):
+        hand = json.loads(record)
+        if not isinstance(hand, dict):
+            raise ValueError("A JSON hand must be an object")
+        seats = []
+        for position, seat in enumerate(hand.get('seats', ()), 1):
+            if not isinstance(seat, dict):
+                raise ValueError("Every seat must be an object")
+            cards = seat.get('cards')
+            seats.append({'seat': seat.get('seat', position), 'cards': parse_cards(cards) if cards else None,
+                          'folds': parse_street(seat.get('folds'))})
+        hand_id, board, all_in = hand.get('id'), hand.get('board', []), hand.get('all_in')
+    else:
+        hand_id, seats, board, all_in = None, [], [], None
+        for line in record.splitlines():
+            key, _, value = line.partition(':')
+            key = key.strip().lower()
+            if key.startswith('hand'):
+                hand_id = key[4:].strip(' #') or value.strip() or None
+            elif key.startswith('seat'):
+                words = value.split()
+                folds = None
+                if 'folds' in words:
+                    at = words.index('folds')
+                    folds = parse_street(' '.join(words[at + 1:]))
+                    words = words[:at]
+                cards = ''.join(words)
+                seats.append({'seat': int(key[4:]), 'cards': parse_cards(cards) if cards.strip('?') else None,
+                              'folds': folds})
+            elif key == 'board':
+                board = value
+            elif key == 'all-in':
+                all_in = value.strip() or None
+            else:
+                raise ValueError(f"Unknown hand history line: {line!r}")
+
+    board = parse_cards(board)
+    if len(board) not in BOARD_SIZES:
+        raise ValueError("The board must have 0, 3, 4 or 5 cards")
+    if any(seat['cards'] is not None and len(seat['cards']) != 2 for seat in seats):
+        raise ValueError("Every seat needs two hole cards or none")
+    known = board + [card for seat in seats if seat['cards'] for card in seat['cards']]
+    if len(set(known)) != len(known):
+        raise ValueError("A card is used twice")
+    return {'id': None if hand_id is None else str(hand_id), 'seats': seats, 'board': board,
+            'all_in': parse_street(all_in)}
+
+
+def iter_hands(path):
+    """
+    Read every hand of an archive lazily.
+
+    :return: generator of hand dicts (see parse_hand)
+    """
+    with open_archive(path) as file:
+        for record, _ in iter_records(file):
+            yield parse_hand(record)
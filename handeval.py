@@ -0,0 +1,205 @@
+# project_folder/handeval.py
+
+import numpy as np
+
+from cards import CARD_BITS
+
+# Hands are scored from the 52-bit card masks defined in cards.py, where
+# each suit occupies 13 consecutive bits (one per rank).
+
+NUM_RANKS = 13
+NUM_SUITS = 4
+RANK_MASK = (1 << NUM_RANKS) - 1
+
+HIGH_CARD = 0
+ONE_PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+NUM_CATEGORIES = STRAIGHT_FLUSH + 1
+
+CATEGORY_SHIFT = 26
+PRIMARY_SHIFT = 13
+
+CARD_MASKS = np.array(CARD_BITS, dtype=np.uint64)
+
+
+def _build_tables():
+    masks = np.arange(1 << NUM_RANKS, dtype=np.int64)
+
+    popcount = np.zeros_like(masks)
+    for rank in range(NUM_RANKS):
+        popcount += (masks >> rank) & 1
+
+    high_bit = np.zeros_like(masks)
+    for rank in range(NUM_RANKS):
+        high_bit[masks >= (1 << rank)] = 1 << rank
+
+    # straight_high[m] is 1 + index of the straight's top rank, 0 if none
+    straight_high = np.zeros_like(masks)
+    for top in range(NUM_RANKS - 1, 3, -1):
+        window = 0b11111 << (top - 4)
+        hit = (straight_high == 0) & ((masks & window) == window)
+        straight_high[hit] = top + 1
+    wheel = (1 << 12) | 0b1111
+    straight_high[(straight_high == 0) & ((masks & wheel) == wheel)] = 4
+
+    # top_bits[k][m] keeps only the k highest set bits of m
+    top_bits = {}
+    for keep in (1, 2, 3, 5):
+        kept = masks.copy()
+        count = popcount.copy()
+        for _ in range(NUM_RANKS):
+            over = count > keep
+            kept[over] &= kept[over] - 1
+            count[over] -= 1
+        top_bits[keep] = kept
+    return popcount, high_bit, straight_high, top_bits
+
+
+POPCOUNT, HIGH_BIT, STRAIGHT_HIGH, TOP_BITS = _build_tables()
+TOP1, TOP2, TOP3, TOP5 = TOP_BITS[1], TOP_BITS[2], TOP_BITS[3], TOP_BITS[5]
+
+# Plain Python copies of the tables for scoring one hand at a time, where
+# indexing a list of ints is much cheaper than indexing a numpy array
+_POPCOUNT = POPCOUNT.tolist()
+_HIGH_BIT = HIGH_BIT.tolist()
+_STRAIGHT_HIGH = STRAIGHT_HIGH.tolist()
+_TOP1 = TOP1.tolist()
+_TOP2 = TOP2.tolist()
+_TOP3 = TOP3.tolist()
+_TOP5 = TOP5.tolist()
+
+
+def hand_masks(cards):
+    """
+    Combine card indices into 52-bit hand masks.
+
+    :param cards: integer array of card indices, cards along the last axis
+    :return: uint64 array of masks with the last axis reduced
+    """
+    return np.bitwise_or.reduce(CARD_MASKS[cards], axis=-1)
+
+
+def evaluate_masks(masks):
+    """
+    Score hands given as 52-bit masks. Works for any hand of 5 to 7 cards.
+
+    Scores are comparable integers where a higher value is a stronger hand;
+    the hand category can be recovered with ``score >> CATEGORY_SHIFT``.
+
+    :param masks: uint64 array of hand masks (any shape)
+    :return: int64 array of scores with the same shape
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    rank_mask = np.uint64(RANK_MASK)
+    h = (masks & rank_mask).astype(np.int64)
+    d = ((masks >> np.uint64(13)) & rank_mask).astype(np.int64)
+    c = ((masks >> np.uint64(26)) & rank_mask).astype(np.int64)
+    s = ((masks >> np.uint64(39)) & rank_mask).astype(np.int64)
+
+    # Rank multiplicity masks: ranks held at least once, twice, three, four times
+    m1 = h | d | c | s
+    m2 = (h & d) | (h & c) | (h & s) | (d & c) | (d & s) | (c & s)
+    m3 = (h & d & c) | (h & d & s) | (h & c & s) | (d & c & s)
+    m4 = h & d & c & s
+
+    flush_mask = np.zeros_like(m1)
+    for suit_mask in (h, d, c, s):
+        flush_mask = np.where(POPCOUNT[suit_mask] >= 5, suit_mask, flush_mask)
+
+    trips = HIGH_BIT[m3]
+    full_pair = HIGH_BIT[m2 & ~trips]
+    pairs = POPCOUNT[m2]
+    straight = STRAIGHT_HIGH[m1]
+    straight_flush = STRAIGHT_HIGH[flush_mask]
+    top_pairs = TOP2[m2]
+
+    conditions = [
+        straight_flush > 0,
+        m4 > 0,
+        (m3 > 0) & (full_pair > 0),
+        flush_mask > 0,
+        straight > 0,
+        m3 > 0,
+        pairs >= 2,
+        pairs == 1,
+    ]
+    choices = [
+        (STRAIGHT_FLUSH << CATEGORY_SHIFT) | (straight_flush << PRIMARY_SHIFT),
+        (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (m4 << PRIMARY_SHIFT) | TOP1[m1 & ~m4],
+        (FULL_HOUSE << CATEGORY_SHIFT) | (trips << PRIMARY_SHIFT) | full_pair,
+        (FLUSH << CATEGORY_SHIFT) | (TOP5[flush_mask] << PRIMARY_SHIFT),
+        (STRAIGHT << CATEGORY_SHIFT) | (straight << PRIMARY_SHIFT),
+        (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips << PRIMARY_SHIFT) | TOP2[m1 & ~trips],
+        (TWO_PAIR << CATEGORY_SHIFT) | (top_pairs << PRIMARY_SHIFT) | TOP1[m1 & ~top_pairs],
+        (ONE_PAIR << CATEGORY_SHIFT) | (m2 << PRIMARY_SHIFT) | TOP3[m1 & ~m2],
+    ]
+    return np.select(conditions, choices, default=TOP5[m1])
+
+
+def evaluate_cards(cards):
+    """
+    Score hands given as card indices.
+
+    :param cards: integer array of card indices, cards along the last axis
+    :return: int64 array of scores (higher is better)
+    """
+    return evaluate_masks(hand_masks(np.asarray(cards)))
+
+
+def evaluate_mask(mask):
+    """
+    Score a single hand given as a 52-bit mask (Python int).
+
+    Same scores as evaluate_masks, computed with integer operations and
+    table lookups only, so nothing is allocated per call.
+
+    :param mask: hand mask, e.g. from cards.card_mask
+    :return: int score (higher is better)
+    """
+    h = mask & RANK_MASK
+    d = (mask >> 13) & RANK_MASK
+    c = (mask >> 26) & RANK_MASK
+    s = mask >> 39
+    m1 = h | d | c | s
+    m2 = (h & d) | (h & c) | (h & s) | (d & c) | (d & s) | (c & s)
+    m3 = (h & d & c) | (h & d & s) | (h & c & s) | (d & c & s)
+    m4 = h & d & c & s
+
+    if _POPCOUNT[h] >= 5:
+        flush = h
+    elif _POPCOUNT[d] >= 5:
+        flush = d
+    elif _POPCOUNT[c] >= 5:
+        flush = c
+    elif _POPCOUNT[s] >= 5:
+        flush = s
+    else:
+        flush = 0
+
+    if flush and _STRAIGHT_HIGH[flush]:
+        return (STRAIGHT_FLUSH << CATEGORY_SHIFT) | (_STRAIGHT_HIGH[flush] << PRIMARY_SHIFT)
+    if m4:
+        return (FOUR_OF_A_KIND << CATEGORY_SHIFT) | (m4 << PRIMARY_SHIFT) | _TOP1[m1 & ~m4]
+    if m3:
+        trips = _HIGH_BIT[m3]
+        full_pair = _HIGH_BIT[m2 & ~trips]
+        if full_pair:
+            return (FULL_HOUSE << CATEGORY_SHIFT) | (trips << PRIMARY_SHIFT) | full_pair
+    if flush:
+        return (FLUSH << CATEGORY_SHIFT) | (_TOP5[flush] << PRIMARY_SHIFT)
+    if _STRAIGHT_HIGH[m1]:
+        return (STRAIGHT << CATEGORY_SHIFT) | (_STRAIGHT_HIGH[m1] << PRIMARY_SHIFT)
+    if m3:
+        return (THREE_OF_A_KIND << CATEGORY_SHIFT) | (trips << PRIMARY_SHIFT) | _TOP2[m1 & ~trips]
+    if _POPCOUNT[m2] >= 2:
+        top_pairs = _TOP2[m2]
+        return (TWO_PAIR << CATEGORY_SHIFT) | (top_pairs << PRIMARY_SHIFT) | _TOP1[m1 & ~top_pairs]
+    if m2:
+        return (ONE_PAIR << CATEGORY_SHIFT) | (m2 << PRIMARY_SHIFT) | _TOP3[m1 & ~m2]
+    return _TOP5[m1]
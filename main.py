@@ -1,15 +1,119 @@
-import sys, os, random
+import sys
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
     QMessageBox, QDialog, QFormLayout, QSpinBox, QComboBox, QScrollArea,
-    QGridLayout, QCheckBox
+    QGridLayout, QCheckBox, QLineEdit
 )
-from PyQt5.QtGui import QPixmap, QIcon
-from PyQt5.QtCore import Qt
-from treys import Evaluator, Deck, Card
-from cards import Player, Flop
-from helpers import card_to_image_path, get_all_card_strings
-from probability import calculate_win_probability
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from card_images import BACK, card_icon, card_pixmap
+from cards import CARD_BITS, CARD_STRINGS, DISPLAY_ORDER, FULL_DECK_MASK, STRING_TO_INDEX, TREYS_TO_INDEX
+from parallel import default_workers, warm_pool
+import profiling
+from table_state import TableState
+
+# probability and ranges pull in numpy and the evaluator tables, so they are
+# imported where first needed (on the equity worker thread) rather than here,
+# keeping them off the path to the first paint of the window.
+
+# Stage probabilities, and every seat's equity when opponents hold ranges,
+# are simulated until their 95% confidence interval is this narrow, or
+# until the time budget (seconds) runs out
+TARGET_HALF_WIDTH = 0.005
+TIME_BUDGET = 5.0
+# Stratify flop and turn simulations (1.3x to 3x fewer trials); a turn or
+# river run still starts from the previous street's trials that dealt its card
+VARIANCE_REDUCTION = True
+
+# Card sizes in pixels: the hero and community cards, and the small ones in
+# the available cards grid and the selection dialog
+CARD_SIZE = (100, 145)
+SMALL_CARD_SIZE = (40, 60)
+
+# Frames marking the next cards in the available cards grid: clean and
+# tainted outs, and cards that cut the hero's equity (see outs.py)
+OUT_STYLES = {'clean out': "border: 2px solid #2e7d32;", 'tainted out': "border: 2px solid #f9a825;",
+              'bad card': "border: 2px solid #c62828;"}
+
+RANGE_TOOLTIP = 'Hand range, e.g. "22+, A2s+, KTo+" or "QQ+, AKs:0.5".\nLeave empty for random cards.'
+
+# --- Background equity computation ---
+class EquityWorker(QThread):
+    """
+    Runs one equity computation off the GUI thread, reporting refined
+    estimates as batches complete. cancel() stops it at the next batch.
+    Opponent ranges are given as text and parsed here; a seat whose range
+    does not parse plays random cards. Results go to the persistent equity
+    store, so spots seen in earlier sessions come back at once; flop and
+    turn spots against random opponents are still run, for their outs.
+    """
+    progress = pyqtSignal(object, bool)  # EquityEstimate, finished
+    failed = pyqtSignal(str)  # why the spot cannot be computed
+
+    def __init__(self, label, title, hero_cards, community_cards, num_opponents, opponent_ranges=None,
+                 previous=None, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self.title = title
+        self.hero_cards = list(hero_cards)
+        self.community_cards = list(community_cards)
+        self.num_opponents = num_opponents
+        self.opponent_ranges = opponent_ranges
+        self.previous = previous  # latest estimate of the previous street, to start from
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def parsed_ranges(self):
+        from ranges import range_weights
+
+        opponent_ranges = []
+        for text in self.opponent_ranges or ():
+            try:
+                opponent_ranges.append(range_weights(text))
+            except ValueError:
+                opponent_ranges.append(None)
+        return opponent_ranges
+
+    def estimates(self):
+        from equity_store import get_store
+        from probability import iter_win_probability
+
+        return iter_win_probability(self.hero_cards, self.community_cards, self.num_opponents,
+                                    workers=default_workers(), ci_halfwidth=TARGET_HALF_WIDTH, time_budget=TIME_BUDGET,
+                                    opponent_ranges=self.parsed_ranges(), previous=self.previous,
+                                    variance_reduction=VARIANCE_REDUCTION, store=get_store(),
+                                    need_next_cards=True)
+
+    def run(self):
+        estimates = self.estimates()
+        try:
+            for estimate, done in estimates:
+                if self._cancelled:
+                    estimates.close()
+                    return
+                self.progress.emit(estimate, done)
+        except ValueError as e:
+            self.failed.emit(str(e))
+
+
+class TableEquityWorker(EquityWorker):
+    """
+    Equity of every seat still in the hand from one shared simulation:
+    the hero's known cards against the opponents' random cards or ranges.
+    Progress carries a list of estimates, the hero's first, which is shown
+    as the stage probability.
+    """
+
+    def estimates(self):
+        from probability import iter_table_equity
+
+        seats = [[TREYS_TO_INDEX[card] for card in self.hero_cards]] + [None] * self.num_opponents
+        board = [TREYS_TO_INDEX[card] for card in self.community_cards]
+        return iter_table_equity(seats, board, workers=default_workers(), ci_halfwidth=TARGET_HALF_WIDTH,
+                                 time_budget=TIME_BUDGET, ranges=[None] + self.parsed_ranges())
+
+# --- End background equity computation ---
 
 # --- CardImageSelectionDialog with improved selection UI ---
 class CardImageSelectionDialog(QDialog):
@@ -22,9 +126,7 @@ class CardImageSelectionDialog(QDialog):
         self.init_ui(prompt)
 
     def sort_cards_by_suit(self, cards):
-        suit_order = {'h': 0, 'd': 1, 'c': 2, 's': 3}
-        rank_order = {r: i for i, r in enumerate("23456789TJQKA", start=2)}
-        return sorted(cards, key=lambda x: (suit_order.get(x[-1], 99), rank_order.get(x[0], 99)))
+        return sorted(cards, key=lambda card: (STRING_TO_INDEX[card] & 3, STRING_TO_INDEX[card] >> 2))
 
     def init_ui(self, prompt):
         main_layout = QVBoxLayout()
@@ -43,8 +145,8 @@ class CardImageSelectionDialog(QDialog):
         for card in self.available_cards:
             btn = QPushButton()
             btn.setCheckable(True)
-            btn.setFixedSize(40, 60)
-            btn.setIcon(QIcon(os.path.join("graphics", "cards", f"{card}.png")))
+            btn.setFixedSize(*SMALL_CARD_SIZE)
+            btn.setIcon(card_icon(STRING_TO_INDEX[card], *SMALL_CARD_SIZE))
             btn.setIconSize(btn.size())
             # Set stylesheet to show a yellow border when checked
             btn.setStyleSheet("""
@@ -116,19 +218,16 @@ class PokerUI(QWidget):
         self.num_players = num_players
         self.manual_mode = manual_mode
         self.current_step = 0  # 0: hero, 1: flop, 2: turn, 3: river
-        self.used_cards = set()  # track already selected card strings
         self.setWindowTitle("Poker Win Probability Calculator")
         self.setGeometry(100, 100, 1100, 700)
         self.setStyleSheet("background-color: #35654d")
-        self.deck = Deck()
-        self.evaluator = Evaluator()
         self.num_opponents = self.num_players - 1
-        self.players = [Player() for _ in range(self.num_players)]
-        self.flop = Flop()
-        self.turn = []
-        self.river = []
+        self.table = TableState(self.num_players)  # the hero is seat 0
+        self.equity_workers = {}  # probability label -> its latest EquityWorker
+        self.latest_estimate = None  # newest estimate shown, reused when the next street comes
+        self.available_card_labels = {}  # card index -> its label in the available cards grid
         self.init_ui()
-        self.update_available_cards_display()
+        # Both setups fill the available cards grid themselves
         if self.manual_mode:
             self.setup_manual_mode()
         else:
@@ -153,7 +252,7 @@ class PokerUI(QWidget):
         hero_layout.addWidget(hero_label)
         self.hero_card_labels = [QLabel(), QLabel()]
         for label in self.hero_card_labels:
-            label.setFixedSize(100, 145)
+            label.setFixedSize(*CARD_SIZE)
             label.setScaledContents(True)
             hero_layout.addWidget(label)
         main_layout.addLayout(hero_layout)
@@ -165,10 +264,10 @@ class PokerUI(QWidget):
         self.community_card_labels = []
         for _ in range(5):
             label = QLabel()
-            label.setFixedSize(100, 145)
+            label.setFixedSize(*CARD_SIZE)
             label.setScaledContents(True)
             label.setStyleSheet("border: 1px solid black;")
-            placeholder = QPixmap("graphics/cards/back.png")
+            placeholder = card_pixmap(BACK, *CARD_SIZE)
             if placeholder.isNull():
                 label.setStyleSheet("border: 1px solid black; background-color: gray;")
             else:
@@ -176,20 +275,18 @@ class PokerUI(QWidget):
             self.community_card_labels.append(label)
             community_layout.addWidget(label)
         main_layout.addLayout(community_layout)
-        # Opponents folded control (as checkboxes)
+        # Opponents folded control (as checkboxes) with a hand range under each
         fold_layout = QHBoxLayout()
-        fold_label = QLabel("Folded Opponents:")
-        fold_label.setStyleSheet("font-size: 14px; font-weight: bold; color: white;")
-        fold_layout.addWidget(fold_label)
-        self.fold_checkboxes = []
-        # Create a checkbox for each opponent (players 2..num_players)
-        for i in range(2, self.num_players+1):
-            cb = QCheckBox(f"Player {i}")
-            cb.setStyleSheet("color: white;")
-            cb.stateChanged.connect(self.calculate_and_display_probabilities)
-            self.fold_checkboxes.append(cb)
-            fold_layout.addWidget(cb)
+        self.fold_label = QLabel("Folded Opponents:\nRanges:\nEquity:")
+        self.fold_label.setStyleSheet("font-size: 14px; font-weight: bold; color: white;")
+        fold_layout.addWidget(self.fold_label)
+        self.seat_layout = QGridLayout()
+        fold_layout.addLayout(self.seat_layout)
         main_layout.addLayout(fold_layout)
+        self.fold_checkboxes = []
+        self.range_edits = []
+        self.seat_equity_labels = []
+        self.build_seat_controls()
         # Probabilities display
         prob_layout = QVBoxLayout()
         self.preflop_label = QLabel("Pre-Flop Win Probability: N/A")
@@ -236,6 +333,19 @@ class PokerUI(QWidget):
         self.available_cards_widget = QWidget()
         self.available_cards_layout = QGridLayout()
         self.available_cards_widget.setLayout(self.available_cards_layout)
+        # One slot per card (row: suit, column: rank), shown while the card
+        # is available; hidden slots keep their space so nothing reflows
+        self.available_card_slots = []
+        for card in range(52):
+            lbl = QLabel()
+            lbl.setFixedSize(*SMALL_CARD_SIZE)
+            lbl.setPixmap(card_pixmap(card, *SMALL_CARD_SIZE))
+            policy = lbl.sizePolicy()
+            policy.setRetainSizeWhenHidden(True)
+            lbl.setSizePolicy(policy)
+            lbl.hide()
+            self.available_card_slots.append(lbl)
+            self.available_cards_layout.addWidget(lbl, card & 3, card >> 2)
         self.available_cards_area.setWidget(self.available_cards_widget)
         main_layout.addWidget(QLabel("Available Cards:"))
         main_layout.addWidget(self.available_cards_area)
@@ -249,74 +359,115 @@ class PokerUI(QWidget):
             self.manual_mode = manual_mode
             self.num_opponents = self.num_players - 1
             self.config_label.setText(f"Players: {self.num_players} | Mode: {'Manual' if self.manual_mode else 'Random'}")
-            # Rebuild opponent fold checkboxes
-            for cb in self.fold_checkboxes:
-                cb.setParent(None)
-            self.fold_checkboxes = []
-            for i in range(2, self.num_players+1):
-                cb = QCheckBox(f"Player {i}")
-                cb.setStyleSheet("color: white;")
-                cb.stateChanged.connect(self.calculate_and_display_probabilities)
-                self.fold_checkboxes.append(cb)
+            self.build_seat_controls()
             self.reset_game()
 
-    def update_available_cards_display(self):
-        for i in reversed(range(self.available_cards_layout.count())):
-            widget = self.available_cards_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        if self.manual_mode:
-            all_cards = get_all_card_strings()
-            available = [card for card in all_cards if card not in self.used_cards]
+    def build_seat_controls(self):
+        """
+        (Re)create the fold checkbox, range field and equity label of every
+        opponent (players 2..num_players). An empty range means random cards.
+        """
+        for widget in self.fold_checkboxes + self.range_edits + self.seat_equity_labels:
+            widget.setParent(None)
+        self.fold_checkboxes = []
+        self.range_edits = []
+        self.seat_equity_labels = []
+        for i in range(2, self.num_players+1):
+            cb = QCheckBox(f"Player {i}")
+            cb.setStyleSheet("color: white;")
+            cb.stateChanged.connect(self.calculate_and_display_probabilities)
+            edit = QLineEdit()
+            edit.setPlaceholderText("random")
+            edit.setToolTip(RANGE_TOOLTIP)
+            edit.setStyleSheet("background-color: white;")
+            edit.editingFinished.connect(self.on_range_edited)
+            self.fold_checkboxes.append(cb)
+            self.range_edits.append(edit)
+            self.seat_layout.addWidget(cb, 0, i - 2)
+            self.seat_layout.addWidget(edit, 1, i - 2)
+            equity_label = QLabel("N/A")
+            equity_label.setStyleSheet("color: white;")
+            self.seat_equity_labels.append(equity_label)
+            self.seat_layout.addWidget(equity_label, 2, i - 2)
+
+    def on_range_edited(self):
+        edit = self.sender()
+        if not edit.isModified():
+            return  # focus left the field without a change
+        edit.setModified(False)
+        from ranges import range_weights
+        try:
+            range_weights(edit.text())
+        except ValueError as e:
+            edit.setStyleSheet("background-color: #ffb3b3;")
+            edit.setToolTip(f"{e}; this seat plays random cards until the range is fixed.")
         else:
-            available = [Card.int_to_pretty_str(c).strip("[]") for c in self.deck.cards]
-        suit_order = {'h': 0, 'd': 1, 'c': 2, 's': 3}
-        rank_order = {r: i for i, r in enumerate("23456789TJQKA", start=2)}
-        available = sorted(available, key=lambda x: (suit_order.get(x[-1], 99), rank_order.get(x[0], 99)))
-        col = 0
-        row = 0
-        for card_str in available:
-            lbl = QLabel()
-            lbl.setFixedSize(40, 60)
-            lbl.setScaledContents(True)
-            pixmap = QPixmap(os.path.join("graphics", "cards", f"{card_str}.png"))
-            if pixmap.isNull():
-                pixmap = QPixmap("graphics/cards/back.png")
-            lbl.setPixmap(pixmap)
-            self.available_cards_layout.addWidget(lbl, row, col)
-            col += 1
-            if col >= 13:
-                col = 0
-                row += 1
+            edit.setStyleSheet("background-color: white;")
+            edit.setToolTip(RANGE_TOOLTIP)
+        self.calculate_and_display_probabilities()
+
+    def opponent_ranges(self):
+        """
+        Range texts of the opponents still in the hand, None for a seat with
+        no range. The equity worker parses them.
+        """
+        return [edit.text().strip() or None
+                for cb, edit in zip(self.fold_checkboxes, self.range_edits) if not cb.isChecked()]
+
+    def hero_cards(self):
+        """
+        The hero's hole cards as treys integers, for the equity workers.
+        """
+        return TableState.treys(self.table.seat_cards(0))
+
+    def community_cards(self):
+        return TableState.treys(self.table.board())
+
+    def clear_next_card_equity(self):
+        """
+        Remove the out frames and equity tooltips from the available cards.
+        """
+        for lbl in self.available_card_slots:
+            lbl.setToolTip("")
+            lbl.setStyleSheet("")
+
+    @profiling.instrument('ui.update_available_cards_display', 'ui', sample=True)
+    def update_available_cards_display(self):
+        available_mask = FULL_DECK_MASK & ~self.table.used_mask
+        self.available_card_labels = {}
+        self.clear_next_card_equity()  # it belongs to the previous street
+        for card, lbl in enumerate(self.available_card_slots):
+            if available_mask & CARD_BITS[card]:
+                self.available_card_labels[card] = lbl
+                lbl.show()
+            else:
+                lbl.hide()
 
     def setup_manual_mode(self):
         self.deal_flop_btn.hide()
         self.deal_turn_btn.hide()
         self.deal_river_btn.hide()
         self.next_step_btn.show()
-        self.used_cards = set()
         self.current_step = 0
         self.manual_next_step()
         self.update_available_cards_display()
 
+    @profiling.instrument('ui.manual_next_step', 'ui', sample=True, slot=True)
     def manual_next_step(self):
-        all_cards = get_all_card_strings()
-        available = [card for card in all_cards if card not in self.used_cards]
+        available = [CARD_STRINGS[card] for card in DISPLAY_ORDER if not self.table.used_mask & CARD_BITS[card]]
         if self.current_step == 0:
             dlg = CardImageSelectionDialog("Select Hero Hand", "Select 2 cards for Hero Hand:", 2, available, self)
             if dlg.exec_() == QDialog.Accepted:
                 selected = dlg.get_selected_cards()
                 try:
-                    hero_cards = [Card.new(card) for card in selected]
-                except Exception as e:
+                    self.table.deal_seat(0, [STRING_TO_INDEX[card] for card in selected])
+                except (KeyError, ValueError) as e:
                     QMessageBox.warning(self, "Error", f"Card conversion error: {str(e)}")
                     return
-                self.players[0].cards = hero_cards
-                self.used_cards.update(selected)
+                hero_cards = self.hero_cards()
                 self.update_card_labels(self.hero_card_labels, hero_cards)
                 effective_opponents = self.num_opponents - self.fold_count()
-                prob = calculate_win_probability(hero_cards, [], effective_opponents, self.evaluator, num_simulations=10000)
-                self.preflop_label.setText(f"Pre-Flop Win Probability: {prob:.4f}")
+                self.start_probability(self.preflop_label, "Pre-Flop Win Probability", hero_cards, [], effective_opponents)
                 self.current_step = 1
                 self.update_available_cards_display()
         elif self.current_step == 1:
@@ -324,17 +475,15 @@ class PokerUI(QWidget):
             if dlg.exec_() == QDialog.Accepted:
                 selected = dlg.get_selected_cards()
                 try:
-                    flop_cards = [Card.new(card) for card in selected]
-                except Exception as e:
+                    self.table.deal_board(3, [STRING_TO_INDEX[card] for card in selected])
+                except (KeyError, ValueError) as e:
                     QMessageBox.warning(self, "Error", f"Card conversion error: {str(e)}")
                     return
-                self.flop.cards = flop_cards
-                self.used_cards.update(selected)
+                flop_cards = self.community_cards()
                 self.update_card_labels(self.community_card_labels, flop_cards, start=0)
-                hero_cards = self.players[0].cards
+                hero_cards = self.hero_cards()
                 effective_opponents = self.num_opponents - self.fold_count()
-                prob = calculate_win_probability(hero_cards, flop_cards, effective_opponents, self.evaluator, num_simulations=10000)
-                self.postflop_label.setText(f"Post-Flop Win Probability: {prob:.4f}")
+                self.start_probability(self.postflop_label, "Post-Flop Win Probability", hero_cards, flop_cards, effective_opponents)
                 self.current_step = 2
                 self.update_available_cards_display()
         elif self.current_step == 2:
@@ -342,18 +491,15 @@ class PokerUI(QWidget):
             if dlg.exec_() == QDialog.Accepted:
                 selected = dlg.get_selected_cards()
                 try:
-                    turn_card = Card.new(selected[0])
-                except Exception as e:
+                    self.table.deal_board(1, [STRING_TO_INDEX[selected[0]]])
+                except (KeyError, ValueError) as e:
                     QMessageBox.warning(self, "Error", f"Card conversion error: {str(e)}")
                     return
-                self.turn = [turn_card]
-                self.used_cards.update(selected)
-                self.update_card_labels(self.community_card_labels, self.turn, start=3)
-                hero_cards = self.players[0].cards
-                community = self.flop.cards + self.turn
+                community = self.community_cards()
+                self.update_card_labels(self.community_card_labels, community[3:], start=3)
+                hero_cards = self.hero_cards()
                 effective_opponents = self.num_opponents - self.fold_count()
-                prob = calculate_win_probability(hero_cards, community, effective_opponents, self.evaluator, num_simulations=10000)
-                self.after_turn_label.setText(f"After Turn Win Probability: {prob:.4f}")
+                self.start_probability(self.after_turn_label, "After Turn Win Probability", hero_cards, community, effective_opponents)
                 self.current_step = 3
                 self.update_available_cards_display()
         elif self.current_step == 3:
@@ -361,18 +507,15 @@ class PokerUI(QWidget):
             if dlg.exec_() == QDialog.Accepted:
                 selected = dlg.get_selected_cards()
                 try:
-                    river_card = Card.new(selected[0])
-                except Exception as e:
+                    self.table.deal_board(1, [STRING_TO_INDEX[selected[0]]])
+                except (KeyError, ValueError) as e:
                     QMessageBox.warning(self, "Error", f"Card conversion error: {str(e)}")
                     return
-                self.river = [river_card]
-                self.used_cards.update(selected)
-                self.update_card_labels(self.community_card_labels, self.river, start=4)
-                hero_cards = self.players[0].cards
-                community = self.flop.cards + self.turn + self.river
+                community = self.community_cards()
+                self.update_card_labels(self.community_card_labels, community[4:], start=4)
+                hero_cards = self.hero_cards()
                 effective_opponents = self.num_opponents - self.fold_count()
-                prob = calculate_win_probability(hero_cards, community, effective_opponents, self.evaluator, num_simulations=10000)
-                self.after_river_label.setText(f"After River Win Probability: {prob:.4f}")
+                self.start_probability(self.after_river_label, "After River Win Probability", hero_cards, community, effective_opponents)
                 self.current_step = 4
                 self.next_step_btn.setEnabled(False)
                 QMessageBox.information(self, "Manual Mode Complete", "Manual input complete.")
@@ -382,56 +525,57 @@ class PokerUI(QWidget):
         return sum(1 for cb in self.fold_checkboxes if cb.isChecked())
 
     # --- Random mode functions ---
+    @profiling.instrument('ui.deal_initial', 'ui', sample=True)
     def deal_initial(self):
-        hero = self.players[0]
-        hero.cards = self.deck.draw(2)
-        self.update_card_labels(self.hero_card_labels, hero.cards)
-        self.calculate_and_display_probabilities()
+        self.table.deal_seat(0)
+        self.update_card_labels(self.hero_card_labels, self.hero_cards())
         self.update_available_cards_display()
+        # Start the equity once the event loop runs, so the window paints first
+        QTimer.singleShot(0, self.calculate_and_display_probabilities)
 
+    @profiling.instrument('ui.deal_flop', 'ui', sample=True, slot=True)
     def deal_flop(self):
-        if self.flop.cards:
+        if self.table.board_count():
             QMessageBox.warning(self, "Warning", "Flop already dealt!")
             return
-        self.flop.generate_flop(self.deck)
-        self.update_card_labels(self.community_card_labels, self.flop.cards, start=0)
+        self.table.deal_board(3)
+        self.update_card_labels(self.community_card_labels, self.community_cards(), start=0)
         self.calculate_and_display_probabilities()
         self.update_available_cards_display()
 
+    @profiling.instrument('ui.deal_turn', 'ui', sample=True, slot=True)
     def deal_turn(self):
-        if not self.flop.cards:
+        if self.table.board_count() < 3:
             QMessageBox.warning(self, "Warning", "Deal the flop first!")
             return
-        if self.turn:
+        if self.table.board_count() > 3:
             QMessageBox.warning(self, "Warning", "Turn already dealt!")
             return
-        self.turn = self.deck.draw(1)
-        self.update_card_labels(self.community_card_labels, self.turn, start=3)
+        self.table.deal_board(1)
+        self.update_card_labels(self.community_card_labels, self.community_cards()[3:], start=3)
         self.calculate_and_display_probabilities()
         self.update_available_cards_display()
 
+    @profiling.instrument('ui.deal_river', 'ui', sample=True, slot=True)
     def deal_river(self):
-        if not self.turn:
+        if self.table.board_count() < 4:
             QMessageBox.warning(self, "Warning", "Deal the turn first!")
             return
-        if self.river:
+        if self.table.board_count() > 4:
             QMessageBox.warning(self, "Warning", "River already dealt!")
             return
-        self.river = self.deck.draw(1)
-        self.update_card_labels(self.community_card_labels, self.river, start=4)
+        self.table.deal_board(1)
+        self.update_card_labels(self.community_card_labels, self.community_cards()[4:], start=4)
         self.calculate_and_display_probabilities()
         self.update_available_cards_display()
     # --- End Random mode functions ---
 
+    @profiling.instrument('ui.reset_game', 'ui', sample=True, slot=True)
     def reset_game(self):
-        self.deck = Deck()
-        self.evaluator = Evaluator()
-        self.players = [Player() for _ in range(self.num_players)]
-        self.flop = Flop()
-        self.turn = []
-        self.river = []
+        self.cancel_probabilities()
+        self.latest_estimate = None
+        self.table = TableState(self.num_players)
         self.current_step = 0
-        self.used_cards = set()
         for cb in self.fold_checkboxes:
             cb.setChecked(False)
         self.clear_card_labels()
@@ -445,52 +589,202 @@ class PokerUI(QWidget):
     def update_card_labels(self, labels, cards, start=0):
         for i, card in enumerate(cards):
             if start + i < len(labels):
-                pixmap = QPixmap(card_to_image_path(card))
-                if pixmap.isNull():
-                    pixmap = QPixmap("graphics/cards/back.png")
-                labels[start + i].setPixmap(pixmap)
+                labels[start + i].setPixmap(card_pixmap(TREYS_TO_INDEX[card], *CARD_SIZE))
 
     def clear_card_labels(self):
         for label in self.hero_card_labels:
             label.clear()
         for label in self.community_card_labels:
-            placeholder = QPixmap("graphics/cards/back.png")
-            label.setPixmap(placeholder)
+            label.setPixmap(card_pixmap(BACK, *CARD_SIZE))
 
     def calculate_and_display_probabilities(self):
-        hero = self.players[0]
-        hero_cards = hero.cards
-        community_cards = self.flop.cards + self.turn + self.river
+        hero_cards = self.hero_cards()
+        community_cards = self.community_cards()
         effective_opponents = self.num_opponents - self.fold_count()
         if effective_opponents < 0:
             effective_opponents = 0
-        if not self.flop.cards and not self.turn and not self.river:
-            preflop_prob = calculate_win_probability(hero_cards, [], effective_opponents, self.evaluator, num_simulations=10000)
-            self.preflop_label.setText(f"Pre-Flop Win Probability: {preflop_prob:.4f}")
+        if not community_cards:
+            self.start_probability(self.preflop_label, "Pre-Flop Win Probability", hero_cards, [], effective_opponents)
             self.postflop_label.setText("Post-Flop Win Probability: N/A")
             self.after_turn_label.setText("After Turn Win Probability: N/A")
             self.after_river_label.setText("After River Win Probability: N/A")
             return
-        if len(self.flop.cards) >= 3 and not self.turn and not self.river:
-            postflop_prob = calculate_win_probability(hero_cards, self.flop.cards, effective_opponents, self.evaluator, num_simulations=10000)
-            self.postflop_label.setText(f"Post-Flop Win Probability: {postflop_prob:.4f}")
+        if len(community_cards) == 3:
+            self.start_probability(self.postflop_label, "Post-Flop Win Probability", hero_cards, community_cards, effective_opponents)
             self.after_turn_label.setText("After Turn Win Probability: N/A")
             self.after_river_label.setText("After River Win Probability: N/A")
             return
-        if len(self.flop.cards) >= 3 and len(self.turn) == 1 and not self.river:
-            community_after_turn = self.flop.cards + self.turn
-            after_turn_prob = calculate_win_probability(hero_cards, community_after_turn, effective_opponents, self.evaluator, num_simulations=10000)
-            self.after_turn_label.setText(f"After Turn Win Probability: {after_turn_prob:.4f}")
+        if len(community_cards) == 4:
+            self.start_probability(self.after_turn_label, "After Turn Win Probability", hero_cards, community_cards, effective_opponents)
             self.after_river_label.setText("After River Win Probability: N/A")
             return
-        if len(self.flop.cards) >= 3 and len(self.turn) == 1 and len(self.river) == 1:
-            community_full = self.flop.cards + self.turn + self.river
-            after_river_prob = calculate_win_probability(hero_cards, community_full, effective_opponents, self.evaluator, num_simulations=10000)
-            self.after_river_label.setText(f"After River Win Probability: {after_river_prob:.4f}")
+        if len(community_cards) == 5:
+            self.start_probability(self.after_river_label, "After River Win Probability", hero_cards, community_cards, effective_opponents)
             return
 
+    def start_probability(self, label, title, hero_cards, community_cards, num_opponents):
+        """
+        Compute a stage probability in the background and show it in `label`,
+        with every opponent's equity under their seat controls. A newer
+        request for the same label cancels the one still running.
+
+        Opponents with random cards share what the hero does not win
+        evenly, so their equity follows from the hero's. Once an opponent
+        holds a range the seat view needs a run of its own: one table
+        simulation then gives every seat, the hero's label included.
+        """
+        previous = self.equity_workers.get(label)
+        if previous is not None:
+            previous.cancel()
+        opponent_ranges = self.opponent_ranges()
+        if any(opponent_ranges):
+            worker = TableEquityWorker(label, title, hero_cards, community_cards, num_opponents, opponent_ranges,
+                                       parent=self)
+            worker.progress.connect(self.on_seat_equity_progress)
+            worker.failed.connect(self.on_seat_equity_failed)
+            # Table runs give no breakdown by next card to repaint the grid with
+            self.clear_next_card_equity()
+        else:
+            worker = EquityWorker(label, title, hero_cards, community_cards, num_opponents, opponent_ranges,
+                                  self.latest_estimate, parent=self)
+            worker.progress.connect(self.on_probability_progress)
+            worker.failed.connect(self.on_probability_failed)
+        worker.finished.connect(worker.deleteLater)
+        self.equity_workers[label] = worker
+        label.setText(f"{title}: calculating...")
+        for cb, equity_label in zip(self.fold_checkboxes, self.seat_equity_labels):
+            equity_label.setText("folded" if cb.isChecked() else "...")
+            equity_label.setToolTip("")
+        worker.start()
+
+    def active_seat_labels(self):
+        return [equity_label for cb, equity_label in zip(self.fold_checkboxes, self.seat_equity_labels)
+                if not cb.isChecked()]
+
+    @profiling.instrument('ui.on_seat_equity_progress', 'ui', slot=True)
+    def on_seat_equity_progress(self, estimates, done):
+        worker = self.sender()
+        if self.equity_workers.get(worker.label) is not worker:
+            return
+        self.show_probability(worker, estimates[0], done)
+        if worker.community_cards != self.community_cards():
+            return
+        self.latest_estimate = estimates[0]
+        for equity_label, estimate in zip(self.active_seat_labels(), estimates[1:]):
+            equity_label.setText(f"{estimate:.1%}")
+            equity_label.setToolTip(f"Win {estimate.win:.1%}, tie {estimate.tie:.1%}, lose {estimate.loss:.1%}\n"
+                                    f"\u00b1 {estimate.half_width:.1%} ({estimate.trials} trials)")
+
+    def on_seat_equity_failed(self, message):
+        if self.equity_workers.get(self.sender().label) is not self.sender():
+            return
+        self.on_probability_failed(message)
+        for equity_label in self.active_seat_labels():
+            equity_label.setText("N/A")
+            equity_label.setToolTip(message)
+
+    @profiling.instrument('ui.on_probability_progress', 'ui', slot=True)
+    def on_probability_progress(self, estimate, done):
+        worker = self.sender()
+        if self.equity_workers.get(worker.label) is not worker:
+            return  # a newer request replaced this one
+        self.show_probability(worker, estimate, done)
+        # A street still refining after the next card came only updates its own label
+        if worker.community_cards != self.community_cards():
+            return
+        self.latest_estimate = estimate
+        active = self.active_seat_labels()
+        for equity_label in active:
+            equity_label.setText(f"{(1 - estimate) / len(active):.1%}")
+            equity_label.setToolTip(f"Random cards: an even share of the {1 - estimate:.1%} of the pot\n"
+                                    f"the hero does not win, \u00b1 {estimate.half_width / len(active):.1%}")
+
+    def show_probability(self, worker, estimate, done):
+        """
+        Show the hero's estimate in the worker's label; a finished one also
+        gets its tooltip and the next card equities.
+        """
+        if estimate.method == 'exact' or estimate.method == 'trivial':
+            text = f"{worker.title}: {estimate:.4f} (exact)"
+        else:
+            text = f"{worker.title}: {estimate:.4f} \u00b1 {estimate.half_width:.4f}"
+        if done:
+            del self.equity_workers[worker.label]
+            self.show_next_card_equity(worker, estimate)
+        else:
+            text += f" (refining, {estimate.trials} trials)"
+        worker.label.setText(text)
+
+    def show_next_card_equity(self, worker, estimate):
+        """
+        Put the win/tie split, the variance reduction and the hero's hand
+        distribution in the tooltip of the label, followed by the outs and the equity by next
+        card, a by-product of the flop and turn estimates. While the board
+        is still the one the worker ran on, the available cards get their
+        equity in their tooltips and a frame when they are an out or a bad
+        card.
+        """
+        from outs import analyse_outs
+
+        summary = []
+        if estimate.win is not None:
+            summary.append(f"Win {estimate.win:.1%}, tie {estimate.tie:.1%}, lose {estimate.loss:.1%}")
+        if estimate.variance_gain is not None:
+            summary.append(f"Stratified: {estimate.variance_gain:.1f}x fewer trials than plain sampling")
+        if estimate.categories is not None:
+            summary += [f"{name}: {share:.1%}" for name, share in estimate.categories.items() if share > 0]
+        hero = [TREYS_TO_INDEX[card] for card in worker.hero_cards]
+        board = [TREYS_TO_INDEX[card] for card in worker.community_cards]
+        report = analyse_outs(estimate, hero, board)
+        if report is None:
+            worker.label.setToolTip("\n".join(summary))
+            return
+        by_card = report.by_card
+        kinds = dict.fromkeys(report.clean_outs, 'clean out')
+        kinds.update(dict.fromkeys(report.tainted_outs, 'tainted out'))
+        kinds.update(dict.fromkeys(report.bad_cards, 'bad card'))
+        street = "Turn" if len(board) == 3 else "River"
+        current = board == self.table.board()
+        for card, lbl in self.available_card_labels.items():
+            if current and card in by_card:
+                kind = kinds.get(card)
+                lbl.setStyleSheet(OUT_STYLES.get(kind, ""))
+                lbl.setToolTip(f"{street} {CARD_STRINGS[card]}: {by_card[card]:.3f} "
+                               f"({report.change[card]:+.3f}{', ' + kind if kind else ''})\n"
+                               f"\u00b1 {by_card[card].half_width:.3f} ({by_card[card].trials} trials)")
+        summary.append(f"Outs: {len(report.outs)} ({len(report.clean_outs)} clean, "
+                       f"{len(report.tainted_outs)} tainted), bad cards: {len(report.bad_cards)}")
+        ranked = sorted(by_card.items(), key=lambda item: item[1], reverse=True)
+        lines = [f"{CARD_STRINGS[card]} {value:.3f}" for card, value in ranked]
+        summary.append(f"Equity by {street.lower()} card:")
+        summary += ["   ".join(lines[start:start + 6]) for start in range(0, len(lines), 6)]
+        worker.label.setToolTip("\n".join(summary))
+
+    def on_probability_failed(self, message):
+        worker = self.sender()
+        if self.equity_workers.get(worker.label) is not worker:
+            return
+        del self.equity_workers[worker.label]
+        worker.label.setText(f"{worker.title}: N/A ({message})")
+
+    def cancel_probabilities(self):
+        for worker in self.equity_workers.values():
+            worker.cancel()
+        self.equity_workers = {}
+
+    def closeEvent(self, event):
+        self.cancel_probabilities()
+        for worker in self.findChildren(EquityWorker):
+            worker.cancel()
+            worker.wait()
+        super().closeEvent(event)
+
 class PokerApp:
     def __init__(self):
+        # Simulations run on the shared process pool. Its workers are forked
+        # now, before Qt starts any threads, rather than on the first deal.
+        if default_workers() > 1:
+            warm_pool()
         self.app = QApplication(sys.argv)
         startup = StartupDialog()
         if startup.exec_() == QDialog.Accepted:
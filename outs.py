@@ -0,0 +1,94 @@
+# project_folder/outs.py
+#
+# Outs and draws on the flop and turn. Everything comes from one equity
+# computation of the current street: both the simulation and the exact
+# enumeration keep their outcomes per next board card, so the hero's
+# equity for every unseen card is a by-product instead of 46 separate runs.
+
+from cards import CARD_BITS, TREYS_TO_INDEX, card_mask
+from handeval import CATEGORY_SHIFT, evaluate_mask
+from probability import calculate_win_probability, next_card_equity
+
+# An out after which the hero still loses at least this often is tainted:
+# it improves the hero but often improves an opponent more
+CLEAN_MAX_LOSS = 0.2
+# A card that cuts the hero's equity by at least this much is a bad card
+BAD_CARD_DROP = 0.1
+
+
+class OutsReport:
+    """
+    What every unseen card does to the hero's equity.
+
+    equity: EquityEstimate of the current street
+    by_card: dict of card index -> EquityEstimate if that card comes next
+    change: dict of card index -> equity if it comes minus the current equity
+    outs: cards that raise the hero's hand category and the equity, best first
+    clean_outs / tainted_outs: the outs after which the hero loses less than
+        CLEAN_MAX_LOSS of the time, and the others
+    bad_cards: cards that cut the equity by at least BAD_CARD_DROP, worst first
+    """
+
+    def __init__(self, equity, by_card, outs, clean_outs, tainted_outs, bad_cards):
+        self.equity = equity
+        self.by_card = by_card
+        self.change = {card: float(value) - float(equity) for card, value in by_card.items()}
+        self.outs = outs
+        self.clean_outs = clean_outs
+        self.tainted_outs = tainted_outs
+        self.bad_cards = bad_cards
+
+    def __repr__(self):
+        return (f"OutsReport(equity={float(self.equity):.4f}, outs={len(self.outs)}, "
+                f"clean={len(self.clean_outs)}, tainted={len(self.tainted_outs)}, bad={len(self.bad_cards)})")
+
+
+def analyse_outs(estimate, hero, board):
+    """
+    Outs of a flop or turn spot from its equity estimate.
+
+    :param estimate: EquityEstimate of the spot with next_card_counts, as
+                     calculate_win_probability returns for flop and turn
+                     spots against random opponents
+    :param hero: hero card indices
+    :param board: board card indices (3 or 4)
+    :return: OutsReport, or None if the estimate has no next card breakdown
+    """
+    by_card = next_card_equity(estimate, hero, board)
+    if not by_card:
+        return None
+    hand_mask = card_mask(list(hero) + list(board))
+    category = evaluate_mask(hand_mask) >> CATEGORY_SHIFT
+    outs = sorted((card for card, value in by_card.items()
+                   if value > estimate and evaluate_mask(hand_mask | CARD_BITS[card]) >> CATEGORY_SHIFT > category),
+                  key=lambda card: by_card[card], reverse=True)
+    clean_outs = [card for card in outs if by_card[card].loss < CLEAN_MAX_LOSS]
+    tainted_outs = [card for card in outs if by_card[card].loss >= CLEAN_MAX_LOSS]
+    bad_cards = sorted((card for card, value in by_card.items() if value <= estimate - BAD_CARD_DROP),
+                       key=lambda card: by_card[card])
+    return OutsReport(estimate, by_card, outs, clean_outs, tainted_outs, bad_cards)
+
+
+def outs_analysis(hero_cards, community_cards, num_opponents, **options):
+    """
+    Compute the equity of a flop or turn spot and analyse its outs.
+
+    Takes the same arguments as calculate_win_probability; opponent ranges
+    are not supported, since ranged simulations keep no next card breakdown.
+    A store given in options is only written to, as its rows keep no
+    breakdown either.
+
+    :return: OutsReport
+    """
+    if len(community_cards) not in (3, 4):
+        raise ValueError("Outs need a flop or a turn")
+    ranges = options.get('opponent_ranges') or ()
+    if options.get('hero_range') is not None or any(spec is not None for spec in ranges):
+        raise ValueError("Outs are only available against random opponents")
+    estimate = calculate_win_probability(hero_cards, community_cards, num_opponents,
+                                         **dict(options, need_next_cards=True))
+    report = analyse_outs(estimate, [TREYS_TO_INDEX[card] for card in hero_cards],
+                          [TREYS_TO_INDEX[card] for card in community_cards])
+    if report is None:
+        raise ValueError("The estimate has no next card breakdown")
+    return report
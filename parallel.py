@@ -0,0 +1,81 @@
+# project_folder/parallel.py
+
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import os
+
+# One process pool is kept for the life of the program so the cost of
+# starting workers is paid once, not on every equity request.
+_pool = None
+_pool_workers = 0
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def get_pool(workers=None):
+    """
+    Return the shared process pool, (re)creating it if the size changed.
+
+    :param workers: number of worker processes, defaults to the CPU count
+    :return: concurrent.futures.ProcessPoolExecutor
+    """
+    global _pool, _pool_workers
+    workers = workers or default_workers()
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def warm_pool(workers=None):
+    """
+    Start every worker process now instead of on the first request.
+    """
+    pool = get_pool(workers)
+    for future in [pool.submit(os.getpid) for _ in range(_pool_workers)]:
+        future.result()
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+    _pool = None
+    _pool_workers = 0
+
+
+atexit.register(shutdown_pool)
+
+
+def split_chunks(num_chunks, workers):
+    """
+    Deal chunk ids round-robin into one group per worker.
+
+    :return: list of non-empty lists of chunk ids
+    """
+    groups = [list(range(start, num_chunks, workers)) for start in range(workers)]
+    return [group for group in groups if group]
+
+
+def submit_chunks(func, args, num_chunks, workers=None):
+    """
+    Run func(*args, chunk_ids) for every group of chunks on the shared pool.
+
+    :return: list of futures, one per group
+    """
+    pool = get_pool(workers)
+    return [pool.submit(func, *args, group) for group in split_chunks(num_chunks, _pool_workers)]
+
+
+def submit_each(func, args, num_chunks, workers=None):
+    """
+    Run func(*args, [chunk_id]) as a separate task for every chunk, so
+    results arrive as they finish and pending chunks can be cancelled.
+
+    :return: list of futures, one per chunk
+    """
+    pool = get_pool(workers)
+    return [pool.submit(func, *args, [chunk]) for chunk in range(num_chunks)]
@@ -0,0 +1,114 @@
+# project_folder/preflop.py
+
+import os
+
+import numpy as np
+
+from handeval import NUM_CATEGORIES
+
+# Preflop equity depends only on the starting hand class and the number of
+# opponents, so it is precomputed by tools/build_preflop_table.py into a
+# (13, 13, MAX_OPPONENTS, TABLE_COLUMNS) float32 table of outcome
+# probabilities: the chance of the hero being one of k players splitting the
+# pot for k = 0..MAX_OPPONENTS + 1 (0 = lost, 1 = won outright), then the
+# chance of each final hand category (see estimate.estimate_from_outcomes).
+# The split probabilities are simulated; the categories do not depend on the
+# opponents and are enumerated exactly over every board.
+# Classes use the usual grid layout: pairs on the diagonal, suited hands at
+# [high, low] and offsuit hands at [low, high] (ranks 0..12 for 2..A).
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'preflop_equity.npy')
+MAX_OPPONENTS = 9
+# Trials per cell used by the build step; gives the table's standard error
+TABLE_TRIALS = 200000
+# Columns: split probabilities for 0..MAX_OPPONENTS + 1 players, then categories
+CATEGORY_COLUMN = MAX_OPPONENTS + 2
+TABLE_COLUMNS = CATEGORY_COLUMN + NUM_CATEGORIES
+
+RANK_CHARS = '23456789TJQKA'
+
+_table = None
+
+
+def hand_class(card1, card2):
+    """
+    Canonical class of a starting hand.
+
+    :param card1: first hole card (0..51 index)
+    :param card2: second hole card (0..51 index)
+    :return: (row, col) cell of the 13x13 starting hand grid
+    """
+    high, low = max(card1 >> 2, card2 >> 2), min(card1 >> 2, card2 >> 2)
+    if (card1 & 3) == (card2 & 3):
+        return high, low
+    return low, high
+
+
+def hand_class_name(row, col):
+    """
+    Readable name of a starting hand class, e.g. 'AKs', 'T9o' or '77'.
+    """
+    if row == col:
+        return RANK_CHARS[row] * 2
+    if row > col:
+        return RANK_CHARS[row] + RANK_CHARS[col] + 's'
+    return RANK_CHARS[col] + RANK_CHARS[row] + 'o'
+
+
+def class_representative(row, col):
+    """
+    One concrete pair of hole cards (0..51 indices) belonging to a class.
+    """
+    if row == col:
+        return row * 4, row * 4 + 1
+    if row > col:
+        return row * 4, col * 4
+    return col * 4, row * 4 + 1
+
+
+def load_table(path=TABLE_PATH):
+    """
+    Memory-map the preflop table. The file is only opened on first use.
+
+    :return: read-only (13, 13, MAX_OPPONENTS, TABLE_COLUMNS) array, or None
+             if missing or built for another layout
+    """
+    global _table
+    if _table is None and os.path.exists(path):
+        table = np.load(path, mmap_mode='r')
+        if table.shape == (13, 13, MAX_OPPONENTS, TABLE_COLUMNS):
+            _table = table
+    return _table
+
+
+def preflop_outcomes(card1, card2, num_opponents):
+    """
+    Look up the precomputed preflop outcome probabilities.
+
+    :param card1: first hole card (0..51 index)
+    :param card2: second hole card (0..51 index)
+    :param num_opponents: number of opponents (1..MAX_OPPONENTS)
+    :return: list of outcome_size(num_opponents) probabilities in the layout
+             of estimate.estimate_from_outcomes, or None if not in the table
+    """
+    if not 1 <= num_opponents <= MAX_OPPONENTS:
+        return None
+    table = load_table()
+    if table is None:
+        return None
+    row, col = hand_class(card1, card2)
+    cell = table[row, col, num_opponents - 1].tolist()
+    return cell[:num_opponents + 2] + cell[CATEGORY_COLUMN:]
+
+
+def preflop_categories(card1, card2):
+    """
+    Look up the exact distribution of the hero's final hand category.
+
+    :return: list of NUM_CATEGORIES probabilities, or None if not in the table
+    """
+    table = load_table()
+    if table is None:
+        return None
+    row, col = hand_class(card1, card2)
+    return table[row, col, 0, CATEGORY_COLUMN:].tolist()
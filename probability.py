@@ -1,58 +1,1141 @@
 # project_folder/probability.py
 
-from treys import Evaluator, Deck
-import random
+from concurrent.futures import as_completed
+import hashlib
+from itertools import chain, combinations
+from math import comb
+import time
 
-def calculate_win_probability(hero_cards, community_cards, num_opponents, evaluator, num_simulations=10000):
+import numpy as np
+
+from cards import TREYS_TO_INDEX
+from canonical import canonical_spot, find_relabelling
+from equity_cache import LRUCache
+from equity_store import spot_key
+from estimate import (
+    EquityEstimate, estimate_from_outcomes, estimate_from_pooled, estimate_from_strata, estimate_from_weighted_sums,
+    outcome_size, z_score
+)
+from handeval import CARD_MASKS, CATEGORY_SHIFT, NUM_CATEGORIES, evaluate_masks
+from parallel import submit_chunks, submit_each
+import profiling
+from preflop import TABLE_TRIALS, preflop_categories, preflop_outcomes
+from ranges import COMBO_MASKS, NUM_COMBOS, combo_count, range_weights
+from sampling import deal_around, deal_batch, deal_from_range, place_cards
+
+# Trials dealt and scored together; bounds the size of the intermediate arrays.
+# Each batch is also one unit of work for the process pool with its own
+# random stream, so a seeded run gives the same counts on any worker count.
+BATCH_SIZE = 4096
+
+# Exact enumeration is used automatically when it needs at most this many
+# hand evaluations: every flop, turn and river spot against one or two
+# opponents (a flop needs 1,169,642, under a second); never preflop
+EXACT_MAX_EVALUATIONS = 2000000
+# Opponent holdings are counted in closed form for at most this many opponents
+EXACT_MAX_OPPONENTS = 2
+
+# Adaptive runs (with a precision target) stop at this many trials at most,
+# and never judge the precision on fewer than MIN_ADAPTIVE_TRIALS
+MAX_ADAPTIVE_SIMULATIONS = 1000000
+MIN_ADAPTIVE_TRIALS = 2 * BATCH_SIZE
+
+# Results of calculate_win_probability keyed by suit-isomorphic spot
+equity_cache = LRUCache()
+
+
+def _simulate_batch(hero_mask, board_mask, remaining, num_opponents, board_needed, trials, rng, outcomes,
+                    buffer=None, per_card=None, runouts=None, first_trial=0, strata=None):
+    """
+    Deal and score a batch of trials at once, adding them to `outcomes`.
+
+    Dealt cards come back as one row per card position and one column per
+    trial: opponents hold rows 0..2n-1 in pairs, the board runout follows.
+    Every trial records how many players split the pot with the hero (0 when
+    the hero loses) and the hero's final hand category; the counts go into
+    fixed-size arrays, so nothing is allocated per trial.
+
+    :param outcomes: outcome count vector (see estimate.estimate_from_outcomes)
+                     the batch is added to in place
+    :param per_card: optional (52, outcome_size) int array; each trial's
+                     outcomes are also added to the row of its first runout card
+    :param runouts: optional (strata, board_needed) array of runouts; trial t
+                    of the run (first_trial is this batch's first) gets runout
+                    t % strata, so the runouts are dealt round-robin
+    :param strata: optional (strata, num_opponents + 2) int array the split
+                   counts are added to per stratum: the trial's runout, or
+                   without runouts the hero's final hand category
+    """
+    timed = profiling.enabled
+    if timed:
+        started = time.perf_counter_ns()
+    cards_needed = 2 * num_opponents + board_needed
+    cards = deal_batch(remaining, cards_needed, trials, rng, buffer)
+    if runouts is not None:
+        stratum = (first_trial + np.arange(trials)) % len(runouts)
+        place_cards(cards, range(2 * num_opponents, cards_needed), runouts[stratum].T)
+    dealt = CARD_MASKS[cards]
+    if timed:
+        dealt_at = time.perf_counter_ns()
+        profiling.add_time('simulate.deal', dealt_at - started)
+
+    boards = np.full(trials, board_mask, dtype=np.uint64)
+    for row in range(2 * num_opponents, cards_needed):
+        boards |= dealt[row]
+
+    hero_scores = evaluate_masks(boards | hero_mask)
+    categories = hero_scores >> CATEGORY_SHIFT
+    if num_opponents == 0:
+        sharers = np.ones(trials, dtype=np.int64)
+    else:
+        opponent_masks = dealt[0:2 * num_opponents:2] | dealt[1:2 * num_opponents:2]
+        opponent_scores = evaluate_masks(opponent_masks | boards)
+        level = np.count_nonzero(opponent_scores == hero_scores, axis=0)
+        sharers = np.where(opponent_scores.max(axis=0) > hero_scores, 0, level + 1)
+    if timed:
+        evaluated_at = time.perf_counter_ns()
+        profiling.add_time('simulate.evaluate', evaluated_at - dealt_at)
+
+    split_slots = num_opponents + 2
+    outcomes[:split_slots] += np.bincount(sharers, minlength=split_slots)
+    outcomes[split_slots:] += np.bincount(categories, minlength=NUM_CATEGORIES)
+    if per_card is not None and board_needed:
+        width = per_card.shape[1]
+        rows = cards[2 * num_opponents] * width
+        slots = np.concatenate((rows + sharers, rows + split_slots + categories))
+        per_card += np.bincount(slots, minlength=per_card.size).reshape(per_card.shape)
+    if strata is not None:
+        index = (stratum if runouts is not None else categories) * split_slots + sharers
+        strata += np.bincount(index, minlength=strata.size).reshape(strata.shape)
+    if timed:
+        profiling.add_time('simulate.count', time.perf_counter_ns() - evaluated_at)
+        profiling.count('simulate.trials', trials)
+        profiling.count('simulate.evaluations', trials * (num_opponents + 1))
+
+
+def _batch_rng(entropy, batch):
+    """
+    Independent generator for one batch, derived from the run's entropy.
+    """
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(batch,)))
+
+
+def _simulate_batches(hero, board, num_opponents, num_simulations, entropy, by_next_card, stratify, batches):
+    """
+    Run the given batches of a simulation. Also the process pool task.
+
+    :param stratify: count the trials per stratum of _strata_layout
+    :return: (outcomes, per_card, strata) summed over the batches, where
+             per_card is the (52, outcome_size) breakdown by first runout
+             card of _simulate_batch if by_next_card is set and the run is
+             not stratified, and strata the per-stratum split counts if it
+             is; each is None otherwise
+    """
+    remaining = _remaining_cards(hero, board)
+    hero_mask = np.bitwise_or.reduce(CARD_MASKS[hero]) if hero else np.uint64(0)
+    board_mask = np.bitwise_or.reduce(CARD_MASKS[board]) if board else np.uint64(0)
+    buffer = np.empty((len(remaining), BATCH_SIZE), dtype=remaining.dtype)
+    outcomes = np.zeros(outcome_size(num_opponents), dtype=np.int64)
+    layout = _strata_layout(hero, board) if stratify else None
+    runouts = layout[0] if layout else None
+    strata = np.zeros((len(layout[1]), num_opponents + 2), dtype=np.int64) if layout else None
+    per_card = np.zeros((52, len(outcomes)), dtype=np.int64) if by_next_card and not layout else None
+    for batch in batches:
+        trials = min(BATCH_SIZE, num_simulations - batch * BATCH_SIZE)
+        _simulate_batch(hero_mask, board_mask, remaining, num_opponents, 5 - len(board), trials,
+                        _batch_rng(entropy, batch), outcomes, buffer, per_card, runouts, batch * BATCH_SIZE, strata)
+    return outcomes, per_card, strata
+
+
+def simulate_outcomes(hero, board, num_opponents, num_simulations, seed=None, workers=None):
+    """
+    Run a plain Monte Carlo simulation on 0..51 card indices.
+
+    :param hero: list of hero card indices
+    :param board: list of known community card indices
+    :param num_opponents: number of opponents
+    :param num_simulations: number of trials
+    :param seed: int or sequence of ints for a reproducible run, None for fresh entropy
+    :param workers: run on this many pool processes; None or 1 runs in-process
+    :return: int64 outcome count vector over num_simulations trials, see
+             estimate.estimate_from_outcomes
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    num_batches = -(-num_simulations // BATCH_SIZE)
+    args = (hero, board, num_opponents, num_simulations, entropy, False, False)
+    if not workers or workers == 1:
+        return _simulate_batches(*args, range(num_batches))[0]
+
+    outcomes = np.zeros(outcome_size(num_opponents), dtype=np.int64)
+    for future in submit_chunks(_simulate_batches, args, num_batches, workers):
+        outcomes += future.result()[0]
+    return outcomes
+
+
+def simulate_counts(hero, board, num_opponents, num_simulations, seed=None, workers=None):
+    """
+    Outright wins and ties of a simulate_outcomes run.
+
+    :return: (wins, ties) counts over num_simulations trials, where a tie
+             is any split of the pot that includes the hero
+    """
+    outcomes = simulate_outcomes(hero, board, num_opponents, num_simulations, seed, workers)
+    return int(outcomes[1]), int(outcomes[2:num_opponents + 2].sum())
+
+
+def _iter_batch_results(task, args, num_simulations, workers):
+    """
+    Run task(*args, [batch]) for every batch of a simulation, in-process or
+    as separate pool tasks. Closing the generator cancels the batches still
+    queued on the pool.
+
+    :return: generator of (result, trials in the batch) in completion order
+    """
+    num_batches = -(-num_simulations // BATCH_SIZE)
+    if not workers or workers == 1:
+        for batch in range(num_batches):
+            yield task(*args, [batch]), min(BATCH_SIZE, num_simulations - batch * BATCH_SIZE)
+        return
+
+    futures = submit_each(task, args, num_batches, workers)
+    batch_of = {future: batch for batch, future in enumerate(futures)}
+    try:
+        for future in as_completed(futures):
+            yield future.result(), min(BATCH_SIZE, num_simulations - batch_of[future] * BATCH_SIZE)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def iter_simulate_outcomes(hero, board, num_opponents, num_simulations, seed=None, workers=None,
+                           by_next_card=False, stratify=False):
+    """
+    Progressive version of simulate_outcomes.
+
+    Yields the running totals after every batch; closing the generator
+    cancels the batches still queued on the pool. The final totals equal
+    simulate_outcomes with the same seed when not stratified.
+
+    :param by_next_card: also keep the outcomes per first runout card
+    :param stratify: deal and count the trials by the strata of
+                     _strata_layout, which must exist for the spot
+    :return: generator of (outcomes, trials, per_card, strata) cumulative
+             counts, per_card being the (52, outcome_size) counts per first
+             runout card when by_next_card is set and the run is not
+             stratified, and strata the (strata, num_opponents + 2) split
+             counts per stratum when it is; each is None otherwise
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    args = (hero, board, num_opponents, num_simulations, entropy, by_next_card, stratify)
+    outcomes = np.zeros(outcome_size(num_opponents), dtype=np.int64)
+    per_card = None
+    strata = None
+    trials = 0
+    results = _iter_batch_results(_simulate_batches, args, num_simulations, workers)
+    try:
+        for (batch_outcomes, batch_per_card, batch_strata), batch_trials in results:
+            outcomes += batch_outcomes
+            trials += batch_trials
+            if batch_per_card is not None:
+                per_card = batch_per_card if per_card is None else per_card + batch_per_card
+            if batch_strata is not None:
+                strata = batch_strata if strata is None else strata + batch_strata
+            yield outcomes, trials, per_card, strata
+    finally:
+        results.close()
+
+
+def _range_support(weights):
+    """
+    Combos of a range with non-zero weight, weights scaled to sum to 1.
+
+    :return: (combo masks, weights)
+    """
+    support = np.flatnonzero(weights)
+    return COMBO_MASKS[support], weights[support] / weights[support].sum()
+
+
+def _simulate_range_batch(hero_mask, board_mask, remaining, hero_range, opponent_ranges, num_random, board_needed,
+                          trials, rng):
+    """
+    Deal and score a batch of trials where some players hold weighted ranges.
+
+    The hero (when given as a range) and then every ranged opponent are
+    dealt a combo from their range among the combos the cards already out
+    leave live; random opponents and the board runout are dealt last from
+    the cards still in the deck. Dealing seat by seat like this picks joint
+    holdings in proportion to the product of the seats' weights divided by
+    the live weight each seat saw, so every trial is weighted by the
+    product of those live weights to make the sample exact.
+
+    :param hero_range: (combo masks, weights) or None when hero_mask is fixed
+    :param opponent_ranges: list of (combo masks, weights), one per ranged opponent
+    :param num_random: number of opponents holding random cards
+    :return: array of (sum w, sum w*v, sum w^2, sum w^2*v, sum w^2*v^2,
+             sum w*win, sum w*tie, sum w per hero hand category) over the
+             batch, where v is the hero's share of the pot in a trial
+    """
+    dead = np.full(trials, board_mask | hero_mask, dtype=np.uint64)
+    weight = np.ones(trials)
+    hero_masks = hero_mask
+    if hero_range is not None:
+        hero_masks, live = deal_from_range(*hero_range, dead, rng)
+        dead |= hero_masks
+        weight *= live
+
+    opponent_masks = []
+    for combo_masks, weights in opponent_ranges:
+        masks, live = deal_from_range(combo_masks, weights, dead, rng)
+        dead |= masks
+        weight *= live
+        opponent_masks.append(masks)
+
+    dealt = CARD_MASKS[deal_around(remaining, CARD_MASKS[remaining], dead, 2 * num_random + board_needed, rng)]
+    boards = np.full(trials, board_mask, dtype=np.uint64)
+    for row in range(2 * num_random, len(dealt)):
+        boards |= dealt[row]
+    opponent_masks.extend(dealt[0:2 * num_random:2] | dealt[1:2 * num_random:2])
+
+    hero_scores = evaluate_masks(boards | hero_masks)
+    opponent_scores = evaluate_masks(np.array(opponent_masks) | boards)
+    level = np.count_nonzero(opponent_scores == hero_scores, axis=0)
+    beaten = opponent_scores.max(axis=0) > hero_scores
+    shares = np.where(beaten, 0.0, 1 / (level + 1))
+    weight_sq = weight * weight
+    sums = np.empty(7 + NUM_CATEGORIES)
+    sums[:7] = (weight.sum(), weight @ shares, weight_sq.sum(), weight_sq @ shares, weight_sq @ (shares * shares),
+                weight[~beaten & (level == 0)].sum(), weight[~beaten & (level > 0)].sum())
+    sums[7:] = np.bincount(hero_scores >> CATEGORY_SHIFT, weights=weight, minlength=NUM_CATEGORIES)
+    return sums
+
+
+def _simulate_range_batches(hero, board, hero_weights, opponent_weights, num_opponents, num_simulations, entropy,
+                            batches):
+    """
+    Run the given batches of a range simulation. Also the process pool task.
+
+    :return: the weighted sums of _simulate_range_batch, summed over the batches
+    """
+    remaining = _remaining_cards(hero, board)
+    hero_mask = np.bitwise_or.reduce(CARD_MASKS[hero]) if hero else np.uint64(0)
+    board_mask = np.bitwise_or.reduce(CARD_MASKS[board]) if board else np.uint64(0)
+    hero_range = _range_support(hero_weights) if hero_weights is not None else None
+    opponent_ranges = [_range_support(weights) for weights in opponent_weights if weights is not None]
+    num_random = num_opponents - len(opponent_ranges)
+    sums = np.zeros(7 + NUM_CATEGORIES)
+    for batch in batches:
+        trials = min(BATCH_SIZE, num_simulations - batch * BATCH_SIZE)
+        sums += _simulate_range_batch(hero_mask, board_mask, remaining, hero_range, opponent_ranges, num_random,
+                                      5 - len(board), trials, _batch_rng(entropy, batch))
+    return tuple(sums.tolist())
+
+
+def iter_range_sums(hero, board, hero_weights, opponent_weights, num_opponents, num_simulations, seed=None,
+                    workers=None):
+    """
+    Progressive range-vs-range simulation on 0..51 card indices.
+
+    :param hero: hero card indices, ignored when hero_weights is given
+    :param board: known community card indices
+    :param hero_weights: NUM_COMBOS weights of the hero's range, or None to use `hero`
+    :param opponent_weights: list of NUM_COMBOS weights (or None for a random
+                             hand), one per opponent; missing entries are random
+    :param num_opponents: number of opponents
+    :return: generator of (sums, trials) cumulative weighted sums, see
+             estimate.estimate_from_weighted_sums
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    args = (hero, board, hero_weights, list(opponent_weights), num_opponents, num_simulations, entropy)
+    sums = np.zeros(7 + NUM_CATEGORIES)
+    trials = 0
+    results = _iter_batch_results(_simulate_range_batches, args, num_simulations, workers)
+    try:
+        for batch_sums, batch_trials in results:
+            sums += batch_sums
+            trials += batch_trials
+            yield tuple(sums.tolist()), trials
+    finally:
+        results.close()
+
+
+def _simulate_table_batch(holdings, board_mask, remaining, ranged, random_seats, board_needed, trials, rng,
+                          buffer=None):
+    """
+    Deal and score a batch of trials for every seat at once.
+
+    Each trial deals the unknown hands and the board runout once, and every
+    seat's hand is scored on that same board. Ranged seats are dealt as in
+    _simulate_range_batch and weight the trial by their live weights.
+
+    :param holdings: uint64 array with the known hole card mask of every seat, 0 where unknown
+    :param ranged: list of (seat, (combo masks, weights)) for the seats holding a range
+    :param random_seats: list of the seats holding random cards
+    :return: (seats, 7) array of per-seat sums over the batch: w, w^2,
+             w*win, w*tie, w*v, w^2*v and w^2*v^2, where w is the trial's
+             weight and v the seat's share of the pot
+    """
+    hands = np.repeat(holdings[:, None], trials, axis=1)
+    num_random = len(random_seats)
+    cards_needed = 2 * num_random + board_needed
+    weight = np.ones(trials)
+    if ranged:
+        dead = np.full(trials, np.bitwise_or.reduce(holdings) | board_mask, dtype=np.uint64)
+        for seat, (combo_masks, weights) in ranged:
+            masks, live = deal_from_range(combo_masks, weights, dead, rng)
+            dead |= masks
+            weight *= live
+            hands[seat] = masks
+        dealt = CARD_MASKS[deal_around(remaining, CARD_MASKS[remaining], dead, cards_needed, rng)]
+    else:
+        dealt = CARD_MASKS[deal_batch(remaining, cards_needed, trials, rng, buffer)]
+    if num_random:
+        hands[random_seats] = dealt[0:2 * num_random:2] | dealt[1:2 * num_random:2]
+    boards = np.full(trials, board_mask, dtype=np.uint64)
+    for row in range(2 * num_random, cards_needed):
+        boards |= dealt[row]
+
+    scores = evaluate_masks(hands | boards)
+    best = scores == scores.max(axis=0)
+    winners = np.count_nonzero(best, axis=0)
+    shares = best / winners
+    weight_sq = weight * weight
+    sums = np.empty((len(holdings), 7))
+    sums[:, 0] = weight.sum()
+    sums[:, 1] = weight_sq.sum()
+    sums[:, 2] = (best & (winners == 1)) @ weight
+    sums[:, 3] = (best & (winners > 1)) @ weight
+    sums[:, 4] = shares @ weight
+    sums[:, 5] = shares @ weight_sq
+    sums[:, 6] = (shares * shares) @ weight_sq
+    return sums
+
+
+def _simulate_table_batches(seats, board, seat_weights, num_simulations, entropy, batches):
+    """
+    Run the given batches of a full-table simulation. Also the process pool task.
+
+    :param seats: list of hole card index lists, one per seat, empty where unknown
+    :param seat_weights: list of NUM_COMBOS weights or None, one per seat
+    :return: the (seats, 7) sums of _simulate_table_batch, summed over the batches
+    """
+    remaining = _remaining_cards([card for hand in seats for card in hand], board)
+    holdings = np.array([int(np.bitwise_or.reduce(CARD_MASKS[hand])) if hand else 0 for hand in seats],
+                        dtype=np.uint64)
+    board_mask = np.bitwise_or.reduce(CARD_MASKS[board]) if board else np.uint64(0)
+    ranged = [(seat, _range_support(weights)) for seat, weights in enumerate(seat_weights) if weights is not None]
+    random_seats = [seat for seat, hand in enumerate(seats) if not hand and seat_weights[seat] is None]
+    buffer = None if ranged else np.empty((len(remaining), BATCH_SIZE), dtype=remaining.dtype)
+    sums = np.zeros((len(seats), 7))
+    for batch in batches:
+        trials = min(BATCH_SIZE, num_simulations - batch * BATCH_SIZE)
+        sums += _simulate_table_batch(holdings, board_mask, remaining, ranged, random_seats, 5 - len(board),
+                                      trials, _batch_rng(entropy, batch), buffer)
+    return sums
+
+
+def _disjoint_pairs(holdings, incidence):
+    """
+    Count unordered pairs of card-disjoint holdings, per runout.
+
+    Two distinct holdings overlap in at most one card, so the pairs sharing a
+    card follow from how many holdings use each card (its degree).
+
+    :param holdings: (runouts, pairs) bool array of holdings to pair up
+    :param incidence: (pairs, cards) int array, 1 where a holding uses a card
+    :return: int array with one count per runout
+    """
+    count = holdings.sum(axis=1)
+    degrees = holdings.astype(np.int64) @ incidence
+    return (count * count + count - (degrees * degrees).sum(axis=1)) // 2
+
+
+def exact_space_size(num_remaining, num_opponents, board_needed):
+    """
+    Number of hand evaluations needed to enumerate a spot exactly.
+
+    :return: evaluation count, or None if the spot cannot be enumerated
+    """
+    if num_opponents > EXACT_MAX_OPPONENTS:
+        return None
+    return comb(num_remaining, board_needed) * (comb(num_remaining, 2) + 1)
+
+
+def _enumerate_exact(hero_mask, board_mask, remaining, num_opponents, board_needed, by_next_card=False):
+    """
+    Enumerate every board runout and every opponent holding.
+
+    For each runout the opponent holdings collapse into those worse than,
+    equal to and better than the hero; the joint opponent deals are then
+    counted per class instead of being listed one by one.
+
+    :param by_next_card: also count the outcomes per next board card; each
+                         runout counts for every card in it, which weights
+                         the later cards exactly as dealing them would
+    :return: (outcomes, per_card): the int64 outcome count vector over all
+             runouts and deals (see estimate.estimate_from_outcomes), and
+             the (52, outcome_size) counts per next card when by_next_card
+             is set, else None
+    """
+    num_remaining = len(remaining)
+    remaining_masks = CARD_MASKS[remaining]
+    pairs = np.array(list(combinations(range(num_remaining), 2)), dtype=np.intp)
+    pair_masks = remaining_masks[pairs[:, 0]] | remaining_masks[pairs[:, 1]]
+    incidence = np.zeros((len(pairs), num_remaining), dtype=np.int64)
+    incidence[np.arange(len(pairs)), pairs[:, 0]] = 1
+    incidence[np.arange(len(pairs)), pairs[:, 1]] = 1
+
+    runouts = np.array(list(combinations(range(num_remaining), board_needed)), dtype=np.intp)
+    runout_masks = np.bitwise_or.reduce(remaining_masks[runouts], axis=1) if board_needed else \
+        np.zeros(1, dtype=np.uint64)
+
+    outcomes = np.zeros(outcome_size(num_opponents), dtype=np.int64)
+    per_card = np.zeros((52, len(outcomes)), dtype=np.int64) if by_next_card else None
+    split_slots = num_opponents + 2
+    chunk = max(1, BATCH_SIZE * 64 // len(pairs))
+    for start in range(0, len(runout_masks), chunk):
+        boards = runout_masks[start:start + chunk] | board_mask
+        hero_scores = evaluate_masks(boards | hero_mask)[:, None]
+        opponent_scores = evaluate_masks(pair_masks[None, :] | boards[:, None])
+        valid = (pair_masks[None, :] & boards[:, None]) == 0
+        worse = valid & (opponent_scores < hero_scores)
+        equal = valid & (opponent_scores == hero_scores)
+        if num_opponents == 1:
+            won, split, deals = worse.sum(axis=1), equal.sum(axis=1), valid.sum(axis=1)
+            splits = (deals - won - split, won, split)
+        else:
+            # Both opponents worse, both equal, or one of each for a two-way split
+            won = _disjoint_pairs(worse, incidence)
+            three_way = _disjoint_pairs(equal, incidence)
+            not_lost = _disjoint_pairs(worse | equal, incidence)
+            deals = _disjoint_pairs(valid, incidence)
+            splits = (deals - not_lost, won, not_lost - won - three_way, three_way)
+        outcomes[:split_slots] += [int(count.sum()) for count in splits]
+        np.add.at(outcomes, split_slots + (hero_scores[:, 0] >> CATEGORY_SHIFT), deals.astype(np.int64))
+        if by_next_card:
+            rows = np.zeros((len(boards), len(outcomes)), dtype=np.int64)
+            rows[:, :split_slots] = np.stack(splits, axis=1)
+            rows[np.arange(len(boards)), split_slots + (hero_scores[:, 0] >> CATEGORY_SHIFT)] = deals
+            for column in range(board_needed):
+                np.add.at(per_card, remaining[runouts[start:start + chunk, column]], rows)
+    return outcomes, per_card
+
+
+def _remaining_cards(hero, board):
+    return np.array([card for card in range(52) if card not in hero and card not in board], dtype=np.intp)
+
+
+def _enumerated(hero, board, num_opponents, exact, max_exact_evaluations):
+    """
+    Whether a spot against random opponents past the preflop table is
+    enumerated exactly rather than simulated.
+    """
+    if exact is False:
+        return False
+    space = exact_space_size(52 - len(hero) - len(board), num_opponents, 5 - len(board))
+    if max_exact_evaluations is None:
+        max_exact_evaluations = EXACT_MAX_EVALUATIONS
+    return bool(exact) or (space is not None and space <= max_exact_evaluations)
+
+
+def _closed_form_estimate(hero, board, num_opponents, exact, max_exact_evaluations, use_preflop_table,
+                          confidence):
+    """
+    Answer a spot without simulating, when possible.
+
+    :return: EquityEstimate, or None if the spot has to be simulated
+    """
+    remaining = _remaining_cards(hero, board)
+    board_needed = 5 - len(board)
+    if num_opponents == 0:
+        return _trivial_estimate(1.0, confidence)
+
+    if use_preflop_table and not board and len(hero) == 2 and not exact:
+        odds = preflop_outcomes(hero[0], hero[1], num_opponents)
+        if odds is not None:
+            return estimate_from_outcomes([odd * TABLE_TRIALS for odd in odds], num_opponents, confidence,
+                                          method='table')
+
+    if exact and exact_space_size(len(remaining), num_opponents, board_needed) is None:
+        raise ValueError(f"Exact mode supports at most {EXACT_MAX_OPPONENTS} opponents")
+    if _enumerated(hero, board, num_opponents, exact, max_exact_evaluations):
+        hero_mask = np.bitwise_or.reduce(CARD_MASKS[hero]) if hero else np.uint64(0)
+        board_mask = np.bitwise_or.reduce(CARD_MASKS[board]) if board else np.uint64(0)
+        by_next_card = len(board) in (3, 4)
+        outcomes, per_card = _enumerate_exact(hero_mask, board_mask, remaining, num_opponents, board_needed,
+                                              by_next_card)
+        estimate = estimate_from_outcomes(outcomes, num_opponents, confidence, method='exact')
+        if by_next_card:
+            estimate.next_card_counts = per_card
+            estimate.spot = (tuple(hero), tuple(board), num_opponents)
+        return estimate
+    return None
+
+
+def hand_category_distribution(hero, board):
+    """
+    Exact distribution of the hero's final hand category over every runout.
+
+    :param hero: hero card indices
+    :param board: known board card indices
+    :return: float64 array of NUM_CATEGORIES probabilities
+    """
+    remaining = _remaining_cards(hero, board)
+    board_needed = 5 - len(board)
+    runouts = np.fromiter(chain.from_iterable(combinations(range(len(remaining)), board_needed)), dtype=np.intp)
+    runouts = remaining[runouts.reshape(-1, board_needed)]
+    hand_mask = np.bitwise_or.reduce(CARD_MASKS[list(hero) + list(board)])
+    counts = np.zeros(NUM_CATEGORIES, dtype=np.int64)
+    for start in range(0, len(runouts), BATCH_SIZE * 16):
+        masks = np.bitwise_or.reduce(CARD_MASKS[runouts[start:start + BATCH_SIZE * 16]], axis=1) | hand_mask
+        counts += np.bincount(evaluate_masks(masks) >> CATEGORY_SHIFT, minlength=NUM_CATEGORIES)
+    return counts / counts.sum()
+
+
+def _strata_layout(hero, board):
+    """
+    Strata for a variance-reduced simulation against random opponents.
+
+    On the flop and turn every ordered runout is a stratum of equal weight,
+    so each one is dealt equally often and the luck of the board drops out
+    of the estimate. Preflop the strata are the hero's final hand
+    categories, weighted by their exact probabilities from the preflop
+    table. Other spots have no strata.
+
+    :return: (runouts, weights, categories) or None, with runouts the
+             (strata, board_needed) runout cards, or None for category
+             strata, weights the probability of each stratum and categories
+             the (strata, NUM_CATEGORIES) hero category distribution in each
+    """
+    board_needed = 5 - len(board)
+    if len(hero) == 2 and board_needed in (1, 2):
+        remaining = _remaining_cards(hero, board)
+        if board_needed == 1:
+            runouts = remaining[:, None]
+        else:
+            first, second = np.meshgrid(remaining, remaining, indexing='ij')
+            distinct = first != second
+            runouts = np.stack((first[distinct], second[distinct]), axis=1)
+        hand_mask = np.bitwise_or.reduce(CARD_MASKS[list(hero) + list(board)])
+        scores = evaluate_masks(np.bitwise_or.reduce(CARD_MASKS[runouts], axis=1) | hand_mask)
+        categories = np.eye(NUM_CATEGORIES)[scores >> CATEGORY_SHIFT]
+        return runouts, np.full(len(runouts), 1.0 / len(runouts)), categories
+    if len(hero) == 2 and not board:
+        weights = preflop_categories(hero[0], hero[1])
+        if weights is not None:
+            weights = np.array(weights, dtype=np.float64)
+            return None, weights / weights.sum(), np.eye(NUM_CATEGORIES)
+    return None
+
+
+def _strata_next_card_counts(strata, runouts, categories):
+    """
+    Outcome counts per first runout card of a run stratified by runout, in
+    the layout of EquityEstimate.next_card_counts.
+    """
+    rows = np.concatenate((strata, categories.astype(np.int64) * strata.sum(axis=1, keepdims=True)), axis=1)
+    per_card = np.zeros((52, rows.shape[1]), dtype=np.int64)
+    np.add.at(per_card, runouts[:, 0], rows)
+    return per_card
+
+
+def _trivial_estimate(probability, confidence):
+    """
+    Estimate with a known answer, e.g. 1.0 for a spot that is always won.
+    """
+    estimate = EquityEstimate(probability, confidence=confidence, method='trivial')
+    estimate.win, estimate.tie, estimate.loss = probability, 0.0, 1.0 - probability
+    return estimate
+
+
+def _resolve_ranges(hero, board, num_opponents, hero_range, opponent_ranges):
+    """
+    Turn range descriptions into combo weights and check they can be dealt.
+
+    :return: (hero weights or None, list of opponent weights or None, one per
+             opponent); both are None/all None when nobody holds a range
+    """
+    opponent_weights = [range_weights(spec) for spec in opponent_ranges or ()]
+    if len(opponent_weights) > num_opponents:
+        raise ValueError(f"Got {len(opponent_weights)} opponent ranges for {num_opponents} opponents")
+    opponent_weights += [None] * (num_opponents - len(opponent_weights))
+    hero_weights = None
+    if hero_range is not None:
+        hero_weights = range_weights(hero_range)
+        if hero_weights is None:
+            hero_weights = np.ones(NUM_COMBOS)
+
+    known_mask = int(np.bitwise_or.reduce(CARD_MASKS[board + ([] if hero_weights is not None else hero)]))
+    for seat, weights in enumerate([hero_weights] + opponent_weights):
+        if weights is not None and combo_count(weights, known_mask) == 0:
+            player = 'the hero' if seat == 0 else f"opponent {seat}"
+            raise ValueError(f"The range of {player} has no hands left after the known cards")
+    return hero_weights, opponent_weights
+
+
+def _range_key(weights):
+    """
+    Short hashable stand-in for a weight vector in cache keys.
+    """
+    if weights is None:
+        return None
+    return hashlib.blake2b(weights.tobytes(), digest_size=16).digest()
+
+
+def _se_target(target_se, ci_halfwidth, confidence):
+    """
+    The standard error a run with these precision targets stops at, or None.
+    """
+    se_targets = [target for target in (target_se, ci_halfwidth and ci_halfwidth / z_score(confidence)) if target]
+    return min(se_targets) if se_targets else None
+
+
+def iter_equity(hero, board, num_opponents, num_simulations=10000, exact=None, max_exact_evaluations=None,
+                use_preflop_table=True, seed=None, workers=None, target_se=None, ci_halfwidth=None,
+                time_budget=None, confidence=0.95, max_simulations=MAX_ADAPTIVE_SIMULATIONS, hero_range=None,
+                opponent_ranges=None, prior=None, variance_reduction=True):
+    """
+    Uncached, progressive equity on 0..51 card indices.
+
+    Without a precision target exactly num_simulations trials are run. With
+    target_se or ci_halfwidth, batches run until the standard error or the
+    confidence half-width reaches the target, up to max_simulations trials.
+    A time_budget (seconds) stops either kind of run early.
+
+    Flop and turn estimates, simulated or exact, carry their counts per next
+    card (EquityEstimate.next_card_counts), for next_card_equity and for a
+    simulation of the next street to start from.
+
+    With variance_reduction, simulations against random opponents are
+    stratified when they run at least two trials per stratum: flop and turn
+    runs deal every runout equally often, and preflop runs weight the
+    hero's final hand categories by their exact probabilities (see
+    _strata_layout and estimate.estimate_from_strata). The estimate stays
+    unbiased and reports its variance_gain. The hero's final hand category
+    is fixed by the runout, so on the flop and turn the runout strata
+    already include it; preflop it is the only stratum variable.
+
+    A prior is topped up either way. Its trials were not dealt by stratum,
+    so a stratified run is pooled with them by trial count (see
+    estimate.estimate_from_pooled) rather than adding them to the strata.
+
+    Parameters are the same as calculate_win_probability, except that the
+    cards are indices instead of treys integers, and:
+    :param prior: outcome counts already simulated for this exact spot, e.g.
+                  from street_prior; the simulation only tops them up
+    :return: generator of (EquityEstimate, done) pairs; the last has done=True
+    """
+    se_target = _se_target(target_se, ci_halfwidth, confidence)
+    limit = max_simulations if se_target is not None else num_simulations
+    if limit < 1:
+        raise ValueError("At least one trial has to be simulated")
+    if 2 * (num_opponents + 1) + 5 > 52:
+        raise ValueError(f"Not enough cards to deal {num_opponents} opponents")
+    hero_weights, opponent_weights = _resolve_ranges(hero, board, num_opponents, hero_range, opponent_ranges)
+    ranged = hero_weights is not None or any(weights is not None for weights in opponent_weights)
+    if ranged:
+        # Ranges are always simulated; only the trivial answers apply
+        estimate = None
+        if num_opponents == 0:
+            estimate = _trivial_estimate(1.0, confidence)
+    else:
+        with profiling.span('equity.closed_form'):
+            estimate = _closed_form_estimate(hero, board, num_opponents, exact, max_exact_evaluations,
+                                             use_preflop_table, confidence)
+    if estimate is not None:
+        yield estimate, True
+        return
+
+    prior_outcomes = np.zeros(outcome_size(num_opponents), dtype=np.int64)
+    if prior is not None and not ranged:
+        prior_outcomes += prior
+    prior_trials = int(prior_outcomes[:num_opponents + 2].sum())
+    prior_estimate = None
+    if prior_trials:
+        prior_estimate = estimate_from_outcomes(prior_outcomes, num_opponents, confidence)
+        if prior_trials >= limit or (se_target is not None and prior_trials >= MIN_ADAPTIVE_TRIALS
+                                     and prior_estimate.std_error <= se_target):
+            yield prior_estimate, True
+            return
+
+    layout = _strata_layout(hero, board) if variance_reduction and not ranged else None
+    if layout is not None and limit - prior_trials < 2 * len(layout[1]):
+        layout = None  # Too few trials to sample every stratum
+
+    by_next_card = not ranged and len(board) in (3, 4)
+    started = time.perf_counter()
+    if ranged:
+        counts = iter_range_sums(hero, board, hero_weights, opponent_weights, num_opponents, limit, seed, workers)
+    else:
+        counts = iter_simulate_outcomes(hero, board, num_opponents, limit - prior_trials, seed, workers,
+                                        by_next_card, layout is not None)
+    try:
+        for progress in counts:
+            if ranged:
+                if progress[0][0] == 0:
+                    raise ValueError("No deal is consistent with the given ranges")
+                estimate = estimate_from_weighted_sums(progress[0], progress[1], confidence)
+            else:
+                outcomes, _, per_card, strata = progress
+                if layout is None:
+                    estimate = estimate_from_outcomes(outcomes + prior_outcomes, num_opponents, confidence)
+                else:
+                    runouts, weights, categories = layout
+                    estimate = estimate_from_strata(strata, weights, categories, confidence)
+                    if prior_estimate is not None:
+                        estimate = estimate_from_pooled([estimate, prior_estimate], confidence)
+                    if by_next_card:
+                        per_card = _strata_next_card_counts(strata, runouts, categories)
+                if by_next_card:
+                    estimate.next_card_counts = per_card.copy()
+                    estimate.spot = (tuple(hero), tuple(board), num_opponents)
+            done = (estimate.trials >= limit
+                    or (se_target is not None and estimate.trials >= MIN_ADAPTIVE_TRIALS
+                        and estimate.std_error <= se_target)
+                    or (time_budget is not None and time.perf_counter() - started >= time_budget))
+            yield estimate, done
+            if done:
+                return
+    finally:
+        counts.close()
+
+
+def street_prior(previous, hero, board, num_opponents):
+    """
+    Trials of the previous street that already dealt the card just revealed.
+
+    A flop or turn simulation deals the next board card in every trial; the
+    trials whose next card is the one that actually came are a valid sample
+    of the new street, so its simulation can start from them.
+
+    :param previous: EquityEstimate of the previous street (possibly cached
+                     for a suit-isomorphic spot)
+    :param hero: hero card indices
+    :param board: board card indices of the new street
+    :param num_opponents: number of opponents on the new street
+    :return: outcome count vector, or None if previous does not apply
+    """
+    if previous is None or previous.next_card_counts is None or previous.method == 'exact':
+        return None  # exact counts are not trials, and the next street is exact too
+    previous_hero, previous_board, previous_opponents = previous.spot
+    if previous_opponents != num_opponents or len(previous_board) + 1 != len(board):
+        return None
+    for new_card in board:
+        relabel = find_relabelling(previous_hero, previous_board, hero,
+                                   [card for card in board if card != new_card])
+        if relabel is not None:
+            outcomes = previous.next_card_counts[relabel.index(new_card)]
+            return outcomes.copy() if outcomes[:num_opponents + 2].any() else None
+    return None
+
+
+def next_card_equity(estimate, hero, board):
+    """
+    Equity by next board card, from the trials of a flop or turn simulation
+    or the runouts of an exact flop or turn enumeration.
+
+    :param estimate: EquityEstimate with next_card_counts
+    :param hero: hero card indices of the spot being shown
+    :param board: board card indices of the spot being shown
+    :return: dict of card index -> EquityEstimate for every next card that
+             was dealt; empty when the estimate has no breakdown
+    """
+    if estimate.next_card_counts is None:
+        return {}
+    spot_hero, spot_board, num_opponents = estimate.spot
+    relabel = find_relabelling(spot_hero, spot_board, hero, board)
+    if relabel is None:
+        return {}
+    return {relabel[card]: estimate_from_outcomes(outcomes, num_opponents, estimate.confidence, estimate.method)
+            for card, outcomes in enumerate(estimate.next_card_counts) if outcomes[:num_opponents + 2].any()}
+
+
+def _stored_estimate(store, key, num_simulations, se_target, confidence):
+    """
+    A result from the persistent store that is as precise as the request.
+
+    :return: EquityEstimate, or None if the store has no good enough result
+    """
+    estimate = store.get(key, confidence)
+    if estimate is None or estimate.method == 'exact':
+        return estimate
+    if se_target is not None:
+        enough = estimate.trials >= MIN_ADAPTIVE_TRIALS and estimate.std_error <= se_target
+    else:
+        enough = estimate.trials >= num_simulations
+    return estimate if enough else None
+
+
+def win_probability(hero, board, num_opponents, num_simulations=10000, exact=None, max_exact_evaluations=None,
+                    use_preflop_table=True, seed=None, workers=None, target_se=None, ci_halfwidth=None,
+                    time_budget=None, confidence=0.95, max_simulations=MAX_ADAPTIVE_SIMULATIONS, hero_range=None,
+                    opponent_ranges=None, prior=None, variance_reduction=True):
+    """
+    Uncached win probability on 0..51 card indices.
+
+    Parameters are the same as iter_equity.
+    :return: EquityEstimate
+    """
+    for estimate, _ in iter_equity(hero, board, num_opponents, num_simulations, exact, max_exact_evaluations,
+                                   use_preflop_table, seed, workers, target_se, ci_halfwidth, time_budget,
+                                   confidence, max_simulations, hero_range, opponent_ranges, prior,
+                                   variance_reduction):
+        pass
+    return estimate
+
+
+def iter_win_probability(hero_cards, community_cards, num_opponents, num_simulations=10000, exact=None,
+                         max_exact_evaluations=None, use_preflop_table=True, use_cache=True, seed=None,
+                         workers=None, target_se=None, ci_halfwidth=None, time_budget=None, confidence=0.95,
+                         max_simulations=MAX_ADAPTIVE_SIMULATIONS, hero_range=None, opponent_ranges=None,
+                         previous=None, variance_reduction=True, store=None, need_next_cards=False):
+    """
+    Progressive version of calculate_win_probability for interactive use.
+
+    Yields a refined estimate after every batch so a caller can show it
+    while the rest of the simulation runs, and stop early by closing the
+    generator. Cached, stored, exact and preflop-table spots yield once.
+
+    Parameters are the same as calculate_win_probability.
+    :return: generator of (EquityEstimate, done) pairs; the last has done=True
+    """
+    hero = [TREYS_TO_INDEX[card] for card in hero_cards or ()]
+    board = [TREYS_TO_INDEX[card] for card in community_cards]
+    hero_weights, opponent_weights = _resolve_ranges(hero, board, num_opponents, hero_range, opponent_ranges)
+    ranged = hero_weights is not None or any(weights is not None for weights in opponent_weights)
+    prior = None
+    if not ranged:
+        spot = canonical_spot(hero, board, num_opponents)
+        prior = street_prior(previous, hero, board, num_opponents)
+        store_key = spot_key(*spot)
+    else:
+        # Ranges may single out suits, so ranged spots are not canonicalised
+        spot = (tuple(sorted(hero)) if hero_weights is None else _range_key(hero_weights), tuple(sorted(board)),
+                num_opponents, tuple(_range_key(weights) for weights in opponent_weights))
+        range_ids = [_range_key(weights) for weights in [hero_weights] + opponent_weights]
+        store_key = spot_key(sorted(hero) if hero_weights is None else (), sorted(board), num_opponents,
+                             [range_id and range_id.hex() for range_id in range_ids])
+    # The worker count does not change the result, so it is not part of the key
+    key = spot + (num_simulations, exact, max_exact_evaluations, use_preflop_table, seed, target_se, ci_halfwidth,
+                  time_budget, confidence, max_simulations, variance_reduction)
+    cached = equity_cache.get(key) if use_cache else None
+    if cached is not None:
+        profiling.count('equity.cache_hits')
+        yield cached, True
+        return
+    # Seeded runs must stay reproducible, so they neither read nor grow the
+    # store. Turn and river spots that are enumerated take milliseconds and
+    # are not stored; stored results have no next-card breakdown, so flop
+    # and turn spots are recomputed for a caller that needs one.
+    by_next_card = not ranged and len(board) in (3, 4)
+    if seed is not None or (len(board) >= 4 and not ranged
+                            and _enumerated(hero, board, num_opponents, exact, max_exact_evaluations)):
+        store = None
+    if store is not None and not (need_next_cards and by_next_card):
+        with profiling.span('equity.store_read'):
+            stored = _stored_estimate(store, store_key, num_simulations,
+                                      _se_target(target_se, ci_halfwidth, confidence), confidence)
+        if stored is not None:
+            profiling.count('equity.store_hits')
+            if use_cache and not by_next_card:
+                equity_cache.put(key, stored)
+            yield stored, True
+            return
+
+    for estimate, done in iter_equity(hero, board, num_opponents, num_simulations, exact, max_exact_evaluations,
+                                      use_preflop_table, seed, workers, target_se, ci_halfwidth, time_budget,
+                                      confidence, max_simulations, hero_weights, opponent_weights, prior,
+                                      variance_reduction):
+        if done and use_cache:
+            equity_cache.put(key, estimate)
+        if done and store is not None and estimate.method in ('simulation', 'exact'):
+            with profiling.span('equity.store_merge'):
+                store.merge(store_key, estimate)
+        yield estimate, done
+
+
+@profiling.instrument('calculate_win_probability')
+def calculate_win_probability(hero_cards, community_cards, num_opponents, evaluator=None, num_simulations=10000,
+                              exact=None, max_exact_evaluations=None, use_preflop_table=True, use_cache=True,
+                              seed=None, workers=None, target_se=None, ci_halfwidth=None, time_budget=None,
+                              confidence=0.95, max_simulations=MAX_ADAPTIVE_SIMULATIONS, hero_range=None,
+                              opponent_ranges=None, previous=None, variance_reduction=True, store=None,
+                              need_next_cards=False):
     """
     Calculate win probability for the hero using Monte Carlo simulation.
 
-    :param hero_cards: list of hero's hole cards (treys integers)
+    Trials are dealt in batches as integer arrays and every hand is scored
+    with the lookup tables in handeval, so no per-trial Python work is done.
+    Spots with at most two opponents on the flop or later are instead
+    enumerated exactly, and preflop spots are read from the precomputed
+    table in preflop.py. Results are cached under a suit-isomorphic key, so
+    equivalent spots and repeated queries are only computed once.
+
+    Opponents hold random cards unless given a range in opponent_ranges; the
+    hero can likewise be given a range instead of hole cards. Ranged spots
+    are always simulated, dealing each range around the cards already out.
+
+    Passing the previous street's estimate as `previous` lets a simulation
+    start from the earlier trials that dealt the card just revealed.
+
+    With a persistent `store` (equity_store.EquityStore), unseeded results
+    are merged into it and a stored result is returned instead of
+    computing when it is already as precise as asked, so spots get cheaper
+    and more precise across sessions and processes. Stored results have
+    win, tie, loss and categories but no next_card_counts, spot or
+    variance_gain; turn and river spots solved exactly bypass the store.
+
+    Simulations against random opponents are stratified by default, which
+    reaches a given precision with fewer trials; the gain is reported as
+    EquityEstimate.variance_gain. It depends on how much the runout decides
+    the hand: about 3x for a flush and straight draw against 3 to 5
+    opponents, 1.3x to 2x for most flops and turns (least heads-up and for
+    made hands such as an overpair), 1.2x to 1.5x preflop.
+
+    :param hero_cards: list of hero's hole cards (treys integers); ignored with hero_range
     :param community_cards: list of community cards (treys integers)
     :param num_opponents: number of opponents
-    :param evaluator: treys Evaluator instance
-    :param num_simulations: number of Monte Carlo simulations
-    :return: win probability as float between 0 and 1
-    """
-    wins = 0
-    ties = 0
-
-    # Initialize deck and remove known cards
-    full_deck = Deck()
-    known_cards = set(hero_cards + community_cards)
-    remaining_deck = [card for card in full_deck.cards if card not in known_cards]
-
-    for _ in range(num_simulations):
-        simulation_deck = remaining_deck.copy()
-        random.shuffle(simulation_deck)
-
-        # Deal opponents' hole cards
-        opponents_hands = []
-        try:
-            for _ in range(num_opponents):
-                opp_hand = [simulation_deck.pop(), simulation_deck.pop()]
-                opponents_hands.append(opp_hand)
-        except IndexError:
-            break  # Not enough cards to continue
-
-        # Deal remaining community cards
-        remaining_community = 5 - len(community_cards)
-        simulated_community = community_cards.copy()
-        if remaining_community > 0:
-            simulated_community += [simulation_deck.pop() for _ in range(remaining_community)]
-
-        # Evaluate hero's hand
-        hero_score = evaluator.evaluate(simulated_community, hero_cards)
-
-        # Evaluate opponents' hands
-        opponent_scores = [evaluator.evaluate(simulated_community, opp) for opp in opponents_hands]
-
-        # Determine if hero wins
-        if all(hero_score < opp_score for opp_score in opponent_scores):
-            wins += 1
-        elif any(hero_score == opp_score for opp_score in opponent_scores):
-            ties += 1
-        # else: hero loses, do nothing
-
-    win_probability = (wins + ties / (num_opponents + 1)) / num_simulations
-    return win_probability
+    :param evaluator: unused, kept for backwards compatibility
+    :param num_simulations: number of Monte Carlo simulations without a precision target
+    :param exact: True to enumerate exactly, False to always simulate, None to
+                  enumerate whenever the spot needs at most max_exact_evaluations
+    :param max_exact_evaluations: size limit for automatic exact mode
+                                  (defaults to EXACT_MAX_EVALUATIONS)
+    :param use_preflop_table: answer preflop spots from the preflop table
+    :param use_cache: look up and store the result in equity_cache
+    :param seed: int for a reproducible simulation, None for fresh entropy
+    :param workers: split the simulation over this many pool processes
+    :param target_se: keep simulating until the standard error is at most this
+    :param ci_halfwidth: keep simulating until the confidence half-width is at most this
+    :param time_budget: stop simulating after this many seconds
+    :param confidence: confidence level of the reported interval
+    :param max_simulations: trial cap for runs with a precision target
+    :param hero_range: range for the hero instead of hole cards, see opponent_ranges
+    :param opponent_ranges: list with one range per opponent (missing entries
+                            are random): a string like "22+, A2s+, KTo+", a
+                            13x13 class weight matrix, 1326 combo weights
+                            (see ranges.py) or None for a random hand
+    :param previous: EquityEstimate of the previous street of the same hand
+    :param variance_reduction: stratify simulations (see iter_equity); False
+                               runs a plain Monte Carlo simulation
+    :param store: equity_store.EquityStore to read and merge results, or None
+    :param need_next_cards: the caller uses next_card_counts (outs, the next
+                            street's prior), so flop and turn spots against
+                            random opponents are computed, not read from the store
+    :return: EquityEstimate, a float between 0 and 1 that also carries
+             trials, std_error and the (low, high) confidence interval
+    """
+    for estimate, _ in iter_win_probability(hero_cards, community_cards, num_opponents, num_simulations, exact,
+                                            max_exact_evaluations, use_preflop_table, use_cache, seed, workers,
+                                            target_se, ci_halfwidth, time_budget, confidence, max_simulations,
+                                            hero_range, opponent_ranges, previous, variance_reduction, store,
+                                            need_next_cards):
+        pass
+    return estimate
+
+
+def _table_estimates(sums, trials, confidence):
+    """
+    Per-seat estimates from the summed (seats, 7) sums of _simulate_table_batch.
+    """
+    estimates = []
+    for total, total_sq, win, tie, weighted, weighted_sq, share_sq in sums.tolist():
+        estimate = estimate_from_weighted_sums((total, weighted, total_sq, weighted_sq, share_sq), trials,
+                                               confidence)
+        estimate.win = win / total
+        estimate.tie = tie / total
+        estimate.loss = max(0.0, 1.0 - estimate.win - estimate.tie)
+        estimates.append(estimate)
+    return estimates
+
+
+def iter_table_equity(seats, board, num_simulations=10000, seed=None, workers=None, target_se=None,
+                      ci_halfwidth=None, time_budget=None, confidence=0.95, max_simulations=MAX_ADAPTIVE_SIMULATIONS,
+                      ranges=None):
+    """
+    Progressive equity of every seat in the hand from one shared simulation.
+
+    Any mix of seats with known hole cards, a range or random cards can be
+    given. Every trial deals one runout and scores each seat on it, so all
+    seats are estimated for the cost of one simulation instead of one per
+    seat, and their equities always add up to 1. A tie splits the pot
+    between exactly the seats that share the best hand.
+
+    Stopping works as in iter_equity; a precision target has to be met by
+    every seat.
+
+    :param seats: list with one entry per seat still in the hand: its two
+                  hole card indices, or None when unknown
+    :param board: known community card indices
+    :param ranges: optional list with a range per seat (see
+                   calculate_win_probability), used for seats whose cards
+                   are unknown; missing entries are random
+    :return: generator of (list of EquityEstimate, done) pairs; each seat's
+             estimate also has its win, tie and loss probabilities set
+    """
+    seats = [list(hand) if hand else [] for hand in seats]
+    known = [card for hand in seats for card in hand] + list(board)
+    if any(len(hand) not in (0, 2) for hand in seats):
+        raise ValueError("Every seat needs two hole cards or none")
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("The board must have 0, 3, 4 or 5 cards")
+    if len(set(known)) != len(known):
+        raise ValueError("A card is used twice")
+    se_target = _se_target(target_se, ci_halfwidth, confidence)
+    limit = max_simulations if se_target is not None else num_simulations
+    if limit < 1:
+        raise ValueError("At least one trial has to be simulated")
+    unknown = sum(1 for hand in seats if not hand)
+    if 2 * unknown + 5 - len(board) > 52 - len(known):
+        raise ValueError("Not enough cards left to deal every seat")
+
+    seat_weights = [range_weights(spec) for spec in ranges or ()]
+    if len(seat_weights) > len(seats):
+        raise ValueError(f"Got {len(seat_weights)} ranges for {len(seats)} seats")
+    seat_weights += [None] * (len(seats) - len(seat_weights))
+    known_mask = int(np.bitwise_or.reduce(CARD_MASKS[known])) if known else 0
+    for seat, (hand, weights) in enumerate(zip(seats, seat_weights)):
+        if hand:
+            seat_weights[seat] = None  # known cards take precedence over a range
+        elif weights is not None and combo_count(weights, known_mask) == 0:
+            raise ValueError(f"The range of seat {seat + 1} has no hands left after the known cards")
+
+    if len(seats) == 1:
+        yield [_trivial_estimate(1.0, confidence)], True
+        return
+
+    entropy = np.random.SeedSequence(seed).entropy
+    args = (seats, list(board), seat_weights, limit, entropy)
+    sums = np.zeros((len(seats), 7))
+    trials = 0
+    started = time.perf_counter()
+    results = _iter_batch_results(_simulate_table_batches, args, limit, workers)
+    try:
+        for batch_sums, batch_trials in results:
+            sums += batch_sums
+            trials += batch_trials
+            if sums[0, 0] == 0:
+                raise ValueError("No deal is consistent with the given ranges")
+            estimates = _table_estimates(sums, trials, confidence)
+            done = (trials >= limit
+                    or (se_target is not None and trials >= MIN_ADAPTIVE_TRIALS
+                        and max(estimate.std_error for estimate in estimates) <= se_target)
+                    or (time_budget is not None and time.perf_counter() - started >= time_budget))
+            yield estimates, done
+            if done:
+                return
+    finally:
+        results.close()
+
+
+def table_equity(seats, board, num_simulations=10000, seed=None, workers=None, target_se=None, ci_halfwidth=None,
+                 time_budget=None, confidence=0.95, max_simulations=MAX_ADAPTIVE_SIMULATIONS, ranges=None):
+    """
+    Equity, win, tie and loss of every seat in the hand.
+
+    Parameters are the same as iter_table_equity.
+    :return: list of EquityEstimate, one per seat, with win, tie and loss set
+    """
+    for estimates, _ in iter_table_equity(seats, board, num_simulations, seed, workers, target_se, ci_halfwidth,
+                                          time_budget, confidence, max_simulations, ranges):
+        pass
+    return estimates
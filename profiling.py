@@ -0,0 +1,287 @@
+# project_folder/profiling.py
+#
+# Opt-in timing instrumentation for the equity engines and the GUI.
+# Instrumented functions record a span per call, hot loops add their
+# per-phase time (deal, evaluate, ...) to named timers, and counters track
+# trials and hand evaluations. While profiling is disabled, which is the
+# default, instrumented functions are left undecorated and every other
+# hook costs one test of the module flag `enabled`.
+#
+# Set POKER_PROFILE to a file name to profile any entry point. At exit it
+# writes a Chrome trace there, for chrome://tracing or ui.perfetto.dev,
+# and a JSON summary of the timers and counters next to it:
+#     POKER_PROFILE=trace.json python main.py
+# Also set POKER_PROFILE_SAMPLES to a directory to sample the stack of
+# every instrumented GUI action. Each action writes one collapsed-stack
+# file, the input of flamegraph.pl and speedscope.
+# Work done on the process pool is not seen; profile with one worker to
+# time the simulation phases.
+
+import atexit
+from collections import Counter, defaultdict
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+enabled = False
+# Directory for the stack samples of instrumented GUI actions, or None
+sample_directory = None
+# Spans kept for the trace; the timers keep counting past this
+MAX_EVENTS = 1000000
+SAMPLE_INTERVAL = 0.001
+
+_lock = threading.Lock()
+_events = []  # (name, category, start ns, duration ns, thread id, thread name, args)
+_timers = defaultdict(lambda: [0, 0, 0])  # name -> [calls, total ns, max ns]
+_counters = defaultdict(int)
+_samples_written = Counter()
+_sampled_threads = set()  # threads with a Sampler running, so nested actions are not sampled again
+_origin = time.perf_counter_ns()
+
+
+def enable(flag=True):
+    global enabled
+    enabled = flag
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _timers.clear()
+        _counters.clear()
+
+
+def record(name, category, start, duration, args=None):
+    """
+    Add a finished span: a timer update plus an event for the trace.
+
+    :param start: time.perf_counter_ns() at the start
+    :param duration: nanoseconds
+    """
+    thread = threading.current_thread()
+    with _lock:
+        timer = _timers[name]
+        timer[0] += 1
+        timer[1] += duration
+        timer[2] = max(timer[2], duration)
+        if len(_events) < MAX_EVENTS:
+            _events.append((name, category, start, duration, thread.ident, thread.name, args))
+
+
+def add_time(name, duration, calls=1):
+    """
+    Add nanoseconds to a timer without a trace event, for phases of a hot
+    loop that are summed up before they are reported. Such timers have no
+    maximum.
+    """
+    with _lock:
+        timer = _timers[name]
+        timer[0] += calls
+        timer[1] += duration
+
+
+def count(name, amount=1):
+    if enabled:
+        with _lock:
+            _counters[name] += amount
+
+
+class _Span:
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.category, self.start, time.perf_counter_ns() - self.start, self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category='engine', args=None):
+    """
+    Context manager timing a block as one span; a shared no-op when disabled.
+    """
+    return _Span(name, category, args) if enabled else _NULL_SPAN
+
+
+def instrument(name=None, category='engine', sample=False, slot=False):
+    """
+    Decorator recording a span for every call of a function.
+
+    Whether to instrument is decided when the function is decorated: with
+    profiling disabled the function is returned unchanged, so enable it
+    (POKER_PROFILE does) before the instrumented modules are imported.
+
+    :param name: span name, default the function's qualified name
+    :param sample: also sample the call's stack into sample_directory, for
+                   single GUI actions
+    :param slot: the function is connected to Qt signals; positional
+                 arguments beyond what it takes are dropped, as Qt does for
+                 plain slots (e.g. the `checked` flag of clicked)
+    """
+    def decorate(func):
+        if not enabled:
+            return func
+        label = name or func.__qualname__
+        code = func.__code__
+        max_args = code.co_argcount if slot and not code.co_flags & 0x04 else None  # 0x04: takes *args
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if max_args is not None:
+                args = args[:max_args]
+            if not enabled:
+                return func(*args, **kwargs)
+            sampler = None
+            if sample and sample_directory and threading.get_ident() not in _sampled_threads:
+                sampler = Sampler()
+                sampler.start()
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, category, start, time.perf_counter_ns() - start)
+                if sampler is not None:
+                    sampler.stop()
+                    _samples_written[label] += 1
+                    sampler.write_collapsed(os.path.join(sample_directory,
+                                                         f"{label}-{_samples_written[label]}.folded"))
+        return wrapper
+    return decorate
+
+
+class Sampler:
+    """
+    Sampling profiler for one thread: a background thread reads its stack
+    every `interval` seconds and counts each distinct stack.
+    """
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        _sampled_threads.add(self.thread_id)
+        self._thread = threading.Thread(target=self._run, name='profiling sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        _sampled_threads.discard(self.thread_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            stack = self._stack(sys._current_frames().get(self.thread_id))
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def _stack(frame):
+        """
+        Innermost-first frame names, without the instrumentation wrappers;
+        None while the sampled thread is starting or stopping the sampler.
+        """
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == __file__:
+                if code.co_name != 'wrapper':
+                    return None
+            else:
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return stack
+
+    def write_collapsed(self, path):
+        """
+        Write the samples as collapsed stacks, one 'outer;...;inner count' line each.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+def summary():
+    """
+    :return: dict with 'timers' (name -> calls, total_ms, mean_ms, max_ms)
+             and 'counters' (name -> value)
+    """
+    with _lock:
+        timers = {name: {'calls': calls, 'total_ms': total / 1e6, 'mean_ms': total / 1e6 / max(calls, 1),
+                         'max_ms': longest / 1e6 if longest else None}
+                  for name, (calls, total, longest) in sorted(_timers.items(), key=lambda item: -item[1][1])}
+        return {'timers': timers, 'counters': dict(_counters)}
+
+
+def write_json(path):
+    with open(path, 'w') as f:
+        json.dump(summary(), f, indent=2)
+
+
+def write_chrome_trace(path):
+    """
+    Write the spans in the Chrome trace event format, with the counters
+    and timers as metadata.
+    """
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    trace = []
+    threads = {}
+    for name, category, start, duration, thread_id, thread_name, args in events:
+        threads[thread_id] = thread_name
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': (start - _origin) / 1000,
+                 'dur': duration / 1000, 'pid': pid, 'tid': thread_id}
+        if args:
+            event['args'] = args
+        trace.append(event)
+    trace += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id, 'args': {'name': thread_name}}
+              for thread_id, thread_name in threads.items()]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms', 'otherData': summary()}, f)
+
+
+def write_reports(path):
+    """
+    Write the Chrome trace to path and the summary to <path stem>.summary.json.
+    """
+    write_chrome_trace(path)
+    write_json(os.path.splitext(path)[0] + '.summary.json')
+
+
+def configure_from_environment():
+    global sample_directory
+    path = os.environ.get('POKER_PROFILE')
+    if path:
+        enable()
+        sample_directory = os.environ.get('POKER_PROFILE_SAMPLES') or None
+        atexit.register(write_reports, path)
+
+
+configure_from_environment()
@@ -0,0 +1,172 @@
+# project_folder/ranges.py
+
+from itertools import combinations
+
+import numpy as np
+
+from cards import CARD_BITS, RANKS, STRING_TO_INDEX
+from preflop import hand_class
+
+# A range gives every one of the 1326 two-card holdings (combos) a weight
+# between 0 and 1: how likely a player is to hold it relative to the others.
+# Combos are the pairs (low, high) of 0..51 card indices in combinations()
+# order. Ranges are written in the usual shorthand, e.g.
+#     "22+, A2s+, KTo+, QJs:0.5, AsKd"
+# or given as a 13x13 weight matrix in the preflop.py grid layout.
+
+NUM_COMBOS = 1326
+
+COMBOS = np.array(list(combinations(range(52), 2)), dtype=np.intp)
+COMBO_INDEX = {(int(low), int(high)): index for index, (low, high) in enumerate(COMBOS)}
+COMBO_MASKS = np.array([CARD_BITS[low] | CARD_BITS[high] for low, high in COMBOS], dtype=np.uint64)
+# Starting hand class of every combo, as a flat index row * 13 + col into the grid
+COMBO_CLASS = np.array([row * 13 + col for row, col in (hand_class(low, high) for low, high in COMBOS)],
+                       dtype=np.intp)
+
+
+def _rank(char):
+    rank = RANKS.find(char.upper())
+    if rank < 0:
+        raise ValueError(f"Unknown rank {char!r}")
+    return rank
+
+
+def _parse_hand(hand):
+    """
+    Split a class like 'AKs', 'T9o', 'QJ' or '88' into (high, low, suitedness).
+    """
+    if len(hand) not in (2, 3) or (len(hand) == 3 and hand[2].lower() not in 'so'):
+        raise ValueError(f"Cannot parse hand {hand!r}")
+    first, second = _rank(hand[0]), _rank(hand[1])
+    suitedness = hand[2].lower() if len(hand) == 3 else ''
+    if first == second and suitedness:
+        raise ValueError(f"A pair cannot be suited or offsuit: {hand!r}")
+    return max(first, second), min(first, second), suitedness
+
+
+def _class_cells(high, low, suitedness):
+    """
+    Grid cells (row, col) covered by a class; both cells when suitedness is ''.
+    """
+    if high == low:
+        return [(high, high)]
+    cells = []
+    if suitedness in ('s', ''):
+        cells.append((high, low))
+    if suitedness in ('o', ''):
+        cells.append((low, high))
+    return cells
+
+
+def _token_cells(token):
+    """
+    Grid cells named by one range token without its weight: 'QQ', '22+',
+    'QQ-88', 'AKs', 'A2s+', 'KTo+', 'K9s-K6s'.
+    """
+    if '-' in token:
+        start, end = (part.strip() for part in token.split('-', 1))
+        high1, low1, suit1 = _parse_hand(start)
+        high2, low2, suit2 = _parse_hand(end)
+        if suit1 != suit2:
+            raise ValueError(f"Both ends of {token!r} must have the same suitedness")
+        if high1 == low1 and high2 == low2:
+            pairs = range(min(high1, high2), max(high1, high2) + 1)
+            return [(rank, rank) for rank in pairs]
+        if high1 != high2 or high1 == low1 or high2 == low2:
+            raise ValueError(f"Cannot parse span {token!r}")
+        kickers = range(min(low1, low2), max(low1, low2) + 1)
+        return [cell for kicker in kickers for cell in _class_cells(high1, kicker, suit1)]
+
+    if token.endswith('+'):
+        high, low, suitedness = _parse_hand(token[:-1])
+        if high == low:
+            return [(rank, rank) for rank in range(low, len(RANKS))]
+        return [cell for kicker in range(low, high) for cell in _class_cells(high, kicker, suitedness)]
+
+    return _class_cells(*_parse_hand(token))
+
+
+def parse_range(text):
+    """
+    Parse range shorthand into combo weights.
+
+    Tokens are separated by commas; each names starting hand classes
+    ('AKs', 'AKo', 'AK', 'TT'), a run of them ('22+', 'A2s+', 'QQ-88',
+    'K9s-K6s') or one exact combo ('AsKd'). A token can end in ':weight'
+    to include its hands with that weight instead of 1. Later tokens
+    override earlier ones.
+
+    :param text: range string, e.g. "22+, A2s+, KTo+"
+    :return: float64 array of NUM_COMBOS weights
+    """
+    weights = np.zeros(NUM_COMBOS)
+    for token in text.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        weight = 1.0
+        if ':' in token:
+            token, weight_text = (part.strip() for part in token.split(':', 1))
+            try:
+                weight = float(weight_text)
+            except ValueError:
+                raise ValueError(f"Bad weight {weight_text!r}") from None
+            if not 0.0 <= weight <= 1.0:
+                raise ValueError(f"Weight must be between 0 and 1, got {weight_text!r}")
+
+        if len(token) == 4 and token[:2] in STRING_TO_INDEX and token[2:] in STRING_TO_INDEX:
+            first, second = STRING_TO_INDEX[token[:2]], STRING_TO_INDEX[token[2:]]
+            if first == second:
+                raise ValueError(f"Combo {token!r} uses the same card twice")
+            weights[COMBO_INDEX[min(first, second), max(first, second)]] = weight
+            continue
+
+        for row, col in _token_cells(token):
+            weights[COMBO_CLASS == row * 13 + col] = weight
+    return weights
+
+
+def range_weights(spec):
+    """
+    Combo weights for any supported range description.
+
+    :param spec: None or '' for a random hand, a range string, a 13x13
+                 class weight matrix or a NUM_COMBOS weight vector
+    :return: float64 array of NUM_COMBOS weights, or None when the range
+             is every hand equally (the same as a random hand)
+    """
+    if spec is None:
+        return None
+    if isinstance(spec, str):
+        if not spec.strip():
+            return None
+        weights = parse_range(spec)
+    else:
+        spec = np.asarray(spec, dtype=np.float64)
+        if spec.shape == (13, 13):
+            weights = spec.ravel()[COMBO_CLASS]
+        elif spec.shape == (NUM_COMBOS,):
+            weights = spec.copy()
+        else:
+            raise ValueError(f"A weight matrix must be 13x13 or {NUM_COMBOS} long, got shape {spec.shape}")
+        if np.any(weights < 0):
+            raise ValueError("Range weights cannot be negative")
+    if not weights.any():
+        raise ValueError("Range is empty")
+    if np.all(weights == weights[0]):
+        return None
+    return weights
+
+
+def combo_count(weights, dead_mask=0):
+    """
+    Weighted number of combos in a range that avoid the dead cards.
+
+    :param weights: NUM_COMBOS weights, or None for a random hand
+    :param dead_mask: 52-bit mask of cards that cannot be held
+    :return: float
+    """
+    live = (COMBO_MASKS & np.uint64(dead_mask)) == 0
+    if weights is None:
+        return float(np.count_nonzero(live))
+    return float(weights[live].sum())
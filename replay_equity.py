@@ -0,0 +1,227 @@
+# project_folder/replay_equity.py
+#
+# Bulk equity for hand-history archives (see hand_history.py for the
+# format): the equity of every seat still in the hand on every street it
+# reached, computed on the shared process pool one hand per task.
+#     python -m replay_equity archive.txt -o results/
+#     python -m replay_equity archive.jsonl.gz -o results/ --ci-halfwidth 0.005
+#
+# Results go to numbered column files results/part-00000.npz, ... of
+# --part-size hands each, with the columns
+#     hand, street, seat, equity, std_error, win, tie, trials, all_in
+# (one row per seat and street) and the per-hand columns
+#     hand_index, hand_id, error
+# where error is empty unless the hand could not be read. After each part
+# results/checkpoint.json records where in the archive it ended, so running
+# the same command again after an interruption resumes from there. Every
+# hand and street has its own seed, so a resumed run gives the same numbers
+# as an uninterrupted one. Memory stays flat: only one part and a bounded
+# number of hands in flight are held at a time.
+
+import argparse
+from collections import deque
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from hand_history import BOARD_SIZES, iter_records, open_archive, parse_hand
+from parallel import default_workers, get_pool
+from probability import table_equity
+
+# Hands submitted ahead per worker; they are collected in archive order so
+# the checkpoint offset never passes a hand whose rows are not written yet
+HANDS_PER_WORKER = 8
+CHECKPOINT_NAME = 'checkpoint.json'
+
+ROW_COLUMNS = (('hand', np.int64), ('street', np.int8), ('seat', np.int16), ('equity', np.float64),
+               ('std_error', np.float64), ('win', np.float64), ('tie', np.float64), ('trials', np.int64),
+               ('all_in', np.bool_))
+HAND_COLUMNS = ('hand_index', 'hand_id', 'error')
+
+
+def replay_hand(hand, options, seed):
+    """
+    Equity of every seat on every street of one hand.
+
+    :param hand: dict from hand_history.parse_hand
+    :param options: dict with trials, ci_halfwidth and confidence
+    :param seed: seed of the hand; each street adds its index
+    :return: list of row tuples in ROW_COLUMNS order, without the hand index
+    """
+    rows = []
+    for street, board_size in enumerate(BOARD_SIZES):
+        if board_size > len(hand['board']):
+            break
+        seats = [seat for seat in hand['seats'] if seat['folds'] is None or seat['folds'] >= street]
+        if len(seats) < 2:
+            break
+        cards = [seat['cards'] for seat in seats]
+        board = hand['board'][:board_size]
+        # With every card known on the river one deal settles it
+        trials = 1 if board_size == 5 and all(cards) else options['trials']
+        estimates = table_equity(cards, board, trials, seed=(seed, street),
+                                 ci_halfwidth=None if trials == 1 else options['ci_halfwidth'],
+                                 confidence=options['confidence'])
+        for seat, estimate in zip(seats, estimates):
+            rows.append((street, seat['seat'], float(estimate), estimate.std_error, estimate.win, estimate.tie,
+                         estimate.trials, street == hand['all_in']))
+    return rows
+
+
+def replay_record(index, record, options, seed):
+    """
+    Parse and replay one archive record. Also the process pool task.
+
+    :return: (index, hand id, error message or '', rows)
+    """
+    hand_id = ''
+    try:
+        hand = parse_hand(record)
+        hand_id = hand['id'] or ''
+        return index, hand_id, '', replay_hand(hand, options, (seed, index))
+    except (ValueError, TypeError) as e:
+        return index, hand_id, str(e), []
+
+
+def write_part(directory, part, hands, rows):
+    """
+    Write one part file, atomically so a crash never leaves half a part.
+
+    :param hands: list of (hand index, hand id, error)
+    :param rows: list of row tuples in ROW_COLUMNS order
+    """
+    columns = {name: np.array([row[column] for row in rows], dtype=dtype)
+               for column, (name, dtype) in enumerate(ROW_COLUMNS)}
+    columns.update((name, np.array([hand[column] for hand in hands], dtype=np.int64 if column == 0 else str))
+                   for column, name in enumerate(HAND_COLUMNS))
+    path = os.path.join(directory, f'part-{part:05d}.npz')
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(f, **columns)
+    os.replace(path + '.tmp', path)
+
+
+def write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def iter_parts(directory):
+    """
+    Read the parts of a results directory one at a time.
+
+    :return: generator of dicts from column name to numpy array
+    """
+    for path in sorted(glob.glob(os.path.join(directory, 'part-*.npz'))):
+        with np.load(path) as part:
+            yield dict(part)
+
+
+def run(archive, directory, options, seed=0, workers=None, part_size=1000, restart=False, progress=None):
+    """
+    Replay an archive into a results directory, resuming an earlier run of
+    the same archive and settings unless restart is set.
+
+    :param progress: optional callable(checkpoint dict, hands in the part) after each part
+    :return: the final checkpoint dict
+    """
+    os.makedirs(directory, exist_ok=True)
+    checkpoint_path = os.path.join(directory, CHECKPOINT_NAME)
+    settings = {'archive': os.path.abspath(archive), 'options': options, 'seed': seed, 'part_size': part_size}
+    checkpoint = {'settings': settings, 'offset': 0, 'hands': 0, 'errors': 0, 'parts': 0, 'complete': False}
+    if not restart and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            previous = json.load(f)
+        if previous['settings'] != settings:
+            raise ValueError(f"{directory} holds a run with other settings; use a new directory or restart")
+        checkpoint = previous
+        if checkpoint['complete']:
+            return checkpoint
+    else:
+        for path in glob.glob(os.path.join(directory, 'part-*.npz')):
+            os.remove(path)
+
+    workers = workers or default_workers()
+    pool = get_pool(workers) if workers > 1 else None
+    hands, rows = [], []
+    pending = deque()
+
+    def collect(result, offset):
+        index, hand_id, error, hand_rows = result
+        hands.append((index, hand_id, error))
+        rows.extend((index,) + row for row in hand_rows)
+        checkpoint['errors'] += bool(error)
+        if len(hands) >= part_size:
+            flush(offset)
+
+    def flush(offset):
+        write_part(directory, checkpoint['parts'], hands, rows)
+        checkpoint.update(offset=offset, hands=checkpoint['hands'] + len(hands), parts=checkpoint['parts'] + 1)
+        write_json(checkpoint_path, checkpoint)
+        if progress:
+            progress(checkpoint, len(hands))
+        hands.clear()
+        rows.clear()
+
+    index = checkpoint['hands']
+    offset = checkpoint['offset']
+    with open_archive(archive) as file:
+        for record, offset in iter_records(file, offset):
+            if pool is None:
+                collect(replay_record(index, record, options, seed), offset)
+            else:
+                pending.append((pool.submit(replay_record, index, record, options, seed), offset))
+                while pending and (len(pending) > workers * HANDS_PER_WORKER or pending[0][0].done()):
+                    future, end = pending.popleft()
+                    collect(future.result(), end)
+            index += 1
+        while pending:
+            future, end = pending.popleft()
+            collect(future.result(), end)
+    if hands:
+        flush(offset)
+    checkpoint['complete'] = True
+    write_json(checkpoint_path, checkpoint)
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute per-street equities for a hand-history archive.")
+    parser.add_argument('archive', help="hand-history file, optionally .gz")
+    parser.add_argument('-o', '--output', required=True, help="directory for the result parts and checkpoint")
+    parser.add_argument('--workers', type=int, default=None, help="pool processes (default: CPU count)")
+    parser.add_argument('--trials', type=int, default=10000, help="trials per street without a precision target")
+    parser.add_argument('--ci-halfwidth', type=float, default=None)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--part-size', type=int, default=1000, help="hands per part file and checkpoint")
+    parser.add_argument('--restart', action='store_true', help="discard an earlier run instead of resuming it")
+    args = parser.parse_args()
+
+    options = {'trials': args.trials, 'ci_halfwidth': args.ci_halfwidth, 'confidence': args.confidence}
+    started = time.perf_counter()
+    replayed = 0
+
+    def report(checkpoint, part_hands):
+        nonlocal replayed
+        replayed += part_hands
+        rate = replayed / max(time.perf_counter() - started, 1e-9) * 60
+        print(f"part {checkpoint['parts'] - 1}: {checkpoint['hands']:,} hands, {checkpoint['errors']} errors "
+              f"({rate:,.0f} hands/min)", file=sys.stderr, flush=True)
+
+    try:
+        checkpoint = run(args.archive, args.output, options, args.seed, args.workers, args.part_size,
+                         args.restart, report)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        raise SystemExit(130)
+    print(f"{checkpoint['hands']:,} hands in {checkpoint['parts']} parts, {checkpoint['errors']} errors",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# project_folder/sampling.py
+
+import random
+
+import numpy as np
+
+# Dealing only draws the cards a trial actually needs, with a partial
+# Fisher-Yates shuffle: step i swaps a uniformly chosen card from positions
+# i..n-1 into position i, so after k steps the first k positions are a
+# uniform random sample of k distinct cards. The rest of the deck is never
+# touched, and no per-trial copy of the deck is made.
+
+# Largest (trials, combos) array built at once when dealing from a range,
+# and the number of combos per block of its two-level inverse CDF
+RANGE_CHUNK_ELEMENTS = 1 << 17
+RANGE_BLOCK = 16
+# Block totals as a matrix-vector product, much faster than sum() over a short axis
+_BLOCK_ONES = np.ones(RANGE_BLOCK)
+
+
+def deal_batch(remaining, cards_needed, trials, rng, buffer=None):
+    """
+    Deal `cards_needed` distinct cards to each of `trials` trials at once.
+
+    The deck is held as a (cards, trials) array so every shuffle step works
+    on contiguous rows across all trials.
+
+    :param remaining: int array of the cards that can be dealt
+    :param cards_needed: cards to draw per trial
+    :param trials: number of trials
+    :param rng: numpy Generator
+    :param buffer: optional preallocated (len(remaining), >= trials) array,
+                   reused between batches to avoid reallocating the deck
+    :return: (cards_needed, trials) array, one column of dealt cards per trial
+    """
+    num_cards = len(remaining)
+    if buffer is None:
+        buffer = np.empty((num_cards, trials), dtype=remaining.dtype)
+    deck = buffer[:, :trials]
+    deck[:] = remaining[:, None]
+    columns = np.arange(trials)
+    for position in range(cards_needed):
+        swap = rng.integers(position, num_cards, size=trials)
+        drawn = deck[swap, columns]
+        deck[swap, columns] = deck[position]
+        deck[position] = drawn
+    return deck[:cards_needed]
+
+
+def place_cards(cards, rows, targets):
+    """
+    Force given cards into given positions of a dealt batch, in place.
+
+    A target card that was dealt elsewhere in its trial swaps places with
+    the card at its position; otherwise it replaces that card. Either way
+    the other positions stay a uniform deal of the cards not placed, so the
+    batch becomes a uniform deal conditioned on the placed cards.
+
+    :param cards: (cards_needed, trials) array from deal_batch
+    :param rows: positions to fill, one per target row
+    :param targets: (len(rows), trials) array of distinct cards per trial
+    """
+    for row, target in zip(rows, targets):
+        match = cards == target
+        found = np.flatnonzero(match.any(axis=0))
+        cards[match.argmax(axis=0)[found], found] = cards[row, found]
+        cards[row] = target
+
+
+def partial_shuffle(deck, count, rand=random.random):
+    """
+    Move `count` uniformly chosen cards to the front of `deck`, in place.
+
+    Any arrangement of the deck is a valid starting point, so the same list
+    can be reused for every trial without copying or resetting it.
+
+    :param deck: list of cards, modified in place
+    :param count: number of cards needed at the front
+    :param rand: source of uniform floats in [0, 1)
+    """
+    size = len(deck)
+    for position in range(count):
+        swap = position + int(rand() * (size - position))
+        deck[position], deck[swap] = deck[swap], deck[position]
+
+
+def deal_from_range(combo_masks, weights, dead, rng):
+    """
+    Deal one holding per trial from a weighted range, avoiding dead cards.
+
+    Combos that clash with a trial's dead cards get weight zero for that
+    trial and one is drawn from the rest by inverse CDF, so every draw
+    succeeds without rejection. Because the draw is conditioned on the
+    cards already out, it is biased towards combos that were blocked less
+    often; the returned live weight corrects that (see probability.py).
+
+    :param combo_masks: uint64 array of the range's combos with non-zero weight
+    :param weights: float array of their weights
+    :param dead: uint64 array of dead card masks, one per trial
+    :param rng: numpy Generator
+    :return: (masks, live) - the dealt combo mask and the total live weight
+             per trial; live is 0 where every combo was blocked
+    """
+    trials = len(dead)
+    # Combos are grouped into blocks: a trial first picks a block by its live
+    # weight, then a combo inside it, so running sums are only taken over
+    # block totals and one block per trial instead of over every combo
+    num_blocks = -(-len(combo_masks) // RANGE_BLOCK)
+    padding = num_blocks * RANGE_BLOCK - len(combo_masks)
+    combo_masks = np.concatenate((combo_masks, np.zeros(padding, dtype=np.uint64)))
+    weights = np.concatenate((weights, np.zeros(padding)))
+
+    masks = np.empty(trials, dtype=np.uint64)
+    live = np.empty(trials)
+    # Trials are handled in chunks so the (trials, combos) temporaries stay small
+    step = max(1, RANGE_CHUNK_ELEMENTS // len(combo_masks))
+    for start in range(0, trials, step):
+        chunk = dead[start:start + step]
+        size = len(chunk)
+        rows = np.arange(size)
+        allowed = (((combo_masks[None, :] & chunk[:, None]) == 0) * weights).reshape(size, num_blocks, RANGE_BLOCK)
+        # One running sum over all the chunk's rows, so a single sorted search
+        # finds every trial's block; row t spans [starts[t], ends[t]] of it
+        cumulative = np.cumsum(allowed @ _BLOCK_ONES, axis=None)
+        ends = cumulative[num_blocks - 1::num_blocks]
+        starts = np.concatenate(([0.0], ends[:-1]))
+        # Stay strictly below the row's end so rounding never lands in the next row
+        targets = np.minimum(starts + rng.random(size) * (ends - starts), np.nextafter(ends, 0))
+        found = np.searchsorted(cumulative, targets, side='right')
+        # Only rows with no live combo can still fall outside their row
+        blocks = np.clip(found - rows * num_blocks, 0, num_blocks - 1)
+        before = np.where(blocks > 0, cumulative[np.maximum(found - 1, 0)], starts)
+
+        inside = np.cumsum(allowed[rows, blocks], axis=1)
+        offsets = np.minimum(targets - before, np.nextafter(inside[:, -1], 0))
+        picks = np.minimum(np.count_nonzero(inside <= offsets[:, None], axis=1), RANGE_BLOCK - 1)
+        masks[start:start + size] = combo_masks[blocks * RANGE_BLOCK + picks]
+        live[start:start + size] = ends - starts
+    return masks, live
+
+
+def deal_around(remaining, card_masks, dead, cards_needed, rng):
+    """
+    Deal `cards_needed` distinct random cards per trial, skipping each
+    trial's dead cards.
+
+    Every card gets a random key and dead cards get a key above all others;
+    the cards with the smallest keys are dealt in key order.
+
+    :param remaining: int array of the cards that may be dealt
+    :param card_masks: uint64 masks of those cards
+    :param dead: uint64 array of dead card masks, one per trial
+    :param cards_needed: cards to draw per trial
+    :param rng: numpy Generator
+    :return: (cards_needed, trials) array of card indices
+    """
+    trials = len(dead)
+    if cards_needed == 0:
+        return np.empty((0, trials), dtype=remaining.dtype)
+    keys = rng.random((len(remaining), trials))
+    keys[(card_masks[:, None] & dead[None, :]) != 0] = 2.0
+    chosen = np.argpartition(keys, cards_needed - 1, axis=0)[:cards_needed]
+    order = np.argsort(np.take_along_axis(keys, chosen, axis=0), axis=0)
+    return remaining[np.take_along_axis(chosen, order, axis=0)]
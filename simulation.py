@@ -1,68 +1,95 @@
-import random
+from time import perf_counter_ns
 
+from cards import CARD_BITS, CARD_INDEX, card_mask
+from estimate import CATEGORY_NAMES, estimate_from_outcomes
+from handeval import CATEGORY_SHIFT, evaluate_mask
+import profiling
+from sampling import partial_shuffle
 
+
+@profiling.instrument('simulate_win_probability')
 def simulate_win_probability(hero_cards, community_cards, deck,
                              num_opponents=7, n_simulations=10000):
     """
-    Returns the approximate probability of 'hero_cards' winning against
-    `num_opponents` in a Monte Carlo simulation, given partial community cards.
+    Returns the approximate equity of 'hero_cards' against `num_opponents`
+    in a Monte Carlo simulation, given partial community cards. A trial the
+    hero shares with k - 1 opponents counts as 1/k of a win, so the result
+    agrees with probability.win_probability.
+
+    Cards may be strings (e.g. 'As') or 0..51 indices; they are converted to
+    indices once up front and every trial works on card masks only. Each
+    trial only draws the cards it needs, by partially shuffling one deck
+    list in place, and reads them by position, so no list is built per
+    trial. With profiling enabled the time spent dealing and evaluating is
+    added to the 'simulation.deal' and 'simulation.evaluate' timers.
 
-    :param hero_cards: list of exactly 2 card strings (e.g. ['As', 'Kd'])
+    :param hero_cards: list of exactly 2 cards (e.g. ['As', 'Kd'])
     :param community_cards: list of already-known community cards (0 to 5)
     :param deck: full 52-card deck (or leftover deck) as a list
     :param num_opponents: how many opponents (7 for an 8-player total)
     :param n_simulations: how many random deals to run
-    :return: float in [0, 1] for estimated win probability
+    :return: EquityEstimate (a float in [0, 1]) of the estimated equity,
+             with win, tie, loss and the hero's hand categories set
     """
-    import copy
-    from rules import evaluate_hand, compare_hands  # Adjust if needed
-
-    # Known cards = hero + known community
-    known_cards = set(hero_cards + community_cards)
+    hero_mask = card_mask(CARD_INDEX[card] for card in hero_cards)
+    community_mask = card_mask(CARD_INDEX[card] for card in community_cards)
 
     # The "available" deck for simulation is everything in `deck`
-    # that isn't in known_cards
-    available_deck = [card for card in deck if card not in known_cards]
+    # that isn't already known (hero + known community)
+    known_mask = hero_mask | community_mask
+    deck_indices = [CARD_INDEX[card] for card in deck]
+    available_deck = [card for card in deck_indices if not known_mask & CARD_BITS[card]]
 
-    hero_win_count = 0
+    # Figure out how many community cards still need to be dealt
+    cards_needed = 5 - len(community_cards)  # 0..5
+    opponent_cards = 2 * num_opponents
+    dealt_cards = opponent_cards + cards_needed
+
+    # splits[k] counts trials split k ways (0 = lost), categories the hero's
+    # final hand; both are fixed-size counters updated in place
+    splits = [0] * (num_opponents + 2)
+    categories = [0] * len(CATEGORY_NAMES)
+    timed = profiling.enabled
+    deal_time = evaluate_time = 0
 
     for _ in range(n_simulations):
-        # Shuffle the available deck for random dealing
-        random.shuffle(available_deck)
+        if timed:
+            started = perf_counter_ns()
+        # Bring the cards this trial needs to the front of the deck
+        partial_shuffle(available_deck, dealt_cards)
 
-        # 1) Deal 2 cards to each opponent
-        opponents_hands = []
-        idx = 0
-        for _ in range(num_opponents):
-            opponents_hands.append([available_deck[idx], available_deck[idx + 1]])
-            idx += 2
+        # Opponents hold available_deck[0:opponent_cards] in pairs; the rest
+        # of the board follows, read in place rather than sliced off. If the
+        # board is already known, cards_needed=0
+        board_mask = community_mask
+        for position in range(opponent_cards, dealt_cards):
+            board_mask |= CARD_BITS[available_deck[position]]
 
-        # 2) Figure out how many community cards still need to be dealt
-        cards_needed = 5 - len(community_cards)  # 0..5
-        # if the board is already fully known (river), cards_needed=0
-        board = community_cards + available_deck[idx: idx + cards_needed]
-        idx += cards_needed
+        if timed:
+            dealt = perf_counter_ns()
+            deal_time += dealt - started
+        # Evaluate hero’s best 5-card combination once per trial
+        hero_hand_value = evaluate_mask(hero_mask | board_mask)
 
-        # Evaluate hero’s best 5-card combination
-        hero_hand_value = evaluate_hand(hero_cards + board)
+        categories[hero_hand_value >> CATEGORY_SHIFT] += 1
 
-        # Evaluate each opponent
-        hero_best = True
-        for opp in opponents_hands:
-            opp_hand_value = evaluate_hand(opp + board)
-            # compare_hands(...) can return 1 for hero win, -1 for opp win, 0 tie
-            result = compare_hands(hero_cards + board, opp + board)
-            if result == -1:
-                # Opponent has a strictly better hand; hero loses
-                hero_best = False
-                break
-            elif result == 0:
-                # A tie occurs – some like to treat this as partial credit,
-                # but commonly we'll consider it "not a hero win".
-                hero_best = False
+        # Evaluate each opponent once and compare the integer scores; the
+        # hero splits the pot with every opponent holding an equal hand
+        sharers = 1
+        for idx in range(0, opponent_cards, 2):
+            opp_hand_value = evaluate_mask(board_mask | CARD_BITS[available_deck[idx]]
+                                           | CARD_BITS[available_deck[idx + 1]])
+            if opp_hand_value > hero_hand_value:
+                sharers = 0
                 break
+            if opp_hand_value == hero_hand_value:
+                sharers += 1
+        splits[sharers] += 1
+        if timed:
+            evaluate_time += perf_counter_ns() - dealt
 
-        if hero_best:
-            hero_win_count += 1
-
-    return hero_win_count / n_simulations
+    if timed:
+        profiling.add_time('simulation.deal', deal_time, n_simulations)
+        profiling.add_time('simulation.evaluate', evaluate_time, n_simulations)
+        profiling.count('simulation.trials', n_simulations)
+    return estimate_from_outcomes(splits + categories, num_opponents)
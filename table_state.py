@@ -0,0 +1,186 @@
+# project_folder/table_state.py
+#
+# Compact state of one hand at the table: the deck, the board and every
+# seat's hole cards in fixed-size byte arrays plus a 52-bit mask of the
+# cards already out. Dealing and undoing are O(1) swaps inside the deck
+# array, and copying the state is a handful of array copies, so a
+# simulation or a what-if exploration can clone it thousands of times per
+# second. Cards are 0..51 indices (see cards.py); empty slots hold -1.
+
+from array import array
+import random
+
+from cards import CARD_BITS, CARD_STRINGS, TREYS_CARDS
+
+BOARD_SIZE = 5
+EMPTY = -1
+
+
+class TableState:
+    """
+    Cards of one hand: board slots 0..4, then two hole card slots per seat
+    (seat s holds slots 5 + 2s and 6 + 2s).
+
+    The deck array is a permutation of the 52 cards whose first `dealt`
+    entries are the cards out, in the order they came; `position` is its
+    inverse. Dealing a card swaps it to the end of that prefix, so undo
+    only has to step back and empty the slot the last card went to.
+    """
+
+    __slots__ = ('num_seats', 'deck', 'position', 'slots', 'history', 'dealt', 'used_mask')
+
+    def __init__(self, num_seats):
+        self.num_seats = num_seats
+        self.deck = array('b', range(52))
+        self.position = array('b', range(52))
+        self.slots = array('b', [EMPTY] * (BOARD_SIZE + 2 * num_seats))
+        self.history = array('b')  # slot of every dealt card, in order
+        self.dealt = 0
+        self.used_mask = 0
+
+    def copy(self):
+        """
+        Independent copy of the state; dealing into it leaves this one alone.
+        """
+        clone = TableState.__new__(TableState)
+        clone.num_seats = self.num_seats
+        clone.deck = array('b', self.deck)
+        clone.position = array('b', self.position)
+        clone.slots = array('b', self.slots)
+        clone.history = array('b', self.history)
+        clone.dealt = self.dealt
+        clone.used_mask = self.used_mask
+        return clone
+
+    __copy__ = copy
+
+    def seat_slot(self, seat):
+        """
+        First of the two slots of a seat's hole cards.
+        """
+        if not 0 <= seat < self.num_seats:
+            raise ValueError(f"No seat {seat} at a table of {self.num_seats}")
+        return BOARD_SIZE + 2 * seat
+
+    def deal(self, slot, card=None, rand=random.random):
+        """
+        Put a card into an empty slot.
+
+        :param slot: slot index, see the class docstring
+        :param card: card index to deal, or None for a random card from the deck
+        :param rand: source of uniform floats in [0, 1) for random cards
+        :return: the card dealt
+        """
+        if self.slots[slot] != EMPTY:
+            raise ValueError(f"Slot {slot} already holds {CARD_STRINGS[self.slots[slot]]}")
+        if card is None:
+            if self.dealt == 52:
+                raise ValueError("The deck is empty")
+            card = self.deck[self.dealt + int(rand() * (52 - self.dealt))]
+        elif self.used_mask & CARD_BITS[card]:
+            raise ValueError(f"{CARD_STRINGS[card]} is already dealt")
+        # Swap the card to the end of the dealt prefix
+        top, where = self.dealt, self.position[card]
+        other = self.deck[top]
+        self.deck[top], self.deck[where] = card, other
+        self.position[card], self.position[other] = top, where
+        self.dealt += 1
+        self.slots[slot] = card
+        self.history.append(slot)
+        self.used_mask |= CARD_BITS[card]
+        return card
+
+    def undo(self):
+        """
+        Take back the last card dealt.
+
+        :return: the card, which is back in the deck
+        """
+        if not self.history:
+            raise ValueError("No card has been dealt")
+        slot = self.history.pop()
+        self.dealt -= 1
+        card = self.slots[slot]
+        self.slots[slot] = EMPTY
+        self.used_mask ^= CARD_BITS[card]
+        return card
+
+    def deal_board(self, count=1, cards=None, rand=random.random):
+        """
+        Deal the next board cards, e.g. three for the flop.
+
+        :param cards: the cards to deal, or None for random ones
+        :return: list of the cards dealt
+        """
+        start = self.board_count()
+        if start + count > BOARD_SIZE:
+            raise ValueError(f"The board already has {start} cards")
+        return self._deal_all(range(start, start + count), cards, rand)
+
+    def deal_seat(self, seat, cards=None, rand=random.random):
+        """
+        Deal a seat's two hole cards.
+
+        :param cards: the two cards to deal, or None for random ones
+        :return: list of the cards dealt
+        """
+        slot = self.seat_slot(seat)
+        return self._deal_all((slot, slot + 1), cards, rand)
+
+    def _deal_all(self, slots, cards, rand):
+        """
+        Deal into several slots, all or none: a failed deal undoes the others.
+        """
+        cards = cards if cards is not None else [None] * len(slots)
+        if len(cards) != len(slots):
+            raise ValueError(f"Expected {len(slots)} cards, got {len(cards)}")
+        dealt = []
+        try:
+            for slot, card in zip(slots, cards):
+                dealt.append(self.deal(slot, card, rand))
+        except ValueError:
+            for _ in dealt:
+                self.undo()
+            raise
+        return dealt
+
+    def board_count(self):
+        count = 0
+        while count < BOARD_SIZE and self.slots[count] != EMPTY:
+            count += 1
+        return count
+
+    def board(self):
+        """
+        :return: list of the board cards dealt so far
+        """
+        return list(self.slots[:self.board_count()])
+
+    def seat_cards(self, seat):
+        """
+        :return: list of the hole cards dealt to a seat so far
+        """
+        slot = self.seat_slot(seat)
+        return [card for card in self.slots[slot:slot + 2] if card != EMPTY]
+
+    def undealt(self):
+        """
+        :return: list of the cards still in the deck
+        """
+        return list(self.deck[self.dealt:])
+
+    def is_dealt(self, card):
+        return bool(self.used_mask & CARD_BITS[card])
+
+    @staticmethod
+    def treys(cards):
+        """
+        Treys integers of card indices, for the equity functions.
+        """
+        return [TREYS_CARDS[card] for card in cards]
+
+    def __repr__(self):
+        seats = " ".join("".join(CARD_STRINGS[card] for card in self.seat_cards(seat)) or "--"
+                         for seat in range(self.num_seats))
+        board = "".join(CARD_STRINGS[card] for card in self.board())
+        return f"TableState(board={board or '-'}, seats={seats})"
@@ -0,0 +1,87 @@
+# project_folder/tools/bench_deal.py
+#
+# Microbenchmark of the per-trial cost of dealing random opponent hands and
+# board runouts, before and after switching to partial Fisher-Yates dealing.
+# Run from the project folder:
+#     python -m tools.bench_deal --trials 200000
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from sampling import deal_batch, partial_shuffle
+
+BATCH_SIZE = 4096
+
+
+def copy_shuffle_pop(deck, cards_needed, trials):
+    # Old probability.py loop: copy the deck, shuffle it all, pop each card
+    for _ in range(trials):
+        trial_deck = list(deck)
+        random.shuffle(trial_deck)
+        for _ in range(cards_needed):
+            trial_deck.pop()
+
+
+def full_shuffle(deck, cards_needed, trials):
+    # Old simulation.py loop: shuffle the whole deck in place every trial
+    deck = list(deck)
+    for _ in range(trials):
+        random.shuffle(deck)
+
+
+def scalar_partial(deck, cards_needed, trials):
+    deck = list(deck)
+    for _ in range(trials):
+        partial_shuffle(deck, cards_needed)
+
+
+def vector_argsort(deck, cards_needed, trials):
+    # Old vectorized dealing: sort a full row of random keys per trial
+    rng = np.random.default_rng(0)
+    remaining = np.array(deck)
+    for start in range(0, trials, BATCH_SIZE):
+        size = min(BATCH_SIZE, trials - start)
+        order = np.argsort(rng.random((size, len(remaining))), axis=1)[:, :cards_needed]
+        remaining[order]
+
+
+def vector_partial(deck, cards_needed, trials):
+    rng = np.random.default_rng(0)
+    remaining = np.array(deck)
+    buffer = np.empty((len(remaining), BATCH_SIZE), dtype=remaining.dtype)
+    for start in range(0, trials, BATCH_SIZE):
+        deal_batch(remaining, cards_needed, min(BATCH_SIZE, trials - start), rng, buffer)
+
+
+METHODS = [
+    ('copy+shuffle+pop', copy_shuffle_pop, False),
+    ('full shuffle', full_shuffle, False),
+    ('partial shuffle', scalar_partial, False),
+    ('vector argsort', vector_argsort, True),
+    ('vector partial', vector_partial, True),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time per-trial dealing methods.")
+    parser.add_argument('--trials', type=int, default=200000, help="trials for the vectorized methods")
+    parser.add_argument('--scalar-trials', type=int, default=20000, help="trials for the pure Python methods")
+    args = parser.parse_args()
+
+    deck = list(range(2, 52))  # hero holds cards 0 and 1, no board yet
+    print(f"{'players':>7}  {'method':<18}{'ns/trial':>10}")
+    for players in (2, 6, 10):
+        cards_needed = 2 * (players - 1) + 5
+        for name, method, vectorized in METHODS:
+            trials = args.trials if vectorized else args.scalar_trials
+            started = time.perf_counter()
+            method(deck, cards_needed, trials)
+            elapsed = time.perf_counter() - started
+            print(f"{players:>7}  {name:<18}{elapsed / trials * 1e9:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
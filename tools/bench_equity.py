@@ -0,0 +1,200 @@
+# project_folder/tools/bench_equity.py
+#
+# Benchmark and accuracy regression suite for the two equity engines:
+# probability.win_probability (vectorised) and
+# simulation.simulate_win_probability (one trial at a time). Every spot of
+# the suite, preflop to river at 2, 6 and 10 players, is run with a fixed
+# seed. The suite reports trials/s and hand evaluations/s (the hero and
+# every opponent, once per trial), and checks each answer against a
+# reference value in data/bench_references.json. References are exact
+# enumerations where the engine can enumerate the spot, and otherwise
+# long simulations with their standard error kept alongside. Stratified
+# runs also report their variance gain over plain sampling. Run from
+# the project folder:
+#     python -m tools.bench_equity run --json bench.json
+#     python -m tools.bench_equity compare baseline.json bench.json
+#     python -m tools.bench_equity references   (rebuild the references; slow)
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from cards import CARD_STRINGS, STRING_TO_INDEX
+from probability import exact_space_size, win_probability
+from simulation import simulate_win_probability
+
+REFERENCES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                               'bench_references.json')
+HERO = 'AhKh'
+BOARDS = (('preflop', ''), ('flop', 'Qh7h2c'), ('turn', 'Qh7h2c9s'), ('river', 'Qh7h2c9sKd'))
+PLAYERS = (2, 6, 10)
+# Spots with more evaluations than this get a simulated reference
+REFERENCE_MAX_EXACT = 5 * 10 ** 9
+REFERENCE_TRIALS = 4000000
+
+
+def parse(text):
+    return [STRING_TO_INDEX[text[start:start + 2]] for start in range(0, len(text), 2)]
+
+
+def cases():
+    """
+    :return: list of (case name, street, players, hero, board)
+    """
+    return [(f"{street}-{players}p", street, players, parse(HERO), parse(board))
+            for street, board in BOARDS for players in PLAYERS]
+
+
+def build_references(trials, seed, names=None):
+    """
+    :param names: cases to compute, default all
+    :return: dict of case name -> reference
+    """
+    references = {}
+    for name, _, players, hero, board in cases():
+        if names and name not in names:
+            continue
+        started = time.perf_counter()
+        space = exact_space_size(52 - len(hero) - len(board), players - 1, 5 - len(board))
+        exact = space is not None and space <= REFERENCE_MAX_EXACT
+        estimate = win_probability(hero, board, players - 1, trials, exact=exact, use_preflop_table=False,
+                                   seed=seed)
+        references[name] = {'equity': float(estimate), 'std_error': estimate.std_error, 'method': estimate.method,
+                            'trials': estimate.trials}
+        print(f"{name:>12}: {estimate:.6f} +/- {estimate.std_error:.6f} ({estimate.method}, "
+              f"{time.perf_counter() - started:.0f}s)", flush=True)
+    return references
+
+
+def measure(engine, hero, board, players, trials, seed):
+    """
+    Time one engine on one spot, after a warm-up run.
+
+    :return: (estimate, seconds)
+    """
+    if engine == 'probability':
+        def run_once(count):
+            return win_probability(hero, board, players - 1, count, exact=False, use_preflop_table=False, seed=seed)
+    else:
+        hero_strings = [CARD_STRINGS[card] for card in hero]
+        board_strings = [CARD_STRINGS[card] for card in board]
+
+        def run_once(count):
+            random.seed(seed)
+            return simulate_win_probability(hero_strings, board_strings, list(CARD_STRINGS), players - 1, count)
+    run_once(min(trials, 1000))
+    started = time.perf_counter()
+    estimate = run_once(trials)
+    return estimate, time.perf_counter() - started
+
+
+def run_suite(trials, simulation_trials, seed, engines):
+    with open(REFERENCES_PATH) as f:
+        references = json.load(f)
+    results = []
+    for name, street, players, hero, board in cases():
+        reference = references[name]
+        for engine in engines:
+            count = trials if engine == 'probability' else simulation_trials
+            estimate, seconds = measure(engine, hero, board, players, count, seed)
+            error = float(estimate) - reference['equity']
+            noise = (estimate.std_error ** 2 + reference['std_error'] ** 2) ** 0.5
+            results.append({'case': name, 'engine': engine, 'street': street, 'players': players,
+                            'trials': count, 'seconds': seconds, 'trials_per_s': count / seconds,
+                            'evals_per_s': count * players / seconds, 'equity': float(estimate),
+                            'std_error': estimate.std_error, 'reference': reference['equity'],
+                            'reference_method': reference['method'], 'error': error,
+                            'variance_gain': estimate.variance_gain,
+                            'z': error / noise if noise > 0 else (0.0 if error == 0 else float('inf'))})
+            print(f"{name:>12} {engine:<12}{count / seconds:>12,.0f} trials/s{count * players / seconds:>13,.0f} "
+                  f"evals/s   {estimate:.4f} vs {reference['equity']:.4f} ({reference['method']}) "
+                  f"z {results[-1]['z']:+.2f}"
+                  + (f"  gain {estimate.variance_gain:.1f}x" if estimate.variance_gain else ""), flush=True)
+    return results
+
+
+def compare(old, new, max_slowdown, max_z):
+    """
+    Print the change of every case and list the regressions.
+
+    :return: list of regression messages
+    """
+    before = {(result['case'], result['engine']): result for result in old['results']}
+    regressions = []
+    for result in new['results']:
+        key = (result['case'], result['engine'])
+        label = f"{result['case']} {result['engine']}"
+        if abs(result['z']) > max_z:
+            regressions.append(f"{label}: equity {result['equity']:.4f} is {result['z']:+.1f} standard errors "
+                               f"from the reference {result['reference']:.4f}")
+        if key not in before:
+            print(f"{label:>26}: new case")
+            continue
+        change = result['trials_per_s'] / before[key]['trials_per_s'] - 1
+        print(f"{label:>26}: {before[key]['trials_per_s']:>12,.0f} -> {result['trials_per_s']:>12,.0f} trials/s "
+              f"({change:+.1%}), z {before[key]['z']:+.2f} -> {result['z']:+.2f}")
+        if change < -max_slowdown:
+            regressions.append(f"{label}: {-change:.0%} fewer trials/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and check both equity engines.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="run the suite")
+    run.add_argument('--trials', type=int, default=200000, help="trials per spot for probability.py")
+    run.add_argument('--simulation-trials', type=int, default=5000, help="trials per spot for simulation.py")
+    run.add_argument('--engine', choices=('probability', 'simulation'), action='append',
+                     help="engine to run, may be repeated (default: both)")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--json', default=None, help="write the results to this file")
+    check = commands.add_parser('compare', help="compare two result files")
+    check.add_argument('baseline')
+    check.add_argument('current')
+    check.add_argument('--max-slowdown', type=float, default=0.2, help="tolerated drop in trials/s (0.2 = 20%%)")
+    check.add_argument('--max-z', type=float, default=4.0, help="tolerated standard errors from the reference")
+    build = commands.add_parser('references', help="rebuild " + REFERENCES_PATH)
+    build.add_argument('--trials', type=int, default=REFERENCE_TRIALS, help="trials of simulated references")
+    build.add_argument('--seed', type=int, default=12345)
+    build.add_argument('--case', action='append', help="only rebuild this case, may be repeated")
+    args = parser.parse_args()
+
+    if args.command == 'references':
+        references = {}
+        if args.case and os.path.exists(REFERENCES_PATH):
+            with open(REFERENCES_PATH) as f:
+                references = json.load(f)
+        references.update(build_references(args.trials, args.seed, args.case))
+        references = {name: references[name] for name, *_ in cases() if name in references}
+        with open(REFERENCES_PATH, 'w') as f:
+            json.dump(references, f, indent=2)
+        print(f"Wrote {REFERENCES_PATH}")
+    elif args.command == 'run':
+        results = run_suite(args.trials, args.simulation_trials, args.seed,
+                            args.engine or ('probability', 'simulation'))
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'python': sys.version.split()[0], 'numpy': np.__version__,
+                           'machine': platform.platform(), 'cpus': os.cpu_count(),
+                           'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+    else:
+        with open(args.baseline) as f:
+            old = json.load(f)
+        with open(args.current) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.max_slowdown, args.max_z)
+        for message in regressions:
+            print("REGRESSION " + message)
+        if regressions:
+            raise SystemExit(1)
+        print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# project_folder/tools/bench_ranges.py
+#
+# Compare the cost of equity against weighted opponent ranges with equity
+# against random hands, at 2, 6 and 10 players. Besides the time per trial
+# it reports the time needed to reach a +/-0.005 (95%) interval, since the
+# importance weights of range dealing also change the variance per trial.
+# Run from the project folder:
+#     python -m tools.bench_ranges --trials 100000
+
+import argparse
+import time
+
+from cards import STRING_TO_INDEX
+from estimate import z_score
+from probability import win_probability
+from ranges import NUM_COMBOS, range_weights
+
+TARGET_HALF_WIDTH = 0.005
+
+RANGES = [
+    ('random', None),
+    ('tight', "22+, A2s+, KTo+"),
+    ('wide', "22+, A2+, K2s+, K7o+, Q5s+, Q9o+, J7s+, J9o+, T7s+, T9o, 96s+, 86s+, 75s+, 65s, 54s"),
+]
+
+
+def combos_in(spec):
+    weights = range_weights(spec)
+    return NUM_COMBOS if weights is None else int((weights > 0).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time range-vs-range equity against random opponents.")
+    parser.add_argument('--trials', type=int, default=100000)
+    parser.add_argument('--hero', default='AhKh')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    hero = [STRING_TO_INDEX[args.hero[:2]], STRING_TO_INDEX[args.hero[2:]]]
+    z = z_score(0.95)
+    print(f"{'players':>7}  {'ranges':<7}{'combos':>7}{'equity':>9}{'us/trial':>10}{'s to +/-0.005':>15}")
+    for players in (2, 6, 10):
+        for name, spec in RANGES:
+            opponents = players - 1
+            # Warm up the evaluator tables and allocations before timing
+            win_probability(hero, [], opponents, 4096, exact=False, use_preflop_table=False, seed=args.seed,
+                            opponent_ranges=[spec] * opponents)
+            started = time.perf_counter()
+            estimate = win_probability(hero, [], opponents, args.trials, exact=False, use_preflop_table=False,
+                                       seed=args.seed, opponent_ranges=[spec] * opponents)
+            elapsed = time.perf_counter() - started
+            per_trial = elapsed / args.trials
+            needed = args.trials * (z * estimate.std_error / TARGET_HALF_WIDTH) ** 2
+            print(f"{players:>7}  {name:<7}{combos_in(spec):>7}{estimate:>9.4f}{per_trial * 1e6:>10.2f}"
+                  f"{per_trial * needed:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# project_folder/tools/bench_redraw.py
+#
+# Time the card redraws of the table window: refreshing the available cards
+# grid, drawing and clearing the hero/community cards, and opening the card
+# selection dialog. The first call of each is reported separately, as it
+# includes loading the images. Runs offscreen unless QT_QPA_PLATFORM says
+# otherwise. Run from the project folder:
+#     python -m tools.bench_redraw --repeats 50
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from cards import CARD_STRINGS  # noqa: E402
+from main import CardImageSelectionDialog, PokerUI  # noqa: E402
+
+
+def timed(action, repeats):
+    """
+    :return: (ms of the first call, median ms of the following repeats)
+    """
+    times = []
+    for _ in range(repeats + 1):
+        started = time.perf_counter()
+        action()
+        QApplication.processEvents()
+        times.append((time.perf_counter() - started) * 1000)
+    return times[0], statistics.median(times[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the card redraws of the GUI.")
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    # Constructing the window already draws every card once; time it apart
+    started = time.perf_counter()
+    window = PokerUI(num_players=8, manual_mode=False)
+    window.show()
+    app.processEvents()
+    print(f"window construction: {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+    def redraw_cards():
+        window.clear_card_labels()
+        window.update_card_labels(window.hero_card_labels, window.players[0].cards)
+
+    def open_dialog():
+        dialog = CardImageSelectionDialog("Select", "Pick a card", 1, list(CARD_STRINGS), parent=window)
+        dialog.deleteLater()
+
+    for name, action in (("available cards grid", window.update_available_cards_display),
+                         ("hero/community cards", redraw_cards),
+                         ("card selection dialog", open_dialog)):
+        first, median = timed(action, args.repeats)
+        print(f"{name:>22}: first {first:8.2f} ms, then median {median:8.2f} ms")
+    window.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# project_folder/tools/bench_startup.py
+#
+# Startup benchmark for the GUI entry point. Reports
+#   - the import time of main.py from `python -X importtime`, with the
+#     modules that cost the most, and
+#   - the wall time from launching a fresh interpreter until the table
+#     window has painted, and until the first equity is on screen,
+# as the median of several fresh processes, and fails when the first paint
+# is over budget. Runs offscreen unless QT_QPA_PLATFORM says otherwise.
+# Run from the project folder:
+#     python -m tools.bench_startup --runs 5 --budget-ms 1000 --json startup.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+TOP_MODULES = 10
+
+
+def import_times():
+    """
+    :return: (total microseconds to import main, [(cumulative us, module)] of its direct imports)
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                               capture_output=True, text=True, env=child_env(), check=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.rstrip()))
+    # A module is listed after its imports, which are indented two more spaces
+    end = next(index for index, (_, name) in enumerate(rows) if name == ' main')
+    start = end
+    while start > 0 and rows[start - 1][1].startswith('  '):
+        start -= 1
+    direct = [(cumulative, name.strip()) for cumulative, name in rows[start:end]
+              if not name.startswith('    ')]
+    return rows[end][0], sorted(direct, reverse=True)
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    return env
+
+
+def launch_once():
+    """
+    Start a fresh interpreter running the table window.
+
+    :return: (ms to first paint, ms to first equity shown) from process launch
+    """
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-m', 'tools.bench_startup', '--child'],
+                             stdout=subprocess.PIPE, text=True, env=child_env())
+    marks = {}
+    for line in child.stdout:
+        marks[line.strip()] = (time.perf_counter() - started) * 1000
+    child.wait()
+    return marks['paint'], marks['equity']
+
+
+def child():
+    """
+    Show a random-mode table and print 'paint' and 'equity' as they happen.
+    """
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+    from main import PokerUI
+
+    class Marker(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint and not self.painted:
+                self.painted = True
+                print('paint', flush=True)
+            return False
+
+    app = QApplication(sys.argv)
+    window = PokerUI(num_players=8, manual_mode=False)
+    marker = Marker()
+    marker.painted = False
+    window.installEventFilter(marker)
+
+    def poll_equity():
+        text = window.preflop_label.text()
+        if marker.painted and ('\u00b1' in text or 'exact' in text):
+            print('equity', flush=True)
+            window.close()
+            app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(poll_equity)
+    poll.start(5)
+    window.show()
+    app.exec_()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GUI import time and time to first paint.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="fail when the first paint is slower")
+    parser.add_argument('--json', default=None, help="also write the results to this file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    imports = [import_times() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in imports) / 1000
+    print(f"import main: {import_ms:.1f} ms (median of {args.runs})")
+    for cumulative, name in imports[-1][1][:TOP_MODULES]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+    launches = [launch_once() for _ in range(args.runs)]
+    paint_ms = statistics.median(paint for paint, _ in launches)
+    equity_ms = statistics.median(equity for _, equity in launches)
+    print(f"launch to first paint: {paint_ms:.0f} ms, to first equity: {equity_ms:.0f} ms "
+          f"(median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'runs': args.runs, 'import_main_ms': import_ms,
+                       'first_paint_ms': paint_ms, 'first_equity_ms': equity_ms,
+                       'top_imports_ms': {name: cumulative / 1000 for cumulative, name in imports[-1][1]}},
+                      f, indent=2)
+    if paint_ms > args.budget_ms:
+        raise SystemExit(f"First paint took {paint_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == '__main__':
+    main()
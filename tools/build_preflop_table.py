@@ -0,0 +1,85 @@
+# project_folder/tools/build_preflop_table.py
+#
+# Build step for the preflop equity table used by preflop.py.
+# Run from the project folder:  python -m tools.build_preflop_table
+# With --categories-only the existing table keeps its simulated split
+# probabilities and only the exact hand categories are recomputed.
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from preflop import (
+    CATEGORY_COLUMN, MAX_OPPONENTS, TABLE_COLUMNS, TABLE_PATH, TABLE_TRIALS, class_representative, hand_class_name
+)
+from probability import hand_category_distribution, simulate_outcomes
+
+
+def build_table(trials, seed=0, workers=None, progress=True):
+    """
+    Simulate every starting hand class against 1..MAX_OPPONENTS opponents.
+
+    :param trials: Monte Carlo trials per (hand class, opponents) cell
+    :param seed: base seed, so builds are reproducible
+    :param workers: number of pool processes to split each cell over
+    :param progress: print one line per hand class
+    :return: (13, 13, MAX_OPPONENTS, TABLE_COLUMNS) float32 array of outcome
+             probabilities, laid out as described in preflop.py
+    """
+    table = np.zeros((13, 13, MAX_OPPONENTS, TABLE_COLUMNS), dtype=np.float32)
+    started = time.time()
+    for row in range(13):
+        for col in range(13):
+            hero = list(class_representative(row, col))
+            for opponents in range(1, MAX_OPPONENTS + 1):
+                outcomes = simulate_outcomes(hero, [], opponents, trials, seed=(seed, row, col, opponents),
+                                             workers=workers) / trials
+                table[row, col, opponents - 1, :opponents + 2] = outcomes[:opponents + 2]
+            table[row, col, :, CATEGORY_COLUMN:] = hand_category_distribution(hero, [])
+            if progress:
+                print(f"{hand_class_name(row, col):>4}  "
+                      f"vs1 win {table[row, col, 0, 1]:.4f}  "
+                      f"vs{MAX_OPPONENTS} win {table[row, col, -1, 1]:.4f}  "
+                      f"({time.time() - started:.0f}s)", flush=True)
+    return table
+
+
+def fill_categories(table, progress=True):
+    """
+    Enumerate the exact hand category distribution of every class over all
+    boards into an existing table, in place.
+    """
+    started = time.time()
+    for row in range(13):
+        for col in range(13):
+            table[row, col, :, CATEGORY_COLUMN:] = hand_category_distribution(list(class_representative(row, col)),
+                                                                              [])
+            if progress:
+                print(f"{hand_class_name(row, col):>4}  pair or better {1 - table[row, col, 0, CATEGORY_COLUMN]:.4f}"
+                      f"  ({time.time() - started:.0f}s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the preflop equity table.")
+    parser.add_argument('--trials', type=int, default=TABLE_TRIALS, help="trials per hand class and opponent count")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="pool processes (default: run in-process)")
+    parser.add_argument('--output', default=TABLE_PATH)
+    parser.add_argument('--categories-only', action='store_true',
+                        help="only recompute the hand categories of the table at --output")
+    args = parser.parse_args()
+
+    if args.categories_only:
+        table = np.load(args.output)
+        fill_categories(table)
+    else:
+        table = build_table(args.trials, seed=args.seed, workers=args.workers)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    np.save(args.output, table)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# project_folder/tools/loadgen.py
+#
+# Load generator for equity_service.py: many concurrent keep-alive clients
+# posting spots, reporting client-side latency percentiles and throughput
+# followed by the service's own /metrics. Spots are drawn from a small pool
+# and randomly suit-permuted, so repeats exercise both the cache and the
+# coalescing of suit-isomorphic requests. Run from the project folder:
+#     python -m tools.loadgen --spawn --clients 32 --requests 50
+# or against a service that is already running:
+#     python -m tools.loadgen --port 8765 --clients 32
+
+import argparse
+import asyncio
+import json
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from cards import CARD_STRINGS, SUITS
+from equity_service import percentile
+
+
+def make_spots(count, rng):
+    """
+    Random spots: 2 to 10 players, preflop to river.
+    """
+    spots = []
+    for _ in range(count):
+        cards = rng.sample(CARD_STRINGS, 7)
+        board_size = rng.choice((0, 3, 4, 5))
+        spots.append({'hero': cards[:2], 'board': cards[2:2 + board_size], 'opponents': rng.randint(1, 9)})
+    return spots
+
+
+def permute_suits(spot, rng):
+    """
+    A suit-isomorphic copy of a spot, with the same equity.
+    """
+    relabel = dict(zip(SUITS, rng.sample(SUITS, len(SUITS))))
+    return {**spot,
+            'hero': [card[0] + relabel[card[1]] for card in spot['hero']],
+            'board': [card[0] + relabel[card[1]] for card in spot['board']]}
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, spots, requests, rng, latencies, sources):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            spot = permute_suits(rng.choice(spots), rng)
+            started = time.perf_counter()
+            status, result = await request(reader, writer, 'POST', '/equity', spot)
+            latencies.append((time.perf_counter() - started) * 1000)
+            source = result.get('source', 'error') if status == 200 else f"HTTP {status}"
+            sources[source] = sources.get(source, 0) + 1
+    finally:
+        writer.close()
+
+
+async def wait_for_service(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+            continue
+        writer.close()
+        return
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    spots = make_spots(args.distinct, rng)
+    await wait_for_service(args.host, args.port)
+
+    latencies = []
+    sources = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, spots, args.requests, random.Random(rng.random()),
+                                  latencies, sources)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.1f} req/s)")
+    print("client latency ms: " + ", ".join(f"{name} {percentile(latencies, fraction):.1f}"
+                                            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99),
+                                                                   ('max', 1.0))))
+    print("sources: " + ", ".join(f"{source} {count}" for source, count in sorted(sources.items())))
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, metrics = await request(reader, writer, 'GET', '/metrics')
+    writer.close()
+    print("service /metrics: " + json.dumps(metrics, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive equity_service.py with concurrent clients.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=32, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=50, help="requests per client")
+    parser.add_argument('--distinct', type=int, default=200, help="distinct spots before suit permutation")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help="start the service for the duration of the run")
+    parser.add_argument('--trials', type=int, default=10000, help="trials per spot for a spawned service")
+    args = parser.parse_args()
+
+    service = None
+    if args.spawn:
+        service = subprocess.Popen([sys.executable, '-m', 'equity_service', '--host', args.host,
+                                    '--port', str(args.port), '--trials', str(args.trials)])
+    try:
+        asyncio.run(run(args))
+    finally:
+        if service is not None:
+            # SIGINT lets the service shut its process pool down too
+            service.send_signal(signal.SIGINT)
+            service.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# project_folder/tools/validate_evaluator.py
+#
+# Check the handeval scores (scalar and vectorized) against treys on random
+# 5, 6 and 7 card hands. Run from the project folder:
+#     python -m tools.validate_evaluator --hands 1000000
+
+import argparse
+import time
+
+import numpy as np
+from treys import Card, Evaluator
+
+from handeval import evaluate_cards
+from helpers import get_all_card_strings
+from rules import evaluate_hand
+
+TREYS_CARDS = [Card.new(card) for card in get_all_card_strings()]
+
+
+def check_ordering(scores, treys_scores):
+    """
+    Two evaluators agree when sorting by one sorts the other: equal scores
+    must be equal treys ranks, and higher scores strictly better (lower)
+    treys ranks.
+
+    :return: number of adjacent pairs that disagree
+    """
+    order = np.lexsort((treys_scores, scores))
+    scores = scores[order]
+    treys_scores = treys_scores[order]
+    same = scores[1:] == scores[:-1]
+    bad_ties = np.count_nonzero(treys_scores[1:][same] != treys_scores[:-1][same])
+    bad_order = np.count_nonzero(treys_scores[1:][~same] >= treys_scores[:-1][~same])
+    return int(bad_ties + bad_order)
+
+
+def validate(num_hands, hand_size, seed=0):
+    rng = np.random.default_rng(seed)
+    hands = np.argsort(rng.random((num_hands, 52)), axis=1)[:, :hand_size]
+
+    started = time.perf_counter()
+    vector_scores = evaluate_cards(hands)
+    vector_time = time.perf_counter() - started
+
+    hand_lists = hands.tolist()
+    started = time.perf_counter()
+    scalar_scores = np.array([evaluate_hand(hand) for hand in hand_lists])
+    scalar_time = time.perf_counter() - started
+
+    evaluator = Evaluator()
+    started = time.perf_counter()
+    treys_scores = np.array([evaluator.evaluate([TREYS_CARDS[card] for card in hand[:2]],
+                                                [TREYS_CARDS[card] for card in hand[2:]])
+                             for hand in hand_lists])
+    treys_time = time.perf_counter() - started
+
+    mismatches = int(np.count_nonzero(vector_scores != scalar_scores))
+    disagreements = check_ordering(vector_scores, treys_scores)
+    print(f"{hand_size}-card hands: {num_hands}  "
+          f"scalar/vector mismatches: {mismatches}  ordering disagreements with treys: {disagreements}")
+    print(f"    hands/sec  vectorized {num_hands / vector_time:,.0f}  "
+          f"scalar {num_hands / scalar_time:,.0f}  treys {num_hands / treys_time:,.0f}")
+    return mismatches + disagreements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate handeval against treys.")
+    parser.add_argument('--hands', type=int, default=200000, help="random hands per hand size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failures = sum(validate(args.hands, size, args.seed) for size in (5, 6, 7))
+    if failures:
+        raise SystemExit(f"FAILED: {failures} disagreements")
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()